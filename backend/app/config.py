@@ -3,6 +3,7 @@ Configuración de la aplicación
 """
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -16,12 +17,75 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_MAX_ENTRIES: int = 2048
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_ENTRIES: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 300
     
     # App
     APP_NAME: str = "Sistema Inmobiliario API"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
     
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" o "text"
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0  # fracción de requests exitosas que se registran
+    LOG_SAMPLE_RATE: float = 0.01  # eventos de alto volumen (tokens inválidos, aciertos de caché)
+    
+    # Profiling por muestreo (opcional, ver app/core/profiler.py)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SLOW_MS: int = 1000  # se guarda el perfil de requests más lentas que esto
+    PROFILING_HEADER: str = "X-Profile"  # o de requests que traen este header
+    PROFILING_INTERVAL_MS: int = 5
+    PROFILING_MAX_PROFILES: int = 20
+    
+    # Readiness (/health/ready)
+    HEALTH_CACHE_SECONDS: float = 5
+    HEALTH_TIMEOUT_SECONDS: float = 3
+    HEALTH_DB_MAX_LATENCY_MS: int = 1000
+    HEALTH_MIN_FREE_DISK_MB: int = 200
+    HEALTH_JOB_GRACE_SECONDS: int = 120
+    
+    # Tareas en segundo plano
+    JOBS_ENABLED: bool = True
+    PAGOS_ATRASADOS_INTERVALO_SEGUNDOS: int = 900
+    ROLES_REFRESCO_INTERVALO_SEGUNDOS: int = 600
+    LIMPIEZA_ARCHIVOS_INTERVALO_SEGUNDOS: int = 6 * 3600  # archivos huérfanos (app/jobs/limpieza_archivos.py)
+    LIMPIEZA_ARCHIVOS_GRACIA_SEGUNDOS: int = 24 * 3600  # antigüedad mínima de un archivo sin fila para borrarlo
+    LIMPIEZA_ARCHIVOS_LOTE: int = 500  # filas leídas por consulta y objetos borrados por llamada
+    
+    # Subida de archivos
+    UPLOAD_MAX_IMAGE_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_MAX_DOCUMENT_BYTES: int = 25 * 1024 * 1024  # PDFs escaneados
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024  # bloque leído/escrito por vez
+    UPLOAD_CONCURRENCY: int = 4  # archivos de una misma request procesados a la vez
+    SUBIDA_FIRMADA_SEGUNDOS: int = 900  # vigencia de las URLs de subida directa (app/routes/subidas.py)
+    UPLOADS_CACHE_MAX_AGE: int = 3600  # Cache-Control de /uploads fuera de las rutas por contenido (inmutables)
+    UPLOADS_PRECOMPRESSED: bool = True  # servir <archivo>.br / .gz si existen
+    
+    # Almacenamiento de archivos (ver app/storage): "local", "s3" o "supabase"
+    STORAGE_BACKEND: str = "local"  # imágenes de propiedades
+    STORAGE_DOCUMENTS_BACKEND: str = "supabase"  # documentos de propiedades
+    S3_BUCKET: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO, R2, etc. (vacío = AWS)
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: Optional[str] = None  # vacío = credenciales del entorno (rol IAM)
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_PUBLIC_URL: Optional[str] = None  # CDN o dominio público del bucket
+    S3_PART_BYTES: int = 8 * 1024 * 1024  # partes de las subidas multipart (mínimo 5 MB)
+    
+    # Variantes de imágenes (requiere Pillow, ver app/utils/imagenes.py)
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1280]
+    IMAGE_VARIANT_QUALITY: int = 80
+    IMAGE_PROCESS_WORKERS: int = 2
+    IMAGE_CATALOG_WIDTH: int = 640  # tarjetas del listado público
+    IMAGE_DETAIL_WIDTH: int = 1280  # galería del detalle público
+    
+    # Hash de contraseñas (bcrypt en un pool de hilos acotado)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,3 @@
+"""
+Infraestructura transversal de la aplicación (logging, middlewares)
+"""
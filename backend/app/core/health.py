@@ -0,0 +1,138 @@
+"""
+Chequeos de disponibilidad (readiness) de la API.
+
+- db: ida y vuelta a PostgREST (SELECT de una fila de `rol`) y su latencia.
+- storage: los almacenes configurados de imágenes y documentos responden
+  (app/storage); los que guardan en disco local además se pueden escribir y
+  tienen espacio libre.
+- jobs: cada tarea periódica tuvo un éxito reciente.
+
+El resultado se cachea HEALTH_CACHE_SECONDS para que los probes del balanceador
+sean baratos; probes simultáneos comparten la misma ejecución.
+"""
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.config import get_settings
+from app.database import get_supabase_client
+from app.jobs.scheduler import scheduler
+from app.storage import DOCUMENTOS, IMAGENES, Almacenamiento, AlmacenamientoLocal, get_storage
+
+settings = get_settings()
+
+# Clave que nunca existe: solo importa que el almacenamiento conteste
+CLAVE_SONDEO = ".health/sondeo"
+
+
+def _resultado(ok: bool, inicio: float, **datos) -> Dict[str, Any]:
+    return {"ok": ok, "latencia_ms": round((time.perf_counter() - inicio) * 1000, 2), **datos}
+
+
+def chequear_db() -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    try:
+        get_supabase_client().table("rol").select("id_rol").limit(1).execute()
+    except Exception as e:
+        return _resultado(False, inicio, error=str(e))
+    resultado = _resultado(True, inicio)
+    if resultado["latencia_ms"] > settings.HEALTH_DB_MAX_LATENCY_MS:
+        resultado.update(ok=False, error=f"Latencia mayor a {settings.HEALTH_DB_MAX_LATENCY_MS} ms")
+    return resultado
+
+
+def _carpeta_existente(directorio: str) -> str:
+    """La carpeta misma o su ancestro más cercano que existe (se crea al primer archivo)"""
+    while not os.path.isdir(directorio) and os.path.dirname(directorio) != directorio:
+        directorio = os.path.dirname(directorio)
+    return directorio
+
+
+def chequear_disco(directorio: str) -> Dict[str, Any]:
+    carpeta = _carpeta_existente(directorio)
+    if not os.access(carpeta, os.W_OK):
+        return {"ok": False, "error": f"No se puede escribir en {carpeta}"}
+    libre_mb = shutil.disk_usage(carpeta).free // (1024 * 1024)
+    if libre_mb < settings.HEALTH_MIN_FREE_DISK_MB:
+        return {"ok": False, "disco_libre_mb": libre_mb, "error": f"Menos de {settings.HEALTH_MIN_FREE_DISK_MB} MB libres"}
+    return {"ok": True, "disco_libre_mb": libre_mb}
+
+
+async def chequear_almacen(almacen: Almacenamiento) -> Dict[str, Any]:
+    """
+    El backend responde (consulta por una clave que no existe: un "no existe"
+    también es respuesta); si guarda en disco, además se puede escribir y hay
+    espacio libre.
+    """
+    inicio = time.perf_counter()
+    try:
+        await almacen.existe(CLAVE_SONDEO)
+    except Exception as e:
+        return _resultado(False, inicio, backend=almacen.nombre, error=f"El almacenamiento no responde: {e}")
+    resultado = _resultado(True, inicio, backend=almacen.nombre)
+    if isinstance(almacen, AlmacenamientoLocal):
+        disco = await asyncio.to_thread(chequear_disco, almacen.directorio)
+        resultado.update(disco, ok=disco["ok"])
+    return resultado
+
+
+async def chequear_storage() -> Dict[str, Any]:
+    """Los almacenes configurados de imágenes y documentos"""
+    almacenes = await asyncio.gather(*(chequear_almacen(get_storage(tipo)) for tipo in (IMAGENES, DOCUMENTOS)))
+    return {"ok": all(a["ok"] for a in almacenes), IMAGENES: almacenes[0], DOCUMENTOS: almacenes[1]}
+
+
+def chequear_jobs() -> Dict[str, Any]:
+    """Una tarea está al día si tuvo éxito dentro de 2 intervalos (+ margen)"""
+    ahora = datetime.now(timezone.utc)
+    jobs = {}
+    ok = True
+    for nombre, job in scheduler.jobs.items():
+        limite = 2 * job.intervalo_segundos + settings.HEALTH_JOB_GRACE_SECONDS
+        if job.ultimo_exito is not None:
+            antiguedad = round((ahora - job.ultimo_exito).total_seconds(), 1)
+            al_dia = antiguedad <= limite
+        else:
+            # Sin éxitos: al día solo si todavía no terminó su primera ejecución
+            antiguedad = None
+            al_dia = job.ejecuciones == 0
+        ok = ok and al_dia
+        jobs[nombre] = {"ok": al_dia, "segundos_desde_exito": antiguedad, "ultimo_error": job.ultimo_error}
+    return {"ok": ok, "jobs": jobs}
+
+
+class ReadinessChecker:
+    def __init__(self):
+        self._ultimo: Optional[Dict[str, Any]] = None
+        self._ultimo_en = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _ejecutar(self) -> Dict[str, Any]:
+        timeout = settings.HEALTH_TIMEOUT_SECONDS
+
+        async def con_timeout(chequeo):
+            try:
+                return await asyncio.wait_for(chequeo, timeout)
+            except asyncio.TimeoutError:
+                return {"ok": False, "error": f"Sin respuesta en {timeout} s"}
+
+        db, storage = await asyncio.gather(con_timeout(asyncio.to_thread(chequear_db)), con_timeout(chequear_storage()))
+        checks = {"db": db, "storage": storage, "jobs": chequear_jobs()}
+        listo = all(check["ok"] for check in checks.values())
+        return {
+            "status": "ready" if listo else "not_ready",
+            "verificado_en": datetime.now(timezone.utc).isoformat(),
+            "checks": checks,
+        }
+
+    async def estado(self) -> Dict[str, Any]:
+        """Resultado cacheado; solo un probe a la vez consulta las dependencias"""
+        if self._ultimo is not None and time.monotonic() - self._ultimo_en < settings.HEALTH_CACHE_SECONDS:
+            return self._ultimo
+        async with self._lock:
+            if self._ultimo is None or time.monotonic() - self._ultimo_en >= settings.HEALTH_CACHE_SECONDS:
+                self._ultimo = await self._ejecutar()
+                self._ultimo_en = time.monotonic()
+            return self._ultimo
@@ -0,0 +1,165 @@
+"""
+Instrumentación de llamadas a Supabase por request.
+
+Envuelve `request` de los clientes HTTP de PostgREST y Storage para medir
+cada llamada (tiempo, bytes recibidos) y acumularla en:
+  - la request en curso (contextvar), que InstrumentationMiddleware
+    publica en el header Server-Timing;
+  - totales globales por tipo de backend (incluye tareas en segundo plano);
+  - agregados por ruta (`route_stats`).
+
+asyncio.to_thread copia el contexto, así que las consultas lanzadas con
+execute_async también se cuentan en la request que las originó.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
+from app.core import metrics
+
+BACKENDS = ("db", "storage")
+
+
+class RequestMetrics:
+    """Llamadas a Supabase hechas durante una request"""
+
+    __slots__ = ("inicio", "llamadas", "segundos", "bytes", "_lock")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.llamadas = dict.fromkeys(BACKENDS, 0)
+        self.segundos = dict.fromkeys(BACKENDS, 0.0)
+        self.bytes = dict.fromkeys(BACKENDS, 0)
+        self._lock = threading.Lock()
+
+    def registrar(self, backend: str, segundos: float, num_bytes: int):
+        with self._lock:
+            self.llamadas[backend] += 1
+            self.segundos[backend] += segundos
+            self.bytes[backend] += num_bytes
+
+    def server_timing(self) -> str:
+        """Valor del header Server-Timing"""
+        partes = [f"app;dur={(time.perf_counter() - self.inicio) * 1000:.2f}"]
+        for backend in BACKENDS:
+            if self.llamadas[backend]:
+                partes.append(
+                    f'{backend};dur={self.segundos[backend] * 1000:.2f};'
+                    f'desc="{self.llamadas[backend]} llamadas, {self.bytes[backend]} B"'
+                )
+        return ", ".join(partes)
+
+
+request_metrics_var: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+class _Totales:
+    """Contadores acumulados con su propio lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos: Dict[Any, Dict[str, float]] = {}
+
+    def sumar(self, clave, **valores):
+        with self._lock:
+            fila = self._datos.setdefault(clave, {})
+            for nombre, valor in valores.items():
+                if nombre.startswith("max_"):
+                    fila[nombre] = max(fila.get(nombre, 0), valor)
+                else:
+                    fila[nombre] = fila.get(nombre, 0) + valor
+
+    def snapshot(self) -> Dict[Any, Dict[str, float]]:
+        with self._lock:
+            return {clave: dict(fila) for clave, fila in self._datos.items()}
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+# backend -> llamadas, errores, segundos, bytes
+backend_totals = _Totales()
+# (método, ruta) -> requests, errores, segundos, max_segundos, llamadas y segundos por backend
+route_totals = _Totales()
+
+
+def registrar_llamada(backend: str, segundos: float, num_bytes: int, error: bool = False):
+    """Acumula una llamada a Supabase en la request en curso y en los totales"""
+    metricas = request_metrics_var.get()
+    if metricas is not None:
+        metricas.registrar(backend, segundos, num_bytes)
+    backend_totals.sumar(backend, llamadas=1, errores=int(error), segundos=segundos, bytes=num_bytes)
+    metrics.supabase_request_duration_seconds.observe(segundos, backend=backend)
+    metrics.supabase_requests_total.inc(backend=backend, outcome="error" if error else "ok")
+    metrics.supabase_response_bytes_total.inc(num_bytes, backend=backend)
+
+
+def registrar_request(metodo: str, ruta: str, status_code: int, segundos: float, metricas: RequestMetrics):
+    valores = {
+        "requests": 1,
+        "errores": int(status_code >= 500),
+        "segundos": segundos,
+        "max_segundos": segundos,
+    }
+    for backend in BACKENDS:
+        valores[f"{backend}_llamadas"] = metricas.llamadas[backend]
+        valores[f"{backend}_segundos"] = metricas.segundos[backend]
+        valores[f"{backend}_bytes"] = metricas.bytes[backend]
+    route_totals.sumar((metodo, ruta), **valores)
+    metrics.http_requests_total.inc(method=metodo, route=ruta, status=status_code)
+    metrics.http_request_duration_seconds.observe(segundos, method=metodo, route=ruta)
+
+
+def route_stats() -> list:
+    """Agregados por ruta, ordenados por tiempo total"""
+    filas = []
+    for (metodo, ruta), fila in route_totals.snapshot().items():
+        n = fila["requests"]
+        resumen = {
+            "metodo": metodo,
+            "ruta": ruta,
+            "requests": int(n),
+            "errores": int(fila["errores"]),
+            "promedio_ms": round(fila["segundos"] / n * 1000, 2),
+            "max_ms": round(fila["max_segundos"] * 1000, 2),
+            "total_s": round(fila["segundos"], 3),
+        }
+        for backend in BACKENDS:
+            resumen[f"{backend}_llamadas_promedio"] = round(fila[f"{backend}_llamadas"] / n, 2)
+            resumen[f"{backend}_promedio_ms"] = round(fila[f"{backend}_segundos"] / n * 1000, 2)
+            resumen[f"{backend}_bytes_promedio"] = int(fila[f"{backend}_bytes"] / n)
+        filas.append(resumen)
+    return sorted(filas, key=lambda f: f["total_s"], reverse=True)
+
+
+def _envolver_request(request, backend: str):
+    def request_instrumentado(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            response = request(self, *args, **kwargs)
+        except Exception:
+            registrar_llamada(backend, time.perf_counter() - inicio, 0, error=True)
+            raise
+        # PostgREST y Storage leen el cuerpo completo (no usan streaming)
+        registrar_llamada(backend, time.perf_counter() - inicio, len(response.content), error=response.is_error)
+        return response
+
+    request_instrumentado._instrumentado = True
+    return request_instrumentado
+
+
+def instrumentar_clientes_supabase():
+    """
+    Instala la medición en las clases de cliente HTTP de postgrest y storage3.
+
+    Se envuelven esas subclases de httpx.Client (no httpx.Client en general)
+    para medir solo el tráfico hacia Supabase. Es idempotente.
+    """
+    from postgrest.utils import SyncClient as PostgrestHttpClient
+    from storage3.utils import SyncClient as StorageHttpClient
+
+    clases: Tuple[Tuple[type, str], ...] = ((PostgrestHttpClient, "db"), (StorageHttpClient, "storage"))
+    for clase, backend in clases:
+        if not getattr(clase.request, "_instrumentado", False):
+            clase.request = _envolver_request(clase.request, backend)
@@ -0,0 +1,144 @@
+"""
+Logging estructurado de la aplicación.
+
+- Niveles estándar de `logging` (LOG_LEVEL en la configuración).
+- Salida JSON (una línea por evento) o texto legible (LOG_FORMAT).
+- Escritura no bloqueante: los módulos solo encolan el registro
+  (QueueHandler) y un hilo aparte (QueueListener) lo escribe en stdout.
+- Muestreo para eventos de alto volumen: logger.debug(..., extra={"sample_rate": 0.01}).
+- Correlación: cada registro lleva el request_id de la request en curso.
+
+Uso:
+    from app.core.logger import get_logger
+    logger = get_logger(__name__)
+    logger.info("Pago registrado", extra={"id_pago": id_pago})
+"""
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# request_id de la request en curso (lo asigna RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos propios de LogRecord; el resto son campos extra del evento
+_ATRIBUTOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "sample_rate", "taskName",
+}
+
+_listener: Optional[QueueListener] = None
+_cola: Optional["queue.SimpleQueue[logging.LogRecord]"] = None
+_salida: Optional[logging.Handler] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Agrega request_id a cada registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Descarta al azar los registros que indican sample_rate < 1"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate is None or sample_rate >= 1:
+            return True
+        return random.random() < sample_rate
+
+
+def _campos_extra(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in record.__dict__.items() if k not in _ATRIBUTOS_ESTANDAR and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            evento["request_id"] = record.request_id
+        evento.update(_campos_extra(record))
+        if record.exc_info:
+            evento["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(evento, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo: hora, nivel, logger, mensaje y campos"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        hora = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+        linea = f"{hora} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        campos = _campos_extra(record)
+        if getattr(record, "request_id", None):
+            campos = {"request_id": record.request_id, **campos}
+        if campos:
+            linea += " " + " ".join(f"{k}={v}" for k, v in campos.items())
+        if record.exc_info:
+            linea += "\n" + self.formatException(record.exc_info)
+        return linea
+
+
+def configure_logging(level: str = "INFO", formato: str = "json"):
+    """
+    Configura el logger raíz de la app ("app") e inicia el hilo escritor. Es
+    idempotente: llamarlo de nuevo reemplaza la configuración anterior.
+    """
+    global _cola, _salida
+    shutdown_logging()
+
+    _salida = logging.StreamHandler(sys.stdout)
+    _salida.setFormatter(JsonFormatter() if formato == "json" else TextFormatter())
+
+    _cola = queue.SimpleQueue()
+    encolador = QueueHandler(_cola)
+    # Los filtros corren en el hilo que loguea (donde está el contextvar)
+    encolador.addFilter(SamplingFilter())
+    encolador.addFilter(RequestIdFilter())
+
+    logger = logging.getLogger("app")
+    logger.handlers = [encolador]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    start_logging()
+
+
+def start_logging():
+    """
+    (Re)inicia el hilo escritor si está detenido, p. ej. en el lifespan de una
+    app que ya se apagó una vez en el mismo proceso (TestClient, reload). Lo
+    encolado mientras estuvo detenido se escribe al reiniciar.
+    """
+    global _listener
+    if _listener is None and _cola is not None:
+        _listener = QueueListener(_cola, _salida, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging():
+    """Vacía la cola y detiene el hilo escritor (start_logging lo reinicia)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger hijo de "app" (usar get_logger(__name__))"""
+    if not name.startswith("app"):
+        name = f"app.{name}"
+    return logging.getLogger(name)
@@ -0,0 +1,252 @@
+"""
+Métricas en formato de exposición de texto de Prometheus (versión 0.0.4).
+
+Implementación mínima sin dependencias: contadores, gauges e histogramas
+con etiquetas, más "collectors" que leen el estado de otros módulos (cachés,
+pool de bcrypt, tareas) en el momento del scrape.
+
+GET /metrics devuelve `render()`.
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets en segundos
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_DB = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BUCKETS_JOBS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Muestra = Tuple[str, Dict[str, str], float]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_valor(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _formatear_muestra(nombre: str, etiquetas: Dict[str, str], valor: float) -> str:
+    if etiquetas:
+        texto = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items())
+        return f"{nombre}{{{texto}}} {_formatear_valor(valor)}"
+    return f"{nombre} {_formatear_valor(valor)}"
+
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(etiquetas.get(e, "")) for e in self.etiquetas)
+
+    def muestras(self) -> Iterable[Muestra]:
+        raise NotImplementedError
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(_formatear_muestra(*m) for m in self.muestras())
+        return lineas
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, cantidad: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def muestras(self):
+        with self._lock:
+            valores = dict(self._valores)
+        for clave, valor in valores.items():
+            yield self.nombre, dict(zip(self.etiquetas, clave)), valor
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def dec(self, cantidad: float = 1, **etiquetas):
+        self.inc(-cantidad, **etiquetas)
+
+    def set(self, valor: float, **etiquetas):
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets: Sequence[float] = BUCKETS_HTTP):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # clave -> [conteos por bucket..., suma, total]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def muestras(self):
+        with self._lock:
+            series = {clave: list(serie) for clave, serie in self._series.items()}
+        for clave, serie in series.items():
+            etiquetas = dict(zip(self.etiquetas, clave))
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, serie):
+                acumulado += conteo
+                yield f"{self.nombre}_bucket", {**etiquetas, "le": _formatear_valor(limite)}, acumulado
+            yield f"{self.nombre}_bucket", {**etiquetas, "le": "+Inf"}, serie[-1]
+            yield f"{self.nombre}_sum", etiquetas, serie[-2]
+            yield f"{self.nombre}_count", etiquetas, serie[-1]
+
+
+class Collector:
+    """Métrica calculada en cada scrape a partir de `funcion() -> [(etiquetas, valor)]`"""
+
+    def __init__(self, nombre: str, ayuda: str, tipo: str, funcion: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.tipo = tipo
+        self.funcion = funcion
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for etiquetas, valor in self.funcion():
+            if valor is not None:
+                lineas.append(_formatear_muestra(self.nombre, etiquetas, valor))
+        return lineas
+
+
+class Registry:
+    def __init__(self):
+        self._metricas: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica):
+        with self._lock:
+            self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def counter(self, nombre, ayuda, etiquetas=()) -> Counter:
+        return self.registrar(Counter(nombre, ayuda, etiquetas))
+
+    def gauge(self, nombre, ayuda, etiquetas=()) -> Gauge:
+        return self.registrar(Gauge(nombre, ayuda, etiquetas))
+
+    def histogram(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_HTTP) -> Histogram:
+        return self.registrar(Histogram(nombre, ayuda, etiquetas, buckets))
+
+    def collector(self, nombre, ayuda, tipo, funcion) -> Collector:
+        return self.registrar(Collector(nombre, ayuda, tipo, funcion))
+
+    def render(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas: List[str] = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+registry = Registry()
+
+# ============================================
+# MÉTRICAS DE LA APLICACIÓN
+# ============================================
+http_requests_total = registry.counter(
+    "http_requests_total", "Requests HTTP atendidas", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las requests HTTP", ("method", "route"), BUCKETS_HTTP
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests HTTP en curso"
+)
+http_requests_in_flight.set(0)
+supabase_request_duration_seconds = registry.histogram(
+    "supabase_request_duration_seconds", "Latencia de las llamadas a Supabase", ("backend",), BUCKETS_DB
+)
+supabase_requests_total = registry.counter(
+    "supabase_requests_total", "Llamadas a Supabase", ("backend", "outcome")
+)
+supabase_response_bytes_total = registry.counter(
+    "supabase_response_bytes_total", "Bytes recibidos de Supabase", ("backend",)
+)
+job_duration_seconds = registry.histogram(
+    "job_duration_seconds", "Duración de las tareas en segundo plano", ("job",), BUCKETS_JOBS
+)
+job_runs_total = registry.counter(
+    "job_runs_total", "Ejecuciones de tareas en segundo plano", ("job", "outcome")
+)
+
+
+def render() -> str:
+    return registry.render()
+
+
+def registrar_collectors(
+    caches: Callable[[], Iterable[dict]],
+    password_hash_stats: Callable[[], dict],
+    jobs_status: Optional[Callable[[], Dict[str, dict]]] = None,
+):
+    """Registra las métricas que se leen del estado de otros módulos al hacer scrape"""
+
+    def por_cache(campo: str):
+        return lambda: [({"cache": c["nombre"]}, c[campo]) for c in caches()]
+
+    registry.collector("cache_hits_total", "Aciertos del caché", "counter", por_cache("aciertos"))
+    registry.collector("cache_misses_total", "Fallos del caché (incluye expirados)", "counter", por_cache("fallos"))
+    registry.collector("cache_evictions_total", "Entradas desalojadas por tamaño", "counter", por_cache("desalojados"))
+    registry.collector("cache_entries", "Entradas en el caché", "gauge", por_cache("entradas"))
+
+    def pool(campo: str):
+        return lambda: [({"pool": "password_hash"}, password_hash_stats()[campo])]
+
+    registry.collector("threadpool_queue_depth", "Tareas esperando un hilo", "gauge", pool("en_cola"))
+    registry.collector("threadpool_active", "Tareas ejecutándose", "gauge", pool("en_ejecucion"))
+    registry.collector("threadpool_workers", "Hilos del pool", "gauge", pool("workers"))
+    registry.collector("threadpool_completed_total", "Tareas completadas", "counter", pool("completadas"))
+    registry.collector("threadpool_rejected_total", "Tareas rechazadas por cola llena", "counter", pool("rechazadas"))
+
+    if jobs_status is not None:
+        def ultima_duracion():
+            return [({"job": nombre}, e["ultima_duracion_segundos"]) for nombre, e in jobs_status().items()]
+
+        def ultimo_exito():
+            return [
+                ({"job": nombre}, datetime.fromisoformat(e["ultimo_exito"]).timestamp())
+                for nombre, e in jobs_status().items() if e["ultimo_exito"]
+            ]
+
+        registry.collector("job_last_duration_seconds", "Duración de la última ejecución", "gauge", ultima_duracion)
+        registry.collector(
+            "job_last_success_timestamp_seconds", "Fin de la última ejecución exitosa (epoch)", "gauge", ultimo_exito
+        )
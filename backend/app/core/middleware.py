@@ -0,0 +1,160 @@
+"""
+Middlewares ASGI de la aplicación
+"""
+import re
+import time
+import uuid
+from app.core.logger import get_logger, request_id_var
+from app.core.instrumentation import RequestMetrics, request_metrics_var, registrar_request
+from app.core.metrics import http_requests_in_flight
+
+logger = get_logger(__name__)
+
+# Solo se acepta un X-Request-ID entrante con formato razonable
+_REQUEST_ID_VALIDO = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """
+    Asigna un request_id a cada request (o reutiliza X-Request-ID si viene),
+    lo deja en el contextvar para los logs y lo devuelve en la respuesta.
+    También registra una línea de acceso por request (muestreable).
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        entrante = None
+        for nombre, valor in scope.get("headers", []):
+            if nombre == b"x-request-id":
+                entrante = valor.decode("latin-1")
+                break
+        request_id = entrante if entrante and _REQUEST_ID_VALIDO.match(entrante) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        inicio = time.perf_counter()
+        status_code = 500
+
+        async def send_con_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_request_id)
+        finally:
+            logger.info(
+                "request",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                    "sample_rate": self.sample_rate if status_code < 500 else 1.0,
+                },
+            )
+            request_id_var.reset(token)
+
+
+class InstrumentationMiddleware:
+    """
+    Mide cada request: latencia total y llamadas a Supabase (cantidad, tiempo
+    y bytes). Agrega el header Server-Timing y acumula los totales por ruta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metricas = RequestMetrics()
+        token = request_metrics_var.set(metricas)
+        status_code = 500
+        http_requests_in_flight.inc()
+
+        async def send_con_server_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", metricas.server_timing().encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_server_timing)
+        finally:
+            http_requests_in_flight.dec()
+            request_metrics_var.reset(token)
+            registrar_request(
+                scope["method"],
+                _plantilla_ruta(scope),
+                status_code,
+                time.perf_counter() - metricas.inicio,
+                metricas,
+            )
+
+
+def _plantilla_ruta(scope) -> str:
+    """Ruta con parámetros sin resolver (/api/pagos/{id_pago}) para no disparar la cardinalidad"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    # Archivos estáticos montados (p. ej. /uploads/...)
+    root_path = scope.get("root_path", "")
+    if root_path:
+        return f"{root_path}/*"
+    return "sin_ruta"
+
+
+class ProfilingMiddleware:
+    """
+    Perfila por muestreo las requests (solo si PROFILING_ENABLED).
+    Guarda el perfil si la request fue lenta o trajo el header de profiling.
+    """
+
+    def __init__(self, app, profiler, header: str):
+        self.app = app
+        self.profiler = profiler
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forzado = any(nombre == self.header and valor not in (b"", b"0") for nombre, valor in scope.get("headers", []))
+        captura = self.profiler.iniciar(scope["method"], scope["path"], request_id_var.get(), forzado)
+        if captura is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_con_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_status)
+        finally:
+            id_perfil = self.profiler.terminar(captura, status_code)
+            if id_perfil is not None:
+                logger.warning(
+                    "Perfil de request capturado",
+                    extra={"id_perfil": id_perfil, "method": scope["method"], "path": scope["path"]},
+                )
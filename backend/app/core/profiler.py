@@ -0,0 +1,192 @@
+"""
+Profiler por muestreo de pila para requests lentas (opcional).
+
+Con PROFILING_ENABLED, un hilo toma cada PROFILING_INTERVAL_MS la pila del
+hilo del event loop y la atribuye a la request cuya tarea asyncio se está
+ejecutando en ese momento. Las muestras sin tarea activa de la request se
+cuentan como "esperando" (I/O a Supabase, hilos, etc.).
+
+Al terminar la request, el perfil se conserva si tardó más de
+PROFILING_SLOW_MS o si trajo el header PROFILING_HEADER. Se guardan los
+últimos PROFILING_MAX_PROFILES en memoria (ver /api/diagnostico/perfiles).
+"""
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+_MAX_PROFUNDIDAD = 64
+_RAIZ_APP = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _nombre_frame(frame) -> str:
+    code = frame.f_code
+    archivo = code.co_filename
+    if archivo.startswith(_RAIZ_APP):
+        archivo = os.path.relpath(archivo, _RAIZ_APP)
+    elif "site-packages" in archivo:
+        archivo = archivo.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({archivo}:{frame.f_lineno})"
+
+
+def _pila(frame) -> tuple:
+    """Pila de la raíz a la hoja, como tupla de nombres"""
+    nombres = []
+    while frame is not None and len(nombres) < _MAX_PROFUNDIDAD:
+        nombres.append(_nombre_frame(frame))
+        frame = frame.f_back
+    return tuple(reversed(nombres))
+
+
+class Captura:
+    """Muestras acumuladas de una request en curso"""
+
+    __slots__ = ("task", "loop", "hilo_loop", "metodo", "ruta", "request_id", "forzado", "inicio", "pilas", "esperando")
+
+    def __init__(self, task, loop, metodo: str, ruta: str, request_id: Optional[str], forzado: bool):
+        self.task = task
+        self.loop = loop
+        self.hilo_loop = threading.get_ident()
+        self.metodo = metodo
+        self.ruta = ruta
+        self.request_id = request_id
+        self.forzado = forzado
+        self.inicio = time.perf_counter()
+        self.pilas: Counter = Counter()
+        self.esperando = 0
+
+
+class SamplingProfiler:
+    def __init__(self, intervalo_segundos: float, max_perfiles: int, umbral_segundos: float):
+        self.intervalo_segundos = intervalo_segundos
+        self.umbral_segundos = umbral_segundos
+        self.perfiles: Deque[Dict[str, Any]] = deque(maxlen=max_perfiles)
+        self._activas: Dict[int, Captura] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._hilo: Optional[threading.Thread] = None
+
+    # ---------- ciclo de vida de una request ----------
+    def iniciar(self, metodo: str, ruta: str, request_id: Optional[str], forzado: bool) -> Optional[Captura]:
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        captura = Captura(task, asyncio.get_running_loop(), metodo, ruta, request_id, forzado)
+        with self._lock:
+            self._activas[id(captura)] = captura
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._muestrear, name="profiler", daemon=True)
+                self._hilo.start()
+        return captura
+
+    def terminar(self, captura: Captura, status_code: int) -> Optional[int]:
+        """Cierra la captura; retorna el id del perfil si se guardó"""
+        duracion = time.perf_counter() - captura.inicio
+        with self._lock:
+            self._activas.pop(id(captura), None)
+        if not captura.forzado and duracion < self.umbral_segundos:
+            return None
+
+        perfil = self._construir_perfil(captura, status_code, duracion)
+        with self._lock:
+            self.perfiles.append(perfil)
+        return perfil["id"]
+
+    # ---------- hilo de muestreo ----------
+    def _muestrear(self):
+        while True:
+            time.sleep(self.intervalo_segundos)
+            frames = sys._current_frames()
+            # Con el lock tomado: terminar() no lee una captura a medio actualizar
+            with self._lock:
+                if not self._activas:
+                    self._hilo = None
+                    return
+                for captura in self._activas.values():
+                    if asyncio.current_task(captura.loop) is captura.task:
+                        frame = frames.get(captura.hilo_loop)
+                        if frame is not None:
+                            captura.pilas[_pila(frame)] += 1
+                            continue
+                    captura.esperando += 1
+            del frames
+
+    # ---------- resultados ----------
+    def _construir_perfil(self, captura: Captura, status_code: int, duracion: float) -> Dict[str, Any]:
+        pilas = dict(captura.pilas)
+        en_loop = sum(pilas.values())
+        propias: Counter = Counter()
+        acumuladas: Counter = Counter()
+        for pila, n in pilas.items():
+            propias[pila[-1]] += n
+            for nombre in set(pila):
+                acumuladas[nombre] += n
+
+        return {
+            "id": next(self._ids),
+            "capturado_en": datetime.now(timezone.utc).isoformat(),
+            "metodo": captura.metodo,
+            "ruta": captura.ruta,
+            "status": status_code,
+            "request_id": captura.request_id,
+            "motivo": "header" if captura.forzado else "lento",
+            "duracion_ms": round(duracion * 1000, 2),
+            "intervalo_ms": round(self.intervalo_segundos * 1000, 2),
+            "muestras_en_loop": en_loop,
+            "muestras_esperando": captura.esperando,
+            "top_propias": [{"funcion": f, "muestras": n} for f, n in propias.most_common(25)],
+            "top_acumuladas": [{"funcion": f, "muestras": n} for f, n in acumuladas.most_common(25)],
+            "pilas": pilas,
+        }
+
+    def listar(self) -> List[Dict[str, Any]]:
+        """Resumen de los perfiles guardados (más reciente primero)"""
+        with self._lock:
+            perfiles = list(self.perfiles)
+        campos = ("id", "capturado_en", "metodo", "ruta", "status", "request_id", "motivo",
+                  "duracion_ms", "muestras_en_loop", "muestras_esperando")
+        return [{c: p[c] for c in campos} for p in reversed(perfiles)]
+
+    def obtener(self, id_perfil: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for perfil in self.perfiles:
+                if perfil["id"] == id_perfil:
+                    return perfil
+        return None
+
+    def limpiar(self):
+        with self._lock:
+            self.perfiles.clear()
+
+
+def folded(perfil: Dict[str, Any]) -> str:
+    """Pilas en formato "collapsed" (una línea por pila), para flamegraph.pl o speedscope"""
+    lineas = [";".join(pila) + f" {n}" for pila, n in perfil["pilas"].items()]
+    if perfil["muestras_esperando"]:
+        lineas.append(f"<esperando> {perfil['muestras_esperando']}")
+    return "\n".join(lineas) + "\n"
+
+
+def serializar(perfil: Dict[str, Any]) -> Dict[str, Any]:
+    """Perfil apto para JSON (las pilas pasan a lista)"""
+    datos = {k: v for k, v in perfil.items() if k != "pilas"}
+    datos["pilas"] = sorted(
+        ({"pila": list(pila), "muestras": n} for pila, n in perfil["pilas"].items()),
+        key=lambda p: p["muestras"],
+        reverse=True,
+    )
+    return datos
+
+
+profiler: Optional[SamplingProfiler] = None
+
+
+def configurar_profiler(intervalo_ms: float, max_perfiles: int, umbral_ms: float) -> SamplingProfiler:
+    global profiler
+    profiler = SamplingProfiler(intervalo_ms / 1000, max_perfiles, umbral_ms / 1000)
+    return profiler
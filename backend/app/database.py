@@ -1,11 +1,18 @@
 """
 Configuración de conexión a Supabase
 """
+import asyncio
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 from app.config import get_settings
+from app.core.instrumentation import instrumentar_clientes_supabase
 
 settings = get_settings()
 
+# Cada llamada a PostgREST/Storage queda medida (ver app/core/instrumentation.py)
+instrumentar_clientes_supabase()
+
 
 def get_supabase_client() -> Client:
     """
@@ -16,3 +23,32 @@ def get_supabase_client() -> Client:
         settings.SUPABASE_KEY
     )
     return supabase
+
+
+async def execute_async(query):
+    """
+    Ejecuta una consulta de Supabase en un hilo sin bloquear el event loop.
+
+    Permite lanzar varias consultas independientes a la vez con asyncio.gather.
+    """
+    return await asyncio.to_thread(query.execute)
+
+
+# Códigos que lanzan las funciones SQL (RAISE EXCEPTION) y su código HTTP
+RPC_ERROR_STATUS = {
+    "P0001": 400,  # Regla de negocio violada
+    "P0002": 404,  # Registro no encontrado
+}
+
+
+def rpc_error_to_http(error: APIError, detail_prefix: str = "Error interno del servidor") -> HTTPException:
+    """
+    Traduce un error de una función SQL (supabase.rpc) a HTTPException.
+
+    Los errores de negocio conservan el mensaje de la función; el resto
+    se reporta como 500 con el prefijo indicado.
+    """
+    status_code = RPC_ERROR_STATUS.get(error.code)
+    if status_code:
+        return HTTPException(status_code=status_code, detail=error.message)
+    return HTTPException(status_code=500, detail=f"{detail_prefix}: {error.message or str(error)}")
@@ -0,0 +1,3 @@
+"""
+Tareas periódicas en segundo plano
+"""
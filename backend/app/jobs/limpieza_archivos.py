@@ -0,0 +1,217 @@
+"""
+Tarea: borrar archivos subidos que ya no usa ninguna fila (huérfanos).
+
+Quedan archivos sin fila cuando se borra una propiedad (la cascada borra sus
+imágenes y documentos, no los archivos), cuando falla el INSERT después de
+subir o cuando una subida directa nunca se completa. Cada pasada:
+
+1. Libera los archivos por contenido con referencias_archivo = 0
+   (`liberar_archivo`, ver archivos_contenido.sql).
+2. Reconcilia cada almacenamiento contra la BD: las URLs de las filas se leen
+   por páginas (keyset, estable aunque se borren filas mientras tanto) a un
+   set de claves; después se recorre el almacén por carpeta / página y lo que
+   no está en el set se borra en lotes de LIMPIEZA_ARCHIVOS_LOTE.
+3. Borra los temporales viejos de .uploads_tmp (subidas interrumpidas).
+
+Nunca se borran objetos modificados hace menos de LIMPIEZA_ARCHIVOS_GRACIA_SEGUNDOS:
+un archivo recién subido cuya fila todavía no se insertó no es huérfano. Antes
+de borrar imágenes por contenido se vuelve a consultar la tabla archivo: otra
+subida del mismo contenido pudo registrarse mientras se recorría el almacén.
+
+Para correrla a mano (desde backend/); con --simular solo informa:
+    python -m app.jobs.limpieza_archivos [--simular]
+"""
+import asyncio
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from app.config import get_settings
+from app.core.logger import configure_logging, get_logger, shutdown_logging
+from app.database import get_supabase_client
+from app.storage import DOCUMENTOS, IMAGENES, Almacenamiento, AlmacenamientoLocal, ObjetoAlmacenado, get_storage, shutdown_storage
+from app.utils.archivos import TMP_DIR, UPLOADS_DIR, borrar_archivo
+from app.utils.imagenes import liberar_archivo
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+# Variantes (_w640) y extensiones (.jpg, .webp, .jpg.br) comparten la base del original
+_SUFIJOS = re.compile(r"(_w\d+)?\.[^/]*$")
+# ab/<sha256>...: imágenes por contenido, registradas en la tabla archivo
+_CLAVE_CONTENIDO = re.compile(r"^[0-9a-f]{2}/([0-9a-f]{64})")
+
+
+def _base(clave: str) -> str:
+    return _SUFIJOS.sub("", clave)
+
+
+def _sha(clave: str) -> Optional[str]:
+    coincidencia = _CLAVE_CONTENIDO.match(clave)
+    return coincidencia[1] if coincidencia else None
+
+
+def _pagina(supabase, tabla: str, columnas: str, orden: str, desde: Any, lote: int) -> List[dict]:
+    consulta = supabase.table(tabla).select(columnas).order(orden).limit(lote)
+    if desde is not None:
+        consulta = consulta.gt(orden, desde)
+    return consulta.execute().data or []
+
+
+async def _urls(supabase, tabla: str, columna: str, orden: str) -> AsyncIterator[str]:
+    """Valores de `columna` de toda la tabla, de a LIMPIEZA_ARCHIVOS_LOTE filas"""
+    desde = None
+    while True:
+        filas = await asyncio.to_thread(
+            _pagina, supabase, tabla, f"{orden}, {columna}", orden, desde, settings.LIMPIEZA_ARCHIVOS_LOTE
+        )
+        if not filas:
+            return
+        for fila in filas:
+            if fila.get(columna):
+                yield fila[columna]
+        desde = filas[-1][orden]
+
+
+async def _referenciadas(supabase, almacen: Almacenamiento, fuentes: List[tuple]) -> Set[str]:
+    """Bases de las claves de `almacen` que usa alguna fila"""
+    bases: Set[str] = set()
+    for tabla, columna, orden in fuentes:
+        async for url in _urls(supabase, tabla, columna, orden):
+            clave = almacen.clave_de_url(url)
+            if clave:
+                bases.add(_base(clave))
+    return bases
+
+
+async def _liberar_sin_referencias(supabase, simular: bool) -> int:
+    liberados = 0
+    while True:
+        filas = await asyncio.to_thread(
+            supabase.table("archivo").select("sha256_archivo")
+            .eq("referencias_archivo", 0).limit(settings.LIMPIEZA_ARCHIVOS_LOTE).execute
+        )
+        if not filas.data or simular:
+            return len(filas.data or [])
+        for fila in filas.data:
+            # Condicionado a referencias = 0: si el contenido volvió a usarse no se borra
+            if await liberar_archivo(supabase, fila["sha256_archivo"]):
+                liberados += 1
+        if len(filas.data) < settings.LIMPIEZA_ARCHIVOS_LOTE:
+            return liberados
+
+
+async def _borrar_lote(supabase, almacen: Almacenamiento, objetos: List[ObjetoAlmacenado], simular: bool) -> List[ObjetoAlmacenado]:
+    shas = {_sha(o.clave) for o in objetos} - {None}
+    if shas:
+        registrados = await asyncio.to_thread(
+            supabase.table("archivo").select("sha256_archivo").in_("sha256_archivo", sorted(shas)).execute
+        )
+        vigentes = {fila["sha256_archivo"] for fila in registrados.data or []}
+        objetos = [o for o in objetos if _sha(o.clave) not in vigentes]
+    if objetos and not simular:
+        await almacen.borrar([o.clave for o in objetos])
+    return objetos
+
+
+async def _reconciliar(supabase, almacen: Almacenamiento, prefijo: str, fuentes: List[tuple], simular: bool) -> Dict[str, int]:
+    # Primero las filas: una fila nueva posterior apunta a un archivo nuevo (período de gracia)
+    referenciadas = await _referenciadas(supabase, almacen, fuentes)
+    limite = datetime.now(timezone.utc) - timedelta(seconds=settings.LIMPIEZA_ARCHIVOS_GRACIA_SEGUNDOS)
+    resultado = {"revisados": 0, "huerfanos": 0, "bytes": 0}
+    lote: List[ObjetoAlmacenado] = []
+
+    async def vaciar():
+        borrados = await _borrar_lote(supabase, almacen, lote, simular)
+        resultado["huerfanos"] += len(borrados)
+        resultado["bytes"] += sum(o.bytes for o in borrados)
+        lote.clear()
+
+    async for objeto in almacen.recorrer(prefijo):
+        resultado["revisados"] += 1
+        if objeto.modificado > limite or _base(objeto.clave) in referenciadas:
+            continue
+        lote.append(objeto)
+        if len(lote) >= settings.LIMPIEZA_ARCHIVOS_LOTE:
+            await vaciar()
+    if lote:
+        await vaciar()
+    return resultado
+
+
+def _limpiar_temporales(simular: bool) -> int:
+    limite = time.time() - settings.LIMPIEZA_ARCHIVOS_GRACIA_SEGUNDOS
+    borrados = 0
+    try:
+        entradas = list(os.scandir(TMP_DIR))
+    except FileNotFoundError:
+        return 0
+    for entrada in entradas:
+        try:
+            if entrada.stat(follow_symlinks=False).st_mtime > limite:
+                continue
+        except FileNotFoundError:
+            continue
+        borrados += 1
+        if simular:
+            continue
+        if entrada.is_dir(follow_symlinks=False):
+            shutil.rmtree(entrada.path, ignore_errors=True)
+        else:
+            borrar_archivo(entrada.path)
+    return borrados
+
+
+async def limpiar_archivos_huerfanos(simular: bool = False) -> Dict[str, Any]:
+    """Tarea completa; con `simular` cuenta los huérfanos sin borrarlos"""
+    supabase = get_supabase_client()
+    imagenes = [("imagenpropiedad", "url_imagen", "id_imagen")]
+
+    resultado: Dict[str, Any] = {
+        "archivos_liberados": await _liberar_sin_referencias(supabase, simular),
+        "almacenes": {
+            IMAGENES: await _reconciliar(
+                supabase, get_storage(IMAGENES), "",
+                imagenes + [("archivo", "url_archivo", "sha256_archivo")], simular,
+            ),
+            # Imágenes subidas antes del almacenamiento configurable (uploads/propiedades/<id>/)
+            "uploads_propiedades": await _reconciliar(
+                supabase, AlmacenamientoLocal(UPLOADS_DIR, "/uploads"), "propiedades/", imagenes, simular,
+            ),
+            DOCUMENTOS: await _reconciliar(
+                supabase, get_storage(DOCUMENTOS), "",
+                [("documentopropiedad", "ruta_archivo_documento", "id_documento")], simular,
+            ),
+        },
+        "temporales": await asyncio.to_thread(_limpiar_temporales, simular),
+    }
+    huerfanos = sum(r["huerfanos"] for r in resultado["almacenes"].values())
+    if huerfanos or resultado["archivos_liberados"] or resultado["temporales"]:
+        logger.info(
+            "Archivos huérfanos encontrados" if simular else "Archivos huérfanos borrados",
+            extra={
+                "huerfanos": huerfanos,
+                "bytes": sum(r["bytes"] for r in resultado["almacenes"].values()),
+                "archivos_liberados": resultado["archivos_liberados"],
+                "temporales": resultado["temporales"],
+            },
+        )
+    return resultado
+
+
+async def _main(simular: bool) -> Dict[str, Any]:
+    try:
+        return await limpiar_archivos_huerfanos(simular)
+    finally:
+        await shutdown_storage()
+
+
+if __name__ == "__main__":
+    configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+    try:
+        logger.info("Limpieza de archivos terminada", extra=asyncio.run(_main("--simular" in sys.argv)))
+    finally:
+        shutdown_logging()
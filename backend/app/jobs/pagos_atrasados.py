@@ -0,0 +1,179 @@
+"""
+Tarea: marcar pagos atrasados y precalcular el reporte de morosidad.
+
+1. Pasa a "Atrasado" todos los pagos "Pendiente" con fecha vencida en una sola
+   sentencia UPDATE (set-based).
+2. Construye en memoria el resumen de atrasos (por contrato, por cliente y por
+   antigüedad) que sirve GET /pagos/atrasados/lista sin consultar la BD.
+"""
+import threading
+from datetime import date, datetime, timezone
+from typing import Dict, Any, Optional
+from app.database import get_supabase_client
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Tramos de antigüedad en días de atraso: (etiqueta, desde, hasta)
+TRAMOS_ANTIGUEDAD = [
+    ("1-30", 1, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+]
+
+_resumen_atrasos: Optional[Dict[str, Any]] = None
+_resumen_desactualizado = True
+# Se incrementa en cada invalidación; si cambia mientras se construye el
+# resumen, el resultado nace desactualizado
+_generacion = 0
+_lock = threading.RLock()
+
+
+def _tramo(dias_atraso: int) -> str:
+    for etiqueta, desde, hasta in TRAMOS_ANTIGUEDAD:
+        if dias_atraso >= desde and (hasta is None or dias_atraso <= hasta):
+            return etiqueta
+    return TRAMOS_ANTIGUEDAD[0][0]
+
+
+def marcar_pagos_atrasados(supabase) -> int:
+    """Pasa a 'Atrasado' los pagos pendientes vencidos. Retorna cuántos cambiaron."""
+    hoy = date.today().isoformat()
+    result = (
+        supabase.table("pago")
+        .update({"estado_pago": "Atrasado"})
+        .eq("estado_pago", "Pendiente")
+        .lt("fecha_pago", hoy)
+        .execute()
+    )
+    return len(result.data or [])
+
+
+def construir_resumen_atrasos(supabase) -> Dict[str, Any]:
+    """Lee los pagos atrasados y arma el resumen agregado"""
+    hoy = date.today()
+
+    pagos = (
+        supabase.table("pago")
+        .select("*")
+        .eq("estado_pago", "Atrasado")
+        .order("fecha_pago", desc=False)
+        .execute()
+    ).data or []
+
+    # Cliente de cada contrato (una sola consulta para todos)
+    ids_contrato = sorted({p["id_contrato_operacion"] for p in pagos if p.get("id_contrato_operacion")})
+    clientes_por_contrato: Dict[str, str] = {}
+    if ids_contrato:
+        contratos = (
+            supabase.table("contratooperacion")
+            .select("id_contrato_operacion, ci_cliente")
+            .in_("id_contrato_operacion", ids_contrato)
+            .execute()
+        ).data or []
+        clientes_por_contrato = {c["id_contrato_operacion"]: c.get("ci_cliente") for c in contratos}
+
+    antiguedad = {etiqueta: {"cantidad": 0, "monto": 0.0} for etiqueta, _, _ in TRAMOS_ANTIGUEDAD}
+    por_contrato: Dict[str, Dict[str, Any]] = {}
+    por_cliente: Dict[str, Dict[str, Any]] = {}
+    monto_total = 0.0
+
+    for pago in pagos:
+        monto = float(pago["monto_pago"])
+        dias_atraso = (hoy - date.fromisoformat(str(pago["fecha_pago"])[:10])).days
+        tramo = _tramo(dias_atraso)
+        id_contrato = pago.get("id_contrato_operacion")
+        ci_cliente = clientes_por_contrato.get(id_contrato)
+
+        pago["dias_atraso"] = dias_atraso
+        pago["tramo_antiguedad"] = tramo
+        pago["ci_cliente"] = ci_cliente
+
+        monto_total += monto
+        antiguedad[tramo]["cantidad"] += 1
+        antiguedad[tramo]["monto"] += monto
+
+        contrato = por_contrato.setdefault(id_contrato, {
+            "id_contrato_operacion": id_contrato,
+            "ci_cliente": ci_cliente,
+            "cantidad": 0,
+            "monto": 0.0,
+            "max_dias_atraso": 0,
+        })
+        contrato["cantidad"] += 1
+        contrato["monto"] += monto
+        contrato["max_dias_atraso"] = max(contrato["max_dias_atraso"], dias_atraso)
+
+        cliente = por_cliente.setdefault(ci_cliente, {
+            "ci_cliente": ci_cliente,
+            "contratos": set(),
+            "cantidad": 0,
+            "monto": 0.0,
+            "max_dias_atraso": 0,
+        })
+        cliente["contratos"].add(id_contrato)
+        cliente["cantidad"] += 1
+        cliente["monto"] += monto
+        cliente["max_dias_atraso"] = max(cliente["max_dias_atraso"], dias_atraso)
+
+    for cliente in por_cliente.values():
+        cliente["contratos"] = len(cliente["contratos"])
+
+    # Los más atrasados primero
+    pagos.sort(key=lambda p: p["dias_atraso"], reverse=True)
+    ordenar = lambda items: sorted(items, key=lambda x: (x["max_dias_atraso"], x["monto"]), reverse=True)
+
+    return {
+        "actualizado_en": datetime.now(timezone.utc).isoformat(),
+        "total_atrasados": len(pagos),
+        "monto_total_atrasado": monto_total,
+        "antiguedad": antiguedad,
+        "pagos": pagos,
+        "por_contrato": ordenar(por_contrato.values()),
+        "por_cliente": ordenar(por_cliente.values()),
+    }
+
+
+def actualizar_pagos_atrasados() -> Dict[str, Any]:
+    """Tarea completa: marcar atrasados y regenerar el resumen en memoria"""
+    global _resumen_atrasos, _resumen_desactualizado
+    supabase = get_supabase_client()
+    with _lock:
+        generacion = _generacion
+        marcados = marcar_pagos_atrasados(supabase)
+        if marcados:
+            logger.info("Pagos marcados como 'Atrasado'", extra={"pagos": marcados})
+        _resumen_atrasos = construir_resumen_atrasos(supabase)
+        _resumen_desactualizado = generacion != _generacion
+        return _resumen_atrasos
+
+
+def refrescar_resumen_atrasos() -> Dict[str, Any]:
+    """Regenera el resumen si está desactualizado, p. ej. después de editar un pago"""
+    global _resumen_atrasos, _resumen_desactualizado
+    with _lock:
+        if _resumen_atrasos is None:
+            # Aún no corrió la tarea (arranque o tareas deshabilitadas)
+            return actualizar_pagos_atrasados()
+        if not _resumen_desactualizado:
+            return _resumen_atrasos
+        generacion = _generacion
+        _resumen_atrasos = construir_resumen_atrasos(get_supabase_client())
+        _resumen_desactualizado = generacion != _generacion
+        return _resumen_atrasos
+
+
+def obtener_resumen_atrasos() -> Optional[Dict[str, Any]]:
+    """Retorna el resumen en memoria o None si hay que (re)calcularlo"""
+    if _resumen_desactualizado:
+        return None
+    return _resumen_atrasos
+
+
+def invalidar_resumen_atrasos():
+    """Marca el resumen como desactualizado (se recalcula en la próxima consulta)"""
+    global _resumen_desactualizado, _generacion
+    _generacion += 1
+    _resumen_desactualizado = True
+
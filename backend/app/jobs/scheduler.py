@@ -0,0 +1,106 @@
+"""
+Planificador simple de tareas periódicas sobre el event loop de la app.
+
+Cada tarea es una función síncrona (normalmente consultas a Supabase) que se
+ejecuta en un hilo cada `intervalo_segundos`, para no bloquear las requests.
+Las funciones async (p. ej. las que usan app/storage) corren en el mismo
+event loop.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Any
+from app.core.logger import get_logger
+from app.core.metrics import job_duration_seconds, job_runs_total
+
+logger = get_logger(__name__)
+
+
+class PeriodicJob:
+    """Tarea registrada y estadísticas de sus ejecuciones"""
+
+    def __init__(self, nombre: str, intervalo_segundos: float, funcion: Callable[[], Any]):
+        self.nombre = nombre
+        self.intervalo_segundos = intervalo_segundos
+        self.funcion = funcion
+        self.ejecuciones = 0
+        self.fallos = 0
+        self.ultima_ejecucion: Optional[datetime] = None
+        self.ultimo_exito: Optional[datetime] = None
+        self.ultima_duracion_segundos: Optional[float] = None
+        self.ultimo_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def ejecutar(self):
+        """Ejecuta la tarea una vez (en un hilo si es síncrona) y registra el resultado"""
+        inicio = time.perf_counter()
+        self.ultima_ejecucion = datetime.now(timezone.utc)
+        resultado = "ok"
+        try:
+            if asyncio.iscoroutinefunction(self.funcion):
+                await self.funcion()
+            else:
+                await asyncio.to_thread(self.funcion)
+            self.ultimo_exito = datetime.now(timezone.utc)
+            self.ultimo_error = None
+        except Exception as e:
+            resultado = "error"
+            self.fallos += 1
+            self.ultimo_error = str(e)
+            logger.exception("Tarea fallida", extra={"job": self.nombre})
+        finally:
+            self.ejecuciones += 1
+            self.ultima_duracion_segundos = time.perf_counter() - inicio
+            job_duration_seconds.observe(self.ultima_duracion_segundos, job=self.nombre)
+            job_runs_total.inc(job=self.nombre, outcome=resultado)
+
+    async def _loop(self):
+        while True:
+            await self.ejecutar()
+            await asyncio.sleep(self.intervalo_segundos)
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "nombre": self.nombre,
+            "intervalo_segundos": self.intervalo_segundos,
+            "ejecuciones": self.ejecuciones,
+            "fallos": self.fallos,
+            "ultima_ejecucion": self.ultima_ejecucion.isoformat() if self.ultima_ejecucion else None,
+            "ultimo_exito": self.ultimo_exito.isoformat() if self.ultimo_exito else None,
+            "ultima_duracion_segundos": self.ultima_duracion_segundos,
+            "ultimo_error": self.ultimo_error,
+        }
+
+
+class JobScheduler:
+    """Registro de tareas periódicas; se inicia y detiene con la app"""
+
+    def __init__(self):
+        self.jobs: Dict[str, PeriodicJob] = {}
+
+    def register(self, nombre: str, intervalo_segundos: float, funcion: Callable[[], Any]) -> PeriodicJob:
+        job = PeriodicJob(nombre, intervalo_segundos, funcion)
+        self.jobs[nombre] = job
+        return job
+
+    def start(self):
+        """Lanza todas las tareas registradas (la primera ejecución es inmediata)"""
+        for job in self.jobs.values():
+            if job._task is None or job._task.done():
+                job._task = asyncio.create_task(job._loop(), name=f"job:{job.nombre}")
+
+    async def stop(self):
+        """Cancela las tareas en curso"""
+        tasks = [job._task for job in self.jobs.values() if job._task and not job._task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self.jobs.values():
+            job._task = None
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {nombre: job.estado() for nombre, job in self.jobs.items()}
+
+
+# Instancia única usada por la aplicación
+scheduler = JobScheduler()
@@ -1,21 +1,69 @@
 """
 Punto de entrada de la aplicación FastAPI
 """
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.config import get_settings
-from app.routes import usuarios, empleados, propietarios, clientes, direcciones, propiedades, imagenes_propiedad, documentos_propiedad, citas_visita, contratos_operacion, pagos, roles, desempeno_asesor, ganancias_empleado, detalle_propiedad
+from app.core.logger import configure_logging, start_logging, shutdown_logging, get_logger
+from app.core.middleware import RequestIdMiddleware, InstrumentationMiddleware, ProfilingMiddleware
+from app.core.profiler import configurar_profiler
+from app.core.health import ReadinessChecker
+from app.core import metrics
+from app.jobs.scheduler import scheduler
+from app.jobs.pagos_atrasados import actualizar_pagos_atrasados
+from app.jobs.limpieza_archivos import limpiar_archivos_huerfanos
+from app.utils.security import password_hash_stats, shutdown_password_hash_pool, token_cache
+from app.utils.dependencies import user_cache
+from app.utils.cache import all_cache_stats
+from app.utils.roles import role_registry
+from app.utils.archivos import UPLOADS_DIR
+from app.utils.estaticos import UploadsStaticFiles
+from app.utils.imagenes import shutdown_image_pool
+from app.storage import shutdown_storage
+from app.routes import usuarios, empleados, propietarios, clientes, direcciones, propiedades, imagenes_propiedad, documentos_propiedad, citas_visita, contratos_operacion, pagos, roles, desempeno_asesor, ganancias_empleado, detalle_propiedad, dashboard, diagnostico, subidas
 import os
 
 settings = get_settings()
+configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+logger = get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicia las tareas en segundo plano al arrancar y las detiene al apagar"""
+    # Un lifespan anterior en el mismo proceso pudo haber detenido el escritor de logs
+    start_logging()
+    try:
+        total_roles = await asyncio.to_thread(role_registry.cargar)
+        logger.info("Roles cargados en memoria", extra={"roles": total_roles})
+    except Exception as e:
+        # Se reintenta en la primera consulta al registro
+        logger.warning("No se pudieron cargar los roles al iniciar", extra={"error": str(e)})
+    
+    if settings.JOBS_ENABLED:
+        scheduler.register("pagos_atrasados", settings.PAGOS_ATRASADOS_INTERVALO_SEGUNDOS, actualizar_pagos_atrasados)
+        # Por si se editan roles directamente en la BD
+        scheduler.register("roles", settings.ROLES_REFRESCO_INTERVALO_SEGUNDOS, role_registry.cargar)
+        scheduler.register("limpieza_archivos", settings.LIMPIEZA_ARCHIVOS_INTERVALO_SEGUNDOS, limpiar_archivos_huerfanos)
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    shutdown_password_hash_pool()
+    shutdown_image_pool()
+    await shutdown_storage()
+    shutdown_logging()
+
 
 # Crear instancia de FastAPI
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="API REST para Sistema de Gestión Inmobiliaria",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -40,14 +88,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
 
+# 🔬 Profiling por muestreo de requests lentas (opcional)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=configurar_profiler(
+            settings.PROFILING_INTERVAL_MS,
+            settings.PROFILING_MAX_PROFILES,
+            settings.PROFILING_SLOW_MS
+        ),
+        header=settings.PROFILING_HEADER
+    )
+
+# ⏱️ Latencia y llamadas a Supabase por request (header Server-Timing)
+app.add_middleware(InstrumentationMiddleware)
+
+# 🔖 request_id por request (logs correlacionados + header X-Request-ID)
+app.add_middleware(RequestIdMiddleware, sample_rate=settings.LOG_ACCESS_SAMPLE_RATE)
+
 # 📂 Crear carpeta uploads si no existe
-uploads_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "uploads")
+uploads_dir = UPLOADS_DIR
 os.makedirs(uploads_dir, exist_ok=True)
 
-# 🖼️ Servir archivos estáticos (imágenes subidas)
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+# 🖼️ Servir archivos estáticos (imágenes subidas) con ETag, Cache-Control y Range
+app.mount(
+    "/uploads",
+    UploadsStaticFiles(
+        directory=uploads_dir,
+        precomprimidos=settings.UPLOADS_PRECOMPRESSED,
+        max_age=settings.UPLOADS_CACHE_MAX_AGE
+    ),
+    name="uploads"
+)
+
+readiness = ReadinessChecker()
 
 
 # Incluir routers
@@ -59,6 +136,7 @@ app.include_router(direcciones.router, prefix="/api", tags=["Direcciones"])
 app.include_router(propiedades.router, prefix="/api", tags=["Propiedades"])
 app.include_router(imagenes_propiedad.router, prefix="/api", tags=["Imágenes de Propiedades"])
 app.include_router(documentos_propiedad.router, prefix="/api", tags=["Documentos de Propiedades"])
+app.include_router(subidas.router, prefix="/api", tags=["Subidas Directas"])
 app.include_router(citas_visita.router, prefix="/api", tags=["Citas de Visita"])
 app.include_router(contratos_operacion.router, prefix="/api", tags=["Contratos de Operación"])
 app.include_router(pagos.router, prefix="/api", tags=["Pagos"])
@@ -66,6 +144,8 @@ app.include_router(roles.router, prefix="/api", tags=["Roles"])
 app.include_router(desempeno_asesor.router, prefix="/api", tags=["Desempeño de Asesores"])
 app.include_router(ganancias_empleado.router, prefix="/api", tags=["Ganancias de Empleados"])
 app.include_router(detalle_propiedad.router, prefix="/api", tags=["Detalle de Propiedades"])
+app.include_router(dashboard.router, prefix="/api", tags=["Dashboard"])
+app.include_router(diagnostico.router, prefix="/api", tags=["Diagnóstico"])
 
 
 @app.get("/")
@@ -78,10 +158,44 @@ async def root():
     }
 
 
+# 📈 Métricas leídas del estado de cachés, pool de bcrypt y tareas al hacer scrape
+metrics.registrar_collectors(all_cache_stats, password_hash_stats, scheduler.status)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
     """Endpoint de health check"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "password_hash_pool": password_hash_stats(),
+        "caches": {
+            "tokens": token_cache.stats(),
+            "usuarios": user_cache.stats()
+        },
+        "roles": role_registry.estado()
+    }
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness: el proceso y el event loop responden (no consulta dependencias)"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness: base de datos, storage y tareas en segundo plano.
+    Responde 503 si algo falla para que el balanceador saque la instancia.
+    """
+    estado = await readiness.estado()
+    return JSONResponse(estado, status_code=200 if estado["status"] == "ready" else 503)
 
 
 if __name__ == "__main__":
@@ -8,8 +8,10 @@ from app.schemas.cita_visita import CitaVisitaCreate, CitaVisitaUpdate, CitaVisi
 from app.schemas.pagination import PaginatedResponse, create_paginated_response
 from app.database import get_supabase_client
 from app.utils.dependencies import get_current_active_user
+from app.core.logger import get_logger
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 
 def actualizar_citas_vencidas(supabase):
@@ -34,10 +36,10 @@ def actualizar_citas_vencidas(supabase):
                     .eq("id_cita", cita["id_cita"])\
                     .execute()
             
-            print(f"✅ Se actualizaron {len(citas_a_vencer.data)} citas a estado 'Vencida'")
+            logger.info("Citas actualizadas a estado 'Vencida'", extra={"citas": len(citas_a_vencer.data)})
     
     except Exception as e:
-        print(f"Error al actualizar citas vencidas: {e}")
+        logger.warning("Error al actualizar citas vencidas", extra={"error": str(e)})
 
 
 def asignar_asesor_automaticamente(supabase):
@@ -70,7 +72,7 @@ def asignar_asesor_automaticamente(supabase):
         return asesor_con_menos_citas[0]
     
     except Exception as e:
-        print(f"Error al asignar asesor: {e}")
+        logger.warning("Error al asignar asesor", extra={"error": str(e)})
         return None
 
 
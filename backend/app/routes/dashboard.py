@@ -0,0 +1,52 @@
+"""
+Router para el dashboard financiero (agregados precalculados)
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from datetime import date
+from postgrest.exceptions import APIError
+from app.database import get_supabase_client, rpc_error_to_http
+from app.utils.dependencies import get_current_active_user
+
+router = APIRouter()
+
+
+def _inicio_mes(meses_atras: int) -> date:
+    """Primer día del mes que está `meses_atras` meses antes del actual"""
+    hoy = date.today()
+    total = hoy.year * 12 + (hoy.month - 1) - meses_atras
+    return date(total // 12, total % 12 + 1, 1)
+
+
+@router.get("/dashboard/financiero")
+async def obtener_dashboard_financiero(
+    meses: int = Query(6, ge=1, le=60, description="Meses incluidos en las series mensuales"),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Resumen financiero para el dashboard en una sola llamada.
+    
+    - **ingresos_mensuales**: pagos "Pagado" por mes (últimos `meses`)
+    - **contratos_mensuales**: contratos iniciados por mes (cantidad y monto)
+    - **pagos_por_estado**: cantidad y monto por estado de pago
+    - **comisiones**: ganancias de empleados "Pendiente" vs "Pagada"
+    - **contratos_por_tipo** / **contratos_por_estado**: cantidad y monto
+    
+    💡 Se calcula sobre el rollup diario `resumenfinancierodiario`, mantenido por
+    triggers (ver resumen_financiero.sql), por lo que no recorre el historial.
+    """
+    supabase = get_supabase_client()
+    
+    try:
+        desde = _inicio_mes(meses - 1)
+        result = supabase.rpc("obtener_dashboard_financiero", {"p_desde": desde.isoformat()}).execute()
+        
+        return {
+            "desde": desde.isoformat(),
+            "meses": meses,
+            **(result.data or {})
+        }
+    
+    except APIError as e:
+        raise rpc_error_to_http(e, "Error al obtener el dashboard")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener el dashboard: {str(e)}")
@@ -6,8 +6,32 @@ from typing import List, Optional
 from app.schemas.detalle_propiedad import DetalleCreate, DetalleUpdate, DetalleResponse
 from app.database import get_supabase_client
 from app.utils.dependencies import get_current_active_user
+from app.utils.imagenes import elegir_variante, srcset
+from app.config import get_settings
 
 router = APIRouter()
+settings = get_settings()
+
+
+def _imagenes_para_web(imagenes: List[dict], ancho: int, formato: str) -> List[dict]:
+    """
+    Reemplaza url_imagen por la variante del tamaño pedido y agrega srcset para
+    que el navegador elija según la pantalla. url_original es la copia en
+    tamaño completo sin EXIF ni GPS. Sin variantes (imagen por URL externa,
+    todavía no procesada o en un formato que Pillow no lee) ambas son la URL de
+    la fila: el original se guarda sin metadatos privados. sha256_imagen no se
+    publica. ancho_imagen / alto_imagen (de la fila) permiten reservar el
+    espacio de cada imagen en la grilla.
+    """
+    return [
+        {
+            **{campo: valor for campo, valor in imagen.items() if campo != "sha256_imagen"},
+            "url_original": elegir_variante(imagen, imagen["ancho_imagen"], "jpeg") if imagen.get("ancho_imagen") else imagen["url_imagen"],
+            "url_imagen": elegir_variante(imagen, ancho, formato),
+            "srcset": srcset(imagen, formato),
+        }
+        for imagen in imagenes
+    ]
 
 
 @router.post("/propiedades/{id_propiedad}/detalles", response_model=DetalleResponse, status_code=201)
@@ -182,6 +206,8 @@ async def listar_propiedades_publicadas(
     precio_max: Optional[float] = Query(None, ge=0, description="Precio máximo"),
     superficie_min: Optional[float] = Query(None, ge=0, description="Superficie mínima en m²"),
     superficie_max: Optional[float] = Query(None, ge=0, description="Superficie máxima en m²"),
+    ancho_imagen: Optional[int] = Query(None, ge=16, le=4096, description="Ancho de imagen a mostrar en px (default: tarjeta del catálogo)"),
+    formato_imagen: str = Query("webp", pattern="^(webp|jpeg)$", description="Formato de las imágenes"),
 ):
     """
     Lista todas las propiedades publicadas con sus detalles y filtros opcionales.
@@ -196,6 +222,11 @@ async def listar_propiedades_publicadas(
     - ciudad: Ciudad específica
     - precio_min/precio_max: Rango de precios
     - superficie_min/superficie_max: Rango de superficie
+    
+    Imágenes: url_imagen apunta a la variante de `ancho_imagen` px (default
+    IMAGE_CATALOG_WIDTH) en `formato_imagen`; url_original es el tamaño completo
+    sin metadatos (sin variantes, ambas son la URL de la imagen). Cada imagen
+    trae su ancho_imagen / alto_imagen reales.
     """
     supabase = get_supabase_client()
     
@@ -219,7 +250,7 @@ async def listar_propiedades_publicadas(
                 **prop,
                 "detalles": detalles.data[0] if detalles.data else None,
                 "direccion": direccion.data[0] if direccion.data else None,
-                "imagenes": imagenes.data if imagenes.data else []
+                "imagenes": _imagenes_para_web(imagenes.data or [], ancho_imagen or settings.IMAGE_CATALOG_WIDTH, formato_imagen)
             }
             
             # Aplicar filtros
@@ -275,12 +306,18 @@ async def listar_propiedades_publicadas(
 
 
 @router.get("/propiedades/publicadas/{id_propiedad}", response_model=dict)
-async def obtener_propiedad_publicada(id_propiedad: str):
+async def obtener_propiedad_publicada(
+    id_propiedad: str,
+    ancho_imagen: Optional[int] = Query(None, ge=16, le=4096, description="Ancho de imagen a mostrar en px (default: galería del detalle)"),
+    formato_imagen: str = Query("webp", pattern="^(webp|jpeg)$", description="Formato de las imágenes"),
+):
     """
     Obtiene una propiedad publicada específica por su ID.
     
     Endpoint PÚBLICO - No requiere autenticación (para sitio web de clientes).
-    Retorna propiedad + detalles + dirección + imágenes.
+    Retorna propiedad + detalles + dirección + imágenes (url_imagen en el tamaño
+    `ancho_imagen`, default IMAGE_DETAIL_WIDTH; url_original es el tamaño
+    completo sin metadatos; sin variantes, ambas son la URL de la imagen).
     """
     supabase = get_supabase_client()
     
@@ -321,7 +358,7 @@ async def obtener_propiedad_publicada(id_propiedad: str):
             **prop,
             "detalles": detalles.data[0] if detalles.data else None,
             "direccion": direccion.data[0] if direccion.data else None,
-            "imagenes": imagenes.data if imagenes.data else []
+            "imagenes": _imagenes_para_web(imagenes.data or [], ancho_imagen or settings.IMAGE_DETAIL_WIDTH, formato_imagen)
         }
         
         return prop_completa
@@ -0,0 +1,85 @@
+"""
+Router de diagnóstico de rendimiento (solo Bróker)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core import profiler as profiler_module
+from app.core.instrumentation import route_stats, backend_totals, route_totals
+from app.utils.dependencies import require_roles
+
+router = APIRouter()
+
+
+@router.get("/diagnostico/rutas")
+async def obtener_estadisticas_rutas(
+    current_user = Depends(require_roles("Bróker"))
+):
+    """
+    Latencia y llamadas a Supabase acumuladas por ruta desde el arranque.
+    
+    - **promedio_ms / max_ms**: latencia de la request completa
+    - **db_llamadas_promedio**: round-trips a PostgREST por request
+    - **db_promedio_ms / db_bytes_promedio**: tiempo y bytes recibidos de PostgREST
+    - **storage_***: lo mismo para Supabase Storage
+    """
+    return {
+        "backends": backend_totals.snapshot(),
+        "rutas": route_stats()
+    }
+
+
+@router.delete("/diagnostico/rutas", status_code=204)
+async def reiniciar_estadisticas_rutas(
+    current_user = Depends(require_roles("Bróker"))
+):
+    """Reinicia los acumulados (útil antes de medir un escenario)"""
+    route_totals.clear()
+    backend_totals.clear()
+    return None
+
+
+def _profiler():
+    if profiler_module.profiler is None:
+        raise HTTPException(
+            status_code=404,
+            detail="El profiling está deshabilitado (PROFILING_ENABLED=False)"
+        )
+    return profiler_module.profiler
+
+
+@router.get("/diagnostico/perfiles")
+async def listar_perfiles(
+    current_user = Depends(require_roles("Bróker"))
+):
+    """
+    Perfiles capturados (más reciente primero).
+    
+    Se captura el perfil de las requests más lentas que PROFILING_SLOW_MS y de
+    las que envían el header PROFILING_HEADER (p. ej. `X-Profile: 1`).
+    """
+    return _profiler().listar()
+
+
+@router.get("/diagnostico/perfiles/{id_perfil}")
+async def obtener_perfil(
+    id_perfil: int,
+    formato: str = Query("json", pattern="^(json|folded)$", description="folded: pilas colapsadas para flamegraph/speedscope"),
+    current_user = Depends(require_roles("Bróker"))
+):
+    """Detalle de un perfil: funciones con más muestras y pilas completas"""
+    perfil = _profiler().obtener(id_perfil)
+    if not perfil:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    
+    if formato == "folded":
+        return PlainTextResponse(profiler_module.folded(perfil))
+    return profiler_module.serializar(perfil)
+
+
+@router.delete("/diagnostico/perfiles", status_code=204)
+async def eliminar_perfiles(
+    current_user = Depends(require_roles("Bróker"))
+):
+    """Descarta los perfiles guardados"""
+    _profiler().limpiar()
+    return None
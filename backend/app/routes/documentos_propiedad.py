@@ -1,12 +1,43 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File, Form
 from typing import List, Optional
 import uuid
+from postgrest.exceptions import APIError
 from datetime import datetime
 from app.schemas.documento_propiedad import DocumentoPropiedadCreate, DocumentoPropiedadUpdate, DocumentoPropiedadResponse
 from app.database import get_supabase_client
 from app.utils.dependencies import get_current_active_user
+from app.utils.archivos import FlujoSubida, formato_coincide
+from app.config import get_settings
+from app.storage import DOCUMENTOS, get_storage
+from app.core.logger import get_logger
 
 router = APIRouter()
+logger = get_logger(__name__)
+settings = get_settings()
+
+EXTENSIONES_PERMITIDAS = ['.pdf', '.doc', '.docx', '.txt', '.jpg', '.jpeg', '.png']
+
+
+def buscar_documento_duplicado(supabase, id_propiedad: str, sha256: str) -> Optional[dict]:
+    result = supabase.table("documentopropiedad")\
+        .select("id_documento, tipo_documento, nombre_archivo_original, ruta_archivo_documento")\
+        .eq("id_propiedad", id_propiedad).eq("sha256_documento", sha256).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def documento_duplicado(existente: Optional[dict]) -> HTTPException:
+    return HTTPException(status_code=409, detail={
+        "mensaje": "La propiedad ya tiene un documento con el mismo contenido",
+        "documento": existente,
+    })
+
+
+async def _descartar(storage, clave: str):
+    """Borra un archivo recién subido que no se registró (nunca lanza)"""
+    try:
+        await storage.borrar([clave])
+    except Exception as e:
+        logger.warning("No se pudo eliminar del storage", extra={"clave": clave, "error": str(e)})
 
 
 @router.post("/documentos-propiedad/upload", response_model=DocumentoPropiedadResponse, status_code=201)
@@ -18,12 +49,17 @@ async def subir_documento_propiedad(
     current_user = Depends(get_current_active_user)
 ):
     """
-    Sube un documento a Supabase Storage y registra en la base de datos.
+    Sube un documento al almacenamiento de documentos (STORAGE_DOCUMENTS_BACKEND,
+    por defecto Supabase Storage) y lo registra en la base de datos.
     
     - **id_propiedad**: ID de la propiedad
     - **tipo_documento**: Tipo del documento
     - **observaciones_documento**: Notas adicionales
-    - **file**: Archivo a subir (PDF, Word, etc.)
+    - **file**: Archivo a subir (PDF, Word, etc.), máximo UPLOAD_MAX_DOCUMENT_BYTES
+    
+    El archivo va por bloques directo al almacenamiento (memoria constante) y
+    se calcula su SHA-256 en el camino. Si la propiedad ya tiene un documento
+    con el mismo contenido responde 409 con el documento existente.
     """
     supabase = get_supabase_client()
     
@@ -34,36 +70,43 @@ async def subir_documento_propiedad(
             raise HTTPException(status_code=404, detail="La propiedad especificada no existe")
         
         # Validar tipo de archivo
-        allowed_extensions = ['.pdf', '.doc', '.docx', '.txt', '.jpg', '.jpeg', '.png']
         file_extension = file.filename.split('.')[-1].lower()
-        if f'.{file_extension}' not in allowed_extensions:
+        if f'.{file_extension}' not in EXTENSIONES_PERMITIDAS:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Tipo de archivo no permitido. Use: {', '.join(allowed_extensions)}"
+                detail=f"Tipo de archivo no permitido. Use: {', '.join(EXTENSIONES_PERMITIDAS)}"
             )
         
-        # Leer contenido del archivo
-        file_content = await file.read()
-        
         # Generar nombre único para el archivo
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         unique_filename = f"{id_propiedad}/{timestamp}_{uuid.uuid4().hex[:8]}_{file.filename}"
         
-        # Subir a Supabase Storage (bucket: documentos-propiedades)
+        # El contenido debe corresponder a la extensión (se revisa con el primer bloque)
+        def validar_cabecera(cabecera: bytes):
+            if not formato_coincide(file_extension, cabecera):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"El contenido de '{file.filename}' no corresponde a un archivo .{file_extension}"
+                )
+        
+        # Subir por bloques al almacenamiento (sin cargar el archivo en memoria)
+        storage = get_storage(DOCUMENTOS)
+        flujo = FlujoSubida(file, settings.UPLOAD_MAX_DOCUMENT_BYTES, validar_cabecera)
         try:
-            upload_response = supabase.storage.from_("documentos-propiedades").upload(
-                path=unique_filename,
-                file=file_content,
-                file_options={"content-type": file.content_type}
-            )
+            file_url = await storage.guardar(unique_filename, flujo, file.content_type)
+        except HTTPException:
+            raise
         except Exception as storage_error:
             raise HTTPException(
                 status_code=500, 
                 detail=f"Error al subir archivo a storage: {str(storage_error)}"
             )
         
-        # Obtener URL pública del archivo
-        file_url = supabase.storage.from_("documentos-propiedades").get_public_url(unique_filename)
+        # Mismo contenido ya registrado en la propiedad: se borra la copia recién subida
+        existente = buscar_documento_duplicado(supabase, id_propiedad, flujo.sha256)
+        if existente:
+            await _descartar(storage, unique_filename)
+            raise documento_duplicado(existente)
         
         # Registrar en base de datos
         documento_data = {
@@ -71,19 +114,26 @@ async def subir_documento_propiedad(
             "tipo_documento": tipo_documento,
             "ruta_archivo_documento": file_url,
             "nombre_archivo_original": file.filename,
-            "observaciones_documento": observaciones_documento
+            "observaciones_documento": observaciones_documento,
+            "sha256_documento": flujo.sha256
         }
         
-        result = supabase.table("documentopropiedad").insert(documento_data).execute()
+        try:
+            result = supabase.table("documentopropiedad").insert(documento_data).execute()
+        except Exception as e:
+            # Sin registro en la base, el archivo quedaría huérfano
+            await _descartar(storage, unique_filename)
+            # Índice único (documentos_sha256.sql): otra subida simultánea del mismo archivo ganó
+            if isinstance(e, APIError) and e.code == "23505":
+                raise documento_duplicado(buscar_documento_duplicado(supabase, id_propiedad, flujo.sha256))
+            raise
         
         if not result.data:
-            # Intentar eliminar el archivo del storage si falla el registro
-            try:
-                supabase.storage.from_("documentos-propiedades").remove([unique_filename])
-            except:
-                pass
+            await _descartar(storage, unique_filename)
             raise HTTPException(status_code=500, detail="Error al registrar el documento en la base de datos")
         
+        logger.info("Documento subido", extra={"id_documento": result.data[0]["id_documento"], "bytes": flujo.bytes})
+        
         return result.data[0]
     
     except HTTPException:
@@ -239,7 +289,7 @@ async def eliminar_documento(
     current_user = Depends(get_current_active_user)
 ):
     """
-    Elimina un documento de la base de datos y de Supabase Storage.
+    Elimina un documento de la base de datos y del almacenamiento de documentos.
     """
     supabase = get_supabase_client()
     
@@ -252,16 +302,15 @@ async def eliminar_documento(
         documento_data = documento.data[0]
         ruta_archivo = documento_data.get("ruta_archivo_documento", "")
         
-        # Extraer path del archivo desde la URL
-        if "documentos-propiedades" in ruta_archivo:
-            # Extraer solo el path después del bucket
-            file_path = ruta_archivo.split("documentos-propiedades/")[-1].split("?")[0]
-            
+        # Extraer la clave del archivo desde la URL (None si es una URL externa)
+        storage = get_storage(DOCUMENTOS)
+        file_path = storage.clave_de_url(ruta_archivo)
+        if file_path:
             # Intentar eliminar del storage
             try:
-                supabase.storage.from_("documentos-propiedades").remove([file_path])
+                await storage.borrar([file_path])
             except Exception as storage_error:
-                print(f"Advertencia: No se pudo eliminar del storage: {storage_error}")
+                logger.warning("No se pudo eliminar del storage", extra={"error": str(storage_error)})
         
         # Eliminar de la base de datos
         result = supabase.table("documentopropiedad").delete().eq("id_documento", id_documento).execute()
@@ -1,10 +1,14 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 from app.schemas.imagen_propiedad import ImagenPropiedadCreate, ImagenPropiedadUpdate, ImagenPropiedadResponse
 from app.database import get_supabase_client
+from app.core.logger import get_logger
 from app.utils.dependencies import get_current_active_user
+from app.utils.imagenes import procesar_variantes, liberar_archivo
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 
 @router.post("/imagenes-propiedad/", response_model=ImagenPropiedadResponse, status_code=201)
@@ -182,8 +186,9 @@ async def eliminar_imagen(
     """
     Elimina una imagen de la base de datos.
     
-    ⚠️ Nota: Esto NO elimina el archivo físico del storage.
-    Deberás eliminarlo manualmente del servicio de almacenamiento.
+    Si la imagen se subió con /upload y ninguna otra usa el mismo archivo,
+    también se borra el archivo (y sus variantes) del almacenamiento.
+    ⚠️ Nota: Las imágenes registradas solo por URL no se borran del storage.
     """
     supabase = get_supabase_client()
     
@@ -199,11 +204,21 @@ async def eliminar_imagen(
         if not result.data:
             raise HTTPException(status_code=500, detail="Error al eliminar la imagen")
         
+        # El trigger de archivos_contenido.sql ya descontó la referencia
+        archivo_borrado = False
+        try:
+            archivo_borrado = await liberar_archivo(supabase, imagen.data[0].get("sha256_imagen"))
+        except Exception as e:
+            # La imagen ya se eliminó: el archivo queda para la limpieza periódica
+            logger.warning("No se pudo liberar el archivo de la imagen", extra={"id_imagen": id_imagen, "error": str(e)})
+        
         return {
             "message": "Imagen eliminada exitosamente de la base de datos",
             "id_imagen": id_imagen,
             "url_imagen": imagen.data[0]["url_imagen"],
-            "nota": "Recuerda eliminar el archivo físico del storage si es necesario"
+            "archivo_borrado": archivo_borrado,
+            "nota": "El archivo se conserva mientras otra imagen lo use" if imagen.data[0].get("sha256_imagen")
+                    else "Recuerda eliminar el archivo físico del storage si es necesario"
         }
     
     except HTTPException:
@@ -216,14 +231,78 @@ async def eliminar_imagen(
 # 📸 NUEVO: UPLOAD DE IMÁGENES DESDE MÓVIL
 # ==========================================
 
-from fastapi import UploadFile, File
-import uuid
-import os
+from fastapi import UploadFile, File, BackgroundTasks
 from datetime import datetime
+from mimetypes import guess_type
+from app.config import get_settings
+from app.storage import IMAGENES, get_storage
+from app.utils.archivos import guardar_upload, borrar_archivo, ruta_temporal, extension_imagen, clave_contenido
+from app.utils.metadatos import MetadatosIlegibles, limpiar_metadatos
+
+settings = get_settings()
+
+async def _guardar_imagen(imagen: UploadFile, semaforo: asyncio.Semaphore) -> dict:
+    """
+    Valida y guarda una imagen subida en una ruta temporal. Nunca lanza: retorna
+    el resultado del archivo (`temporal`, `clave` en el almacenamiento,
+    `url_imagen` y `sha256` si se guardó; `error` y `status` si no).
+    """
+    resultado = {"archivo": imagen.filename}
+    
+    # Validar tipo de archivo
+    if not imagen.content_type or not imagen.content_type.startswith("image/"):
+        return {**resultado, "status": 400, "error": f"El archivo '{imagen.filename}' no es una imagen válida"}
+    
+    # Se copia por bloques a un temporal local (memoria constante), se corta si
+    # supera el máximo y se calcula el SHA-256 mientras se escribe
+    temporal = ruta_temporal()
+    async with semaforo:
+        try:
+            subido = await guardar_upload(imagen, temporal, settings.UPLOAD_MAX_IMAGE_BYTES)
+        except HTTPException as e:
+            return {**resultado, "status": e.status_code, "error": e.detail}
+        except Exception as e:
+            logger.exception("Error al guardar la imagen %s", imagen.filename)
+            return {**resultado, "status": 500, "error": f"Error al guardar el archivo: {str(e)}"}
+    
+    # El formato se toma del contenido, no del nombre: mismo archivo => misma clave
+    extension = extension_imagen(subido.cabecera)
+    if extension is None:
+        await asyncio.to_thread(borrar_archivo, temporal)
+        return {**resultado, "status": 400, "error": f"El archivo '{imagen.filename}' no es una imagen válida"}
+    
+    # El almacenamiento es público: sin ubicación (GPS) ni datos del dispositivo.
+    # Si no se puede asegurar que se borraron, la imagen no se publica
+    try:
+        await asyncio.to_thread(limpiar_metadatos, temporal, extension)
+    except MetadatosIlegibles:
+        await asyncio.to_thread(borrar_archivo, temporal)
+        return {
+            **resultado, "status": 400,
+            "error": f"No se pudo leer '{imagen.filename}' para borrarle la ubicación y los datos del dispositivo"
+        }
+    except Exception as e:
+        await asyncio.to_thread(borrar_archivo, temporal)
+        logger.exception("Error al limpiar los metadatos de la imagen %s", imagen.filename)
+        return {**resultado, "status": 500, "error": f"Error al guardar el archivo: {str(e)}"}
+    
+    # Clave por contenido (del archivo tal como se subió) en el almacenamiento de
+    # imágenes (STORAGE_BACKEND): ab/<sha256>.<ext>
+    clave = clave_contenido(subido.sha256, extension)
+    url_imagen = get_storage(IMAGENES).url(clave)
+    
+    return {**resultado, "temporal": temporal, "clave": clave, "url_imagen": url_imagen, "sha256": subido.sha256}
+
+
+async def _enviar_al_almacenamiento(r: dict, semaforo: asyncio.Semaphore):
+    async with semaforo:
+        await get_storage(IMAGENES).guardar_archivo(r["clave"], r["temporal"], guess_type(r["clave"])[0])
+
 
 @router.post("/imagenes-propiedad/upload/{id_propiedad}")
 async def subir_imagenes_propiedad(
     id_propiedad: str,
+    background_tasks: BackgroundTasks,
     imagenes: List[UploadFile] = File(...),
     current_user = Depends(get_current_active_user)
 ):
@@ -232,9 +311,15 @@ async def subir_imagenes_propiedad(
     
     **Flujo:**
     1. Recibe archivos desde FormData
-    2. Valida que sean imágenes
-    3. Guarda en carpeta local o Supabase Storage
-    4. Registra URLs en base de datos
+    2. Valida y guarda las imágenes en paralelo (hasta UPLOAD_CONCURRENCY a la vez,
+       máximo UPLOAD_MAX_IMAGE_BYTES cada una), por bloques y sin cargarlas en memoria,
+       en el almacenamiento configurado (STORAGE_BACKEND: local, s3 o supabase), sin
+       la ubicación (GPS) ni los datos del dispositivo (app/utils/metadatos.py; si
+       no se pueden borrar con seguridad, la imagen se rechaza con 400)
+    3. Registra todas las URLs en base de datos con un solo INSERT. Las imágenes se
+       guardan por contenido (SHA-256): subir dos veces la misma foto no la duplica
+    4. Retorna el resultado de cada archivo: un archivo inválido no cancela a los demás
+    5. Después de responder, genera miniaturas y WebP en segundo plano (variantes_imagen)
     
     **Uso desde React Native:**
     ```javascript
@@ -256,73 +341,89 @@ async def subir_imagenes_propiedad(
     
     try:
         # 1. Verificar que la propiedad existe
-        propiedad = supabase.table("propiedad").select("*").eq("id_propiedad", id_propiedad).execute()
+        propiedad = supabase.table("propiedad").select("id_propiedad").eq("id_propiedad", id_propiedad).execute()
         if not propiedad.data:
             raise HTTPException(status_code=404, detail="Propiedad no encontrada")
         
-        imagenes_guardadas = []
+        # 2. Guardar archivos en paralelo (el orden de resultados es el de la request)
+        semaforo = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+        resultados = await asyncio.gather(*(_guardar_imagen(imagen, semaforo) for imagen in imagenes))
+        guardados = [r for r in resultados if "url_imagen" in r]
         
-        for index, imagen in enumerate(imagenes):
-            # 2. Validar tipo de archivo
-            if not imagen.content_type or not imagen.content_type.startswith("image/"):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"El archivo '{imagen.filename}' no es una imagen válida"
-                )
-            
-            # 3. Generar nombre único
-            filename = imagen.filename or "imagen.jpg"
-            extension = filename.split(".")[-1] if "." in filename else "jpg"
-            nombre_archivo = f"{uuid.uuid4()}.{extension}"
-            
-            # 4. OPCIÓN A: Guardar en carpeta local (desarrollo)
-            # Crear carpeta si no existe
-            upload_dir = os.path.join("uploads", "propiedades", str(id_propiedad))
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            file_path = os.path.join(upload_dir, nombre_archivo)
-            
-            # Guardar archivo
-            file_content = await imagen.read()
-            with open(file_path, "wb") as f:
-                f.write(file_content)
-            
-            # URL accesible (ajusta según tu configuración)
-            url_imagen = f"/uploads/propiedades/{id_propiedad}/{nombre_archivo}"
-            
-            # 5. OPCIÓN B: Supabase Storage (producción) - DESCOMENTADO CUANDO ESTÉ CONFIGURADO
-            """
-            bucket_name = "propiedades"
-            storage_path = f"{id_propiedad}/{nombre_archivo}"
-            
-            supabase.storage.from_(bucket_name).upload(
-                path=storage_path,
-                file=file_content,
-                file_options={"content-type": imagen.content_type}
+        if not guardados:
+            raise HTTPException(
+                status_code=400,
+                detail={"mensaje": "No se pudo guardar ninguna imagen", "resultados": resultados}
             )
-            
-            url_imagen = supabase.storage.from_(bucket_name).get_public_url(storage_path)
-            """
-            
-            # 6. Registrar en base de datos
-            imagen_data = {
+        
+        # 3. Registrar todas en base de datos (un solo INSERT)
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M')
+        nombre_usuario = current_user.get('nombre_usuario', 'usuario')
+        filas = [
+            {
                 "id_propiedad": id_propiedad,
-                "url_imagen": url_imagen,
-                "descripcion_imagen": f"Imagen {index + 1} - Subida por {current_user.get('nombre_usuario', 'usuario')} el {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-                "es_portada_imagen": index == 0,  # Primera imagen como portada
-                "orden_imagen": index
+                "url_imagen": r["url_imagen"],
+                "sha256_imagen": r["sha256"],
+                "descripcion_imagen": f"Imagen {orden + 1} - Subida por {nombre_usuario} el {fecha}",
+                "es_portada_imagen": orden == 0,  # Primera imagen como portada
+                "orden_imagen": orden
             }
-            
-            result = supabase.table("imagenpropiedad").insert(imagen_data).execute()
-            
-            if result.data:
-                imagenes_guardadas.append(result.data[0])
+            for orden, r in enumerate(guardados)
+        ]
+        
+        try:
+            result = supabase.table("imagenpropiedad").insert(filas).execute()
+        except Exception:
+            # Sin registro en la base, los archivos quedarían huérfanos
+            for r in guardados:
+                await asyncio.to_thread(borrar_archivo, r["temporal"])
+            raise
+        
+        # 4. Enviar al almacenamiento recién con las filas insertadas (y la referencia
+        #    contada): un borrado simultáneo del mismo contenido no lo pisa
+        envios = await asyncio.gather(
+            *(_enviar_al_almacenamiento(r, semaforo) for r in guardados), return_exceptions=True
+        )
+        # El INSERT retorna las filas en el orden enviado: cada archivo con su fila por
+        # posición (dos fotos iguales en la misma request comparten url_imagen)
+        for r, fila in zip(guardados, result.data or []):
+            r["fila"] = fila
+        ids_fallidos = []
+        for r, envio in zip(guardados, envios):
+            if isinstance(envio, Exception):
+                logger.warning("No se pudo guardar la imagen en el almacenamiento", extra={"archivo": r["archivo"], "error": str(envio)})
+                await asyncio.to_thread(borrar_archivo, r["temporal"])
+                r.update(status=500, error=f"Error al guardar el archivo: {str(envio)}")
+                r.pop("url_imagen")
+                fila = r.pop("fila", None)
+                if fila:
+                    ids_fallidos.append(fila["id_imagen"])
+        imagenes_guardadas = [r["fila"] for r in guardados if "fila" in r]
+        if ids_fallidos:
+            # Sin archivo, la fila apuntaría a una URL inexistente
+            supabase.table("imagenpropiedad").delete().in_("id_imagen", ids_fallidos).execute()
+            # Si la que fallaba era la portada, pasa a la primera que sí se guardó
+            if imagenes_guardadas and not any(fila["es_portada_imagen"] for fila in imagenes_guardadas):
+                portada = min(imagenes_guardadas, key=lambda fila: fila["orden_imagen"])
+                supabase.table("imagenpropiedad").update({"es_portada_imagen": True})\
+                    .eq("id_imagen", portada["id_imagen"]).execute()
+                portada["es_portada_imagen"] = True
+        
+        background_tasks.add_task(procesar_variantes, imagenes_guardadas)
+        for r in resultados:
+            for clave in ("temporal", "clave", "sha256", "url_imagen"):
+                r.pop(clave, None)
+            if "fila" in r:
+                r["status"] = 201
+                r["imagen"] = r.pop("fila")
         
         return {
             "mensaje": f"✅ {len(imagenes_guardadas)} imágenes subidas exitosamente",
             "propiedad_id": id_propiedad,
             "imagenes": imagenes_guardadas,
-            "portada": imagenes_guardadas[0]["url_imagen"] if imagenes_guardadas else None
+            "portada": imagenes_guardadas[0]["url_imagen"] if imagenes_guardadas else None,
+            "errores": len(resultados) - len(imagenes_guardadas),
+            "resultados": resultados
         }
     
     except HTTPException:
@@ -1,13 +1,19 @@
 """
 Router para endpoints de Pagos con PAGINACIÓN
 """
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
-from datetime import date
 from app.schemas.pago import PagoCreate, PagoUpdate, PagoResponse
 from app.schemas.pagination import PaginatedResponse, create_paginated_response
-from app.database import get_supabase_client
+from postgrest.exceptions import APIError
+from app.database import get_supabase_client, rpc_error_to_http
 from app.utils.dependencies import get_current_active_user
+from app.jobs.pagos_atrasados import (
+    obtener_resumen_atrasos,
+    refrescar_resumen_atrasos,
+    invalidar_resumen_atrasos
+)
 
 
 router = APIRouter()
@@ -23,16 +29,16 @@ async def registrar_pago(
     
     try:
         # Verificar que el contrato existe y está activo
-        contrato = supabase.table("contratooperacion").select("id_contrato_operacion, estado_contrato, precio_cierre_contrato").eq("id_contrato_operacion", pago.id_contrato_operacion).execute()
+        contrato = supabase.table("contratooperacion").select("id_contrato_operacion, estado_contrato, precio_cierre_contrato, total_pagado_contrato").eq("id_contrato_operacion", pago.id_contrato_operacion).execute()
         if not contrato.data:
             raise HTTPException(status_code=404, detail="El contrato especificado no existe")
         
         if contrato.data[0].get("estado_contrato") != "Activo":
             raise HTTPException(status_code=400, detail="Solo se pueden registrar pagos en contratos activos")
         
-        # Verificar que no se exceda el precio del contrato
-        pagos_existentes = supabase.table("pago").select("monto_pago").eq("id_contrato_operacion", pago.id_contrato_operacion).execute()
-        total_pagado = sum(float(p["monto_pago"]) for p in pagos_existentes.data)
+        # Verificar que no se exceda el precio del contrato (total mantenido por trigger,
+        # ver funciones_pagos.sql; el trigger repite la validación dentro de la transacción)
+        total_pagado = float(contrato.data[0].get("total_pagado_contrato") or 0)
         precio_contrato = float(contrato.data[0]["precio_cierre_contrato"])
         
         if total_pagado + float(pago.monto_pago) > precio_contrato:
@@ -54,10 +60,14 @@ async def registrar_pago(
         if not result.data:
             raise HTTPException(status_code=500, detail="Error al registrar el pago")
         
+        invalidar_resumen_atrasos()
+        
         return result.data[0]
     
     except HTTPException:
         raise
+    except APIError as e:
+        raise rpc_error_to_http(e, "Error")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -145,26 +155,75 @@ async def listar_pagos_dashboard(
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+async def _resumen_atrasos_vigente():
+    """Resumen de atrasos en memoria; solo se recalcula si un pago cambió"""
+    resumen = obtener_resumen_atrasos()
+    if resumen is None:
+        resumen = await asyncio.to_thread(refrescar_resumen_atrasos)
+    return resumen
+
+
 @router.get("/pagos/atrasados/lista")
 async def listar_pagos_atrasados(
+    page: int = Query(1, ge=1, description="Número de página"),
+    page_size: int = Query(30, ge=1, le=100, description="Items por página"),
     current_user = Depends(get_current_active_user)
 ):
-    """Lista pagos pendientes cuya fecha ya pasó."""
-    supabase = get_supabase_client()
+    """
+    Lista los pagos atrasados (los más antiguos primero) con paginación.
     
+    Los pagos "Pendiente" vencidos se marcan como "Atrasado" en segundo plano
+    y el reporte se sirve desde memoria (ver app/jobs/pagos_atrasados.py).
+    Incluye totales y distribución por antigüedad (1-30, 31-60, 61-90, 90+ días).
+    """
     try:
-        hoy = date.today().isoformat()
-        result = (
-            supabase.table("pago")
-            .select("*")
-            .eq("estado_pago", "Pendiente")
-            .lt("fecha_pago", hoy)
-            .execute()
+        resumen = await _resumen_atrasos_vigente()
+        pagina = create_paginated_response(
+            items=resumen["pagos"][(page - 1) * page_size:page * page_size],
+            total=resumen["total_atrasados"],
+            page=page,
+            page_size=page_size
         )
         
         return {
-            "total_atrasados": len(result.data),
-            "pagos": result.data
+            "total_atrasados": resumen["total_atrasados"],
+            "monto_total_atrasado": resumen["monto_total_atrasado"],
+            "antiguedad": resumen["antiguedad"],
+            "actualizado_en": resumen["actualizado_en"],
+            "pagos": pagina["items"],
+            **{k: v for k, v in pagina.items() if k != "items"}
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@router.get("/pagos/atrasados/resumen")
+async def resumen_pagos_atrasados(
+    agrupar: str = Query("contrato", pattern="^(contrato|cliente)$", description="Agrupar por contrato o cliente"),
+    page: int = Query(1, ge=1, description="Número de página"),
+    page_size: int = Query(30, ge=1, le=100, description="Items por página"),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Reporte de morosidad agrupado por contrato o por cliente, con paginación.
+    
+    Cada grupo trae cantidad de pagos atrasados, monto y máximo de días de atraso.
+    """
+    try:
+        resumen = await _resumen_atrasos_vigente()
+        grupos = resumen["por_contrato"] if agrupar == "contrato" else resumen["por_cliente"]
+        
+        return {
+            **create_paginated_response(
+                items=grupos[(page - 1) * page_size:page * page_size],
+                total=len(grupos),
+                page=page,
+                page_size=page_size
+            ),
+            "agrupado_por": agrupar,
+            "antiguedad": resumen["antiguedad"],
+            "actualizado_en": resumen["actualizado_en"]
         }
     
     except Exception as e:
@@ -226,10 +285,14 @@ async def actualizar_pago(
         if not result.data:
             raise HTTPException(status_code=500, detail="Error al actualizar")
         
+        invalidar_resumen_atrasos()
+        
         return result.data[0]
     
     except HTTPException:
         raise
+    except APIError as e:
+        raise rpc_error_to_http(e, "Error")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -261,9 +324,13 @@ async def eliminar_pago(
         if not result.data:
             raise HTTPException(status_code=500, detail="Error al eliminar")
         
+        invalidar_resumen_atrasos()
+        
         return None
     
     except HTTPException:
         raise
+    except APIError as e:
+        raise rpc_error_to_http(e, "Error")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
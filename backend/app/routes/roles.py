@@ -3,6 +3,7 @@ from typing import List, Optional
 from app.schemas.rol import RolCreate, RolUpdate, RolResponse
 from app.database import get_supabase_client
 from app.utils.dependencies import get_current_active_user
+from app.utils import events
 
 router = APIRouter()
 
@@ -38,6 +39,8 @@ async def crear_rol(
         if not result.data:
             raise HTTPException(status_code=500, detail="Error al crear el rol")
         
+        events.publish(events.ROL_CAMBIADO, id_rol=result.data[0]["id_rol"], rol=result.data[0])
+        
         return result.data[0]
     
     except HTTPException:
@@ -135,6 +138,8 @@ async def actualizar_rol(
         if not result.data:
             raise HTTPException(status_code=500, detail="Error al actualizar el rol")
         
+        events.publish(events.ROL_CAMBIADO, id_rol=id_rol, rol=result.data[0])
+        
         return result.data[0]
     
     except HTTPException:
@@ -176,6 +181,8 @@ async def eliminar_rol(
         if not result.data:
             raise HTTPException(status_code=500, detail="Error al eliminar el rol")
         
+        events.publish(events.ROL_CAMBIADO, id_rol=id_rol, eliminado=True)
+        
         return None
     
     except HTTPException:
@@ -0,0 +1,441 @@
+"""
+Subidas directas al almacenamiento (sin que el archivo pase por la API).
+
+1. POST /subidas/firmar: el cliente declara tamaño y SHA-256 del archivo y
+   recibe un ticket y una URL firmada de corta duración (SUBIDA_FIRMADA_SEGUNDOS).
+   Acá ya se rechazan archivos muy grandes y documentos duplicados; si una
+   imagen con ese contenido ya está en el almacenamiento, no hace falta subirla.
+2. El cliente sube el archivo a `subida.url` con `subida.metodo` y `subida.headers`.
+   - s3: URL prefirmada; S3 rechaza un tamaño o checksum distinto al declarado.
+   - supabase: signed upload URL de Storage; no verifica tamaño ni hash.
+   - local: PUT /subidas/local/{ticket}, que verifica tamaño y hash mientras
+     guarda (la API hace de intermediaria, como en desarrollo).
+   Las imágenes, y los documentos si el almacenamiento no verifica el
+   contenido, van a una clave temporal al azar (subidas/<uuid>): el cliente
+   nunca escribe en la clave final (compartida si es por contenido).
+3. POST /subidas/completar: con el ticket se verifica el archivo (tamaño y
+   formato por sus primeros bytes) y se registra la imagen o el documento.
+   Lo subido a una clave temporal se lee completo para verificar el SHA-256 y
+   recién entonces pasa a la clave final; las imágenes, sin ubicación ni datos
+   del dispositivo (app/utils/metadatos.py).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterable, Callable, Dict
+import asyncio
+import os
+import uuid
+from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
+from jose import jwt, JWTError
+from postgrest.exceptions import APIError
+from app.config import get_settings
+from app.database import get_supabase_client
+from app.core.logger import get_logger
+from app.schemas.subida import SubidaFirmadaCreate, SubidaFirmadaResponse, SubidaCompletar
+from app.storage import DOCUMENTOS, IMAGENES, Almacenamiento, get_storage
+from app.utils.archivos import (
+    TMP_DIR, FlujoSubida, borrar_archivo, clave_contenido, extension_imagen, formato_coincide, ruta_temporal
+)
+from app.utils.dependencies import get_current_active_user
+from app.utils.imagenes import procesar_variantes, liberar_archivo
+from app.utils.metadatos import MetadatosIlegibles, limpiar_metadatos
+from app.routes.documentos_propiedad import EXTENSIONES_PERMITIDAS, buscar_documento_duplicado, documento_duplicado
+
+router = APIRouter()
+logger = get_logger(__name__)
+settings = get_settings()
+
+TIPOS_ALMACENAMIENTO = {"imagen": IMAGENES, "documento": DOCUMENTOS}
+
+# Claves temporales de las subidas que se verifican al completar (la limpieza de
+# archivos huérfanos borra las que nunca se completaron)
+CARPETA_SUBIDAS = "subidas"
+
+# La extensión de la clave por contenido sale del content_type declarado;
+# al completar se verifica contra los primeros bytes del archivo
+EXTENSIONES_IMAGEN = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/heic": "heic",
+    "image/avif": "avif",
+}
+
+
+def _firmar_ticket(datos: Dict[str, Any], expira: datetime) -> str:
+    # Sin "sub": el ticket no sirve como token de acceso (ni al revés, por "tipo_token")
+    return jwt.encode({**datos, "tipo_token": "subida", "exp": expira}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def _leer_ticket(ticket: str) -> Dict[str, Any]:
+    try:
+        datos = jwt.decode(ticket, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        datos = None
+    if not datos or datos.get("tipo_token") != "subida":
+        raise HTTPException(status_code=400, detail="Ticket de subida inválido o vencido")
+    return datos
+
+
+def _validador(datos: Dict[str, Any]) -> Callable[[bytes], None]:
+    """Verifica por los primeros bytes que el archivo sea del formato declarado"""
+    def validar(cabecera: bytes):
+        if datos["tipo"] == "imagen":
+            valido = extension_imagen(cabecera) == datos["extension"]
+        else:
+            valido = formato_coincide(datos["extension"], cabecera)
+        if not valido:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El contenido de '{datos['nombre']}' no corresponde a un archivo .{datos['extension']}"
+            )
+    return validar
+
+
+async def _verificar_subida(storage: Almacenamiento, datos: Dict[str, Any], clave: str):
+    tamanio = await storage.tamanio(clave)
+    if tamanio is None:
+        raise HTTPException(status_code=400, detail="El archivo todavía no se subió al almacenamiento")
+    if tamanio != datos["bytes"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El archivo subido tiene {tamanio} bytes, se declararon {datos['bytes']}"
+        )
+    _validador(datos)(await storage.leer_cabecera(clave))
+
+
+async def _descartar(storage: Almacenamiento, clave: str):
+    try:
+        await storage.borrar([clave])
+    except Exception as e:
+        logger.warning("No se pudo eliminar del storage", extra={"clave": clave, "error": str(e)})
+
+
+async def _descargar(bloques: AsyncIterable[bytes], ruta: str):
+    await asyncio.to_thread(os.makedirs, TMP_DIR, exist_ok=True)
+    salida = await asyncio.to_thread(open, ruta, "wb")
+    try:
+        async for bloque in bloques:
+            await asyncio.to_thread(salida.write, bloque)
+    finally:
+        await asyncio.to_thread(salida.close)
+
+
+async def _borrar_metadatos(ruta: str, datos: Dict[str, Any]):
+    try:
+        await asyncio.to_thread(limpiar_metadatos, ruta, datos["extension"])
+    except MetadatosIlegibles:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No se pudo leer '{datos['nombre']}' para borrarle la ubicación y los datos del dispositivo"
+        )
+
+
+async def _mover_subida(storage: Almacenamiento, datos: Dict[str, Any]):
+    """
+    Verifica el archivo subido y, si se subió a una clave temporal, lo pasa a
+    su clave final: antes se lee completo y se compara su SHA-256 con el
+    declarado. Un archivo distinto al declarado se descarta y nunca llega a la
+    clave final. Las imágenes se bajan a un temporal y se guardan sin los
+    metadatos de ubicación y del dispositivo; si no se pueden borrar con
+    seguridad, también se descartan.
+    """
+    clave, clave_subida = datos["clave"], datos.get("clave_subida") or datos["clave"]
+    if clave_subida == clave:
+        await _verificar_subida(storage, datos, clave)
+        return
+    if not await storage.existe(clave_subida) and await storage.existe(clave):
+        # Ya copiada (el mismo ticket completado dos veces) o contenido ya subido
+        return
+
+    temporal = ruta_temporal() if datos["tipo"] == "imagen" else None
+    try:
+        try:
+            await _verificar_subida(storage, datos, clave_subida)
+            flujo = FlujoSubida(
+                storage.leer(clave_subida),
+                datos["bytes"],
+                nombre=datos["nombre"],
+                sha256_esperado=datos["sha256"],
+                bytes_esperados=datos["bytes"],
+            )
+            if temporal:
+                await _descargar(flujo, temporal)
+                await _borrar_metadatos(temporal, datos)
+            else:
+                async for _ in flujo:
+                    pass
+        except HTTPException:
+            await _descartar(storage, clave_subida)
+            raise
+
+        if not await storage.existe(clave):
+            try:
+                if temporal:
+                    await storage.guardar_archivo(clave, temporal, datos["content_type"])
+                else:
+                    await storage.copiar(clave_subida, clave, datos["content_type"])
+            except Exception:
+                # Otra subida del mismo contenido llegó primero
+                if not await storage.existe(clave):
+                    raise
+    finally:
+        if temporal:
+            await asyncio.to_thread(borrar_archivo, temporal)
+    await _descartar(storage, clave_subida)
+
+
+@router.post("/subidas/firmar", response_model=SubidaFirmadaResponse)
+async def firmar_subida(
+    solicitud: SubidaFirmadaCreate,
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Entrega una URL firmada para subir una imagen o un documento directo al
+    almacenamiento, y el ticket para registrarlo después con /subidas/completar.
+
+    - **tipo**: "imagen" o "documento"
+    - **tamanio_bytes** y **sha256**: los del archivo a subir (se verifican)
+    - **tipo_documento**: requerido para documentos
+
+    Si `subida` es null la imagen ya está en el almacenamiento: se puede
+    completar directamente sin subir nada.
+    """
+    supabase = get_supabase_client()
+
+    try:
+        # Verificar que la propiedad existe
+        propiedad = supabase.table("propiedad").select("id_propiedad").eq("id_propiedad", solicitud.id_propiedad).execute()
+        if not propiedad.data:
+            raise HTTPException(status_code=404, detail="La propiedad especificada no existe")
+
+        sha256 = solicitud.sha256.lower()
+
+        if solicitud.tipo == "imagen":
+            extension = EXTENSIONES_IMAGEN.get(solicitud.content_type)
+            if extension is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Tipo de imagen no permitido. Use: {', '.join(EXTENSIONES_IMAGEN)}"
+                )
+            max_bytes = settings.UPLOAD_MAX_IMAGE_BYTES
+            clave = clave_contenido(sha256, extension)
+        else:
+            extension = solicitud.nombre_archivo.split('.')[-1].lower()
+            if f'.{extension}' not in EXTENSIONES_PERMITIDAS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Tipo de archivo no permitido. Use: {', '.join(EXTENSIONES_PERMITIDAS)}"
+                )
+            if not solicitud.tipo_documento:
+                raise HTTPException(status_code=400, detail="tipo_documento es requerido para documentos")
+            # Duplicado detectado antes de subir un solo byte
+            existente = buscar_documento_duplicado(supabase, solicitud.id_propiedad, sha256)
+            if existente:
+                raise documento_duplicado(existente)
+            max_bytes = settings.UPLOAD_MAX_DOCUMENT_BYTES
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            clave = f"{solicitud.id_propiedad}/{timestamp}_{uuid.uuid4().hex[:8]}_{solicitud.nombre_archivo}"
+
+        if solicitud.tamanio_bytes > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"El archivo '{solicitud.nombre_archivo}' supera el máximo de {round(max_bytes / (1024 * 1024), 1):g} MB"
+            )
+
+        storage = get_storage(TIPOS_ALMACENAMIENTO[solicitud.tipo])
+        # Imágenes (se guardan sin metadatos) o almacenamiento sin verificación: el
+        # cliente sube a una clave temporal al azar
+        clave_subida = clave
+        if solicitud.tipo == "imagen" or (storage.subida_directa and not storage.verifica_subida):
+            clave_subida = f"{CARPETA_SUBIDAS}/{uuid.uuid4().hex}"
+        expira_en = datetime.now(timezone.utc) + timedelta(seconds=settings.SUBIDA_FIRMADA_SEGUNDOS)
+        ticket = _firmar_ticket({
+            "tipo": solicitud.tipo,
+            "id_propiedad": solicitud.id_propiedad,
+            "usuario": current_user["id_usuario"],
+            "clave": clave,
+            "clave_subida": clave_subida,
+            "extension": extension,
+            "nombre": solicitud.nombre_archivo,
+            "content_type": solicitud.content_type,
+            "bytes": solicitud.tamanio_bytes,
+            "sha256": sha256,
+            "descripcion": solicitud.descripcion_imagen if solicitud.tipo == "imagen" else solicitud.observaciones_documento,
+            "tipo_documento": solicitud.tipo_documento,
+        }, expira_en)
+
+        # Imágenes por contenido: si ya están en el almacenamiento no se vuelven a subir
+        subida = None
+        if solicitud.tipo != "imagen" or not await storage.existe(clave):
+            subida = await storage.firmar_subida(
+                clave_subida, solicitud.content_type, solicitud.tamanio_bytes, sha256, settings.SUBIDA_FIRMADA_SEGUNDOS
+            )
+            if subida is None:
+                # Almacenamiento local: la API recibe el archivo (PUT /subidas/local/{ticket})
+                subida = {
+                    "url": f"/api/subidas/local/{ticket}",
+                    "metodo": "PUT",
+                    "headers": {"Content-Type": solicitud.content_type},
+                }
+
+        return {
+            "ticket": ticket,
+            "expira_en": expira_en,
+            "url_archivo": storage.url(clave),
+            "subida": subida
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al firmar la subida: {str(e)}")
+
+
+@router.put("/subidas/local/{ticket}")
+async def recibir_subida_local(ticket: str, request: Request):
+    """
+    Recibe el cuerpo de una subida firmada cuando el almacenamiento es local.
+    El ticket autoriza la subida (como la firma de una URL de S3); el archivo
+    se rechaza si no tiene el tamaño y el SHA-256 declarados.
+    """
+    datos = _leer_ticket(ticket)
+    storage = get_storage(TIPOS_ALMACENAMIENTO[datos["tipo"]])
+
+    try:
+        if storage.subida_directa:
+            raise HTTPException(status_code=404, detail="Suba el archivo a la URL firmada del almacenamiento")
+
+        flujo = FlujoSubida(
+            request.stream(),
+            datos["bytes"],
+            _validador(datos),
+            nombre=datos["nombre"],
+            sha256_esperado=datos["sha256"],
+            bytes_esperados=datos["bytes"],
+        )
+        await storage.guardar(datos.get("clave_subida") or datos["clave"], flujo, datos["content_type"])
+
+        return {"mensaje": "Archivo recibido", "bytes": flujo.bytes}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al guardar el archivo: {str(e)}")
+
+
+async def _completar_imagen(supabase, storage: Almacenamiento, datos: Dict[str, Any], background_tasks: BackgroundTasks) -> dict:
+    # Completar dos veces el mismo ticket no duplica la imagen
+    existente = supabase.table("imagenpropiedad").select("*")\
+        .eq("id_propiedad", datos["id_propiedad"]).eq("sha256_imagen", datos["sha256"]).limit(1).execute()
+    if existente.data:
+        return existente.data[0]
+
+    imagenes = supabase.table("imagenpropiedad").select("id_imagen", count="exact")\
+        .eq("id_propiedad", datos["id_propiedad"]).limit(1).execute()
+    orden = imagenes.count or 0
+
+    # La fila va primero (el trigger cuenta la referencia): un borrado simultáneo
+    # del mismo contenido ya no se lleva el archivo mientras se verifica
+    result = supabase.table("imagenpropiedad").insert({
+        "id_propiedad": datos["id_propiedad"],
+        "url_imagen": storage.url(datos["clave"]),
+        "sha256_imagen": datos["sha256"],
+        "descripcion_imagen": datos.get("descripcion"),
+        "es_portada_imagen": orden == 0,
+        "orden_imagen": orden
+    }).execute()
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Error al registrar la imagen")
+    fila = result.data[0]
+
+    try:
+        await _mover_subida(storage, datos)
+    except Exception:
+        supabase.table("imagenpropiedad").delete().eq("id_imagen", fila["id_imagen"]).execute()
+        try:
+            await liberar_archivo(supabase, datos["sha256"])
+        except Exception as e:
+            logger.warning("No se pudo liberar el archivo de la subida", extra={"clave": datos["clave"], "error": str(e)})
+        raise
+
+    background_tasks.add_task(procesar_variantes, [fila])
+    return fila
+
+
+async def _completar_documento(supabase, storage: Almacenamiento, datos: Dict[str, Any]) -> dict:
+    url_archivo = storage.url(datos["clave"])
+
+    async def descartar():
+        await _descartar(storage, datos["clave"])
+
+    try:
+        await _mover_subida(storage, datos)
+    except HTTPException:
+        # Un archivo distinto al declarado no se conserva
+        if await storage.existe(datos["clave"]):
+            await descartar()
+        raise
+
+    existente = buscar_documento_duplicado(supabase, datos["id_propiedad"], datos["sha256"])
+    if existente:
+        if existente["ruta_archivo_documento"] == url_archivo:
+            # El mismo ticket completado dos veces
+            documento = supabase.table("documentopropiedad").select("*").eq("id_documento", existente["id_documento"]).execute()
+            return documento.data[0]
+        await descartar()
+        raise documento_duplicado(existente)
+
+    try:
+        result = supabase.table("documentopropiedad").insert({
+            "id_propiedad": datos["id_propiedad"],
+            "tipo_documento": datos["tipo_documento"],
+            "ruta_archivo_documento": url_archivo,
+            "nombre_archivo_original": datos["nombre"],
+            "observaciones_documento": datos.get("descripcion"),
+            "sha256_documento": datos["sha256"]
+        }).execute()
+    except APIError as e:
+        if e.code == "23505":
+            await descartar()
+            raise documento_duplicado(buscar_documento_duplicado(supabase, datos["id_propiedad"], datos["sha256"]))
+        raise
+
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Error al registrar el documento en la base de datos")
+    return result.data[0]
+
+
+@router.post("/subidas/completar")
+async def completar_subida(
+    solicitud: SubidaCompletar,
+    background_tasks: BackgroundTasks,
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Registra una subida directa terminada (imagenpropiedad o documentopropiedad).
+
+    Verifica que el archivo esté en el almacenamiento con el tamaño declarado y
+    que sus primeros bytes correspondan al formato (y su SHA-256, si el
+    almacenamiento no lo verificó al subirlo). Las imágenes generan sus
+    variantes en segundo plano, igual que /imagenes-propiedad/upload.
+    """
+    datos = _leer_ticket(solicitud.ticket)
+    if datos["usuario"] != current_user["id_usuario"]:
+        raise HTTPException(status_code=403, detail="El ticket de subida pertenece a otro usuario")
+
+    supabase = get_supabase_client()
+    storage = get_storage(TIPOS_ALMACENAMIENTO[datos["tipo"]])
+
+    try:
+        if datos["tipo"] == "imagen":
+            imagen = await _completar_imagen(supabase, storage, datos, background_tasks)
+            return {"mensaje": "✅ Imagen registrada", "imagen": imagen}
+
+        documento = await _completar_documento(supabase, storage, datos)
+        return {"mensaje": "✅ Documento registrado", "documento": documento}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al completar la subida: {str(e)}")
@@ -17,11 +17,13 @@ from app.schemas.usuario import (
     TokenWithUser
 )
 from app.utils.security import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token
 )
 from app.utils.dependencies import get_current_active_user
+from app.utils.roles import role_registry
+from app.utils import events
 from app.config import get_settings
 
 settings = get_settings()
@@ -58,17 +60,16 @@ async def crear_usuario(
                 detail="El empleado no existe"
             )
         
-        # Verificar si el rol existe
-        rol = supabase.table("rol").select("*").eq("id_rol", usuario.id_rol).execute()
-        
-        if not rol.data or len(rol.data) == 0:
+        # Verificar si el rol existe (registro en memoria)
+        await role_registry.asegurar_cargado()
+        if not role_registry.get(usuario.id_rol):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="El rol no existe"
             )
         
         # Hash de la contraseña
-        hashed_password = get_password_hash(usuario.contrasenia_usuario)
+        hashed_password = await get_password_hash_async(usuario.contrasenia_usuario)
         
         # Crear usuario
         nuevo_usuario = {
@@ -188,9 +189,9 @@ async def actualizar_usuario(
             update_data["ci_empleado"] = usuario_update.ci_empleado
         
         if usuario_update.id_rol is not None:
-            # Verificar si el rol existe
-            rol = supabase.table("rol").select("*").eq("id_rol", usuario_update.id_rol).execute()
-            if not rol.data or len(rol.data) == 0:
+            # Verificar si el rol existe (registro en memoria)
+            await role_registry.asegurar_cargado()
+            if not role_registry.get(usuario_update.id_rol):
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="El rol no existe"
@@ -208,7 +209,7 @@ async def actualizar_usuario(
             update_data["nombre_usuario"] = usuario_update.nombre_usuario
         
         if usuario_update.contrasenia_usuario is not None:
-            update_data["contrasenia_usuario"] = get_password_hash(usuario_update.contrasenia_usuario)
+            update_data["contrasenia_usuario"] = await get_password_hash_async(usuario_update.contrasenia_usuario)
         
         if usuario_update.es_activo_usuario is not None:
             update_data["es_activo_usuario"] = usuario_update.es_activo_usuario
@@ -228,6 +229,8 @@ async def actualizar_usuario(
                 detail="Error al actualizar usuario"
             )
         
+        events.publish(events.USUARIO_CAMBIADO, id_usuario=str(id_usuario))
+        
         return response.data[0]
         
     except HTTPException:
@@ -269,6 +272,8 @@ async def desactivar_usuario(
                 detail="Error al desactivar usuario"
             )
         
+        events.publish(events.USUARIO_CAMBIADO, id_usuario=str(id_usuario))
+        
         return {"message": "Usuario desactivado exitosamente", "id_usuario": str(id_usuario)}
         
     except HTTPException:
@@ -302,7 +307,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         usuario = response.data[0]
         
         # Verificar contraseña
-        if not verify_password(form_data.password, usuario["contrasenia_usuario"]):
+        if not await verify_password_async(form_data.password, usuario["contrasenia_usuario"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Credenciales incorrectas",
@@ -347,13 +352,8 @@ async def obtener_usuario_actual(current_user: dict = Depends(get_current_active
     """
     Obtener información del usuario autenticado actualmente
     """
-    print("🔍 [DEBUG /me] ========== Endpoint /me llamado ==========")
-    print(f"📦 [DEBUG /me] current_user keys: {list(current_user.keys())}")
-    
     # Remover la contraseña antes de retornar
     user_data = {**current_user}
     user_data.pop('contrasenia_usuario', None)
     
-    print(f"✅ [DEBUG /me] user_data sin contraseña, keys: {list(user_data.keys())}")
-    print(f"✅ [DEBUG /me] ========== Retornando ==========")
     return user_data
@@ -59,6 +59,8 @@ class ContratoOperacionUpdate(BaseModel):
 
 class ContratoOperacionResponse(ContratoOperacionBase):
     id_contrato_operacion: str
+    total_pagado_contrato: Optional[Decimal] = None  # Mantenido por trigger sobre pago
+    saldo_pendiente_contrato: Optional[Decimal] = None
     
     class Config:
         from_attributes = True
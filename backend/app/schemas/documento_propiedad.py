@@ -28,6 +28,7 @@ class DocumentoPropiedadResponse(DocumentoPropiedadBase):
     id_documento: str
     id_propiedad: str
     fecha_subida_documento: Optional[datetime] = None
+    sha256_documento: Optional[str] = None  # solo documentos subidos con /upload
 
     class Config:
         from_attributes = True
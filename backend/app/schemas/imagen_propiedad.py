@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 
@@ -28,6 +28,9 @@ class ImagenPropiedadResponse(ImagenPropiedadBase):
     """Schema para respuesta de imagen"""
     id_imagen: str
     id_propiedad: str
+    variantes_imagen: Optional[Dict[str, Any]] = None  # tamaños generados (ver app/utils/imagenes.py)
+    ancho_imagen: Optional[int] = None  # px, ya orientada (None hasta que se procesa)
+    alto_imagen: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+from datetime import datetime
+
+
+class SubidaFirmadaCreate(BaseModel):
+    """Schema para pedir una URL de subida directa al almacenamiento"""
+    tipo: Literal["imagen", "documento"]
+    id_propiedad: str
+    nombre_archivo: str = Field(..., min_length=1, max_length=200)
+    content_type: str
+    tamanio_bytes: int = Field(..., gt=0)
+    sha256: str = Field(..., pattern=r"^[0-9a-fA-F]{64}$", description="SHA-256 del archivo en hexadecimal")
+    descripcion_imagen: Optional[str] = None
+    tipo_documento: Optional[str] = None  # requerido si tipo = "documento"
+    observaciones_documento: Optional[str] = None
+
+
+class SubidaFirmadaResponse(BaseModel):
+    """Schema de respuesta: cómo subir el archivo y el ticket para completarla"""
+    ticket: str
+    expira_en: datetime
+    url_archivo: str
+    subida: Optional[Dict[str, Any]] = None  # None: el contenido ya está en el almacenamiento
+
+
+class SubidaCompletar(BaseModel):
+    """Schema para registrar una subida directa terminada"""
+    ticket: str
@@ -0,0 +1,66 @@
+"""
+Almacenamiento de archivos subidos (imágenes y documentos de propiedades).
+
+El backend de cada tipo se elige en Settings:
+- STORAGE_BACKEND: imágenes (default "local", carpeta uploads/)
+- STORAGE_DOCUMENTS_BACKEND: documentos (default "supabase")
+
+Backends disponibles: "local" (disco, una sola instancia), "s3" (AWS S3 o
+compatible como MinIO; requiere boto3) y "supabase" (Supabase Storage).
+Con "s3" o "supabase" varias instancias de la API comparten los archivos.
+"""
+import os
+from typing import Dict
+from app.config import get_settings
+from app.storage.base import Almacenamiento, ObjetoAlmacenado, leer_archivo
+from app.storage.local import AlmacenamientoLocal
+from app.storage.supabase import AlmacenamientoSupabase
+from app.utils.archivos import UPLOADS_DIR
+
+settings = get_settings()
+
+IMAGENES = "imagenes"
+DOCUMENTOS = "documentos"
+
+# Bucket de Supabase Storage de cada tipo
+BUCKETS_SUPABASE = {IMAGENES: "imagenes-propiedades", DOCUMENTOS: "documentos-propiedades"}
+
+_almacenes: Dict[str, Almacenamiento] = {}
+
+
+def _crear(tipo: str, backend: str) -> Almacenamiento:
+    if backend == "local":
+        return AlmacenamientoLocal(os.path.join(UPLOADS_DIR, tipo), f"/uploads/{tipo}")
+    if backend == "s3":
+        from app.storage.s3 import AlmacenamientoS3  # boto3 es opcional
+        return AlmacenamientoS3(settings.S3_BUCKET, prefijo=f"{tipo}/")
+    if backend == "supabase":
+        return AlmacenamientoSupabase(BUCKETS_SUPABASE[tipo])
+    raise ValueError(f"Backend de almacenamiento desconocido: '{backend}' (use local, s3 o supabase)")
+
+
+def get_storage(tipo: str = IMAGENES) -> Almacenamiento:
+    """Almacén configurado para `tipo` ("imagenes" o "documentos")"""
+    if tipo not in _almacenes:
+        backend = settings.STORAGE_DOCUMENTS_BACKEND if tipo == DOCUMENTOS else settings.STORAGE_BACKEND
+        _almacenes[tipo] = _crear(tipo, backend)
+    return _almacenes[tipo]
+
+
+async def shutdown_storage():
+    for almacen in _almacenes.values():
+        await almacen.cerrar()
+    _almacenes.clear()
+
+
+__all__ = [
+    "Almacenamiento",
+    "AlmacenamientoLocal",
+    "AlmacenamientoSupabase",
+    "DOCUMENTOS",
+    "IMAGENES",
+    "ObjetoAlmacenado",
+    "get_storage",
+    "leer_archivo",
+    "shutdown_storage",
+]
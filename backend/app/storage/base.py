@@ -0,0 +1,127 @@
+"""
+Interfaz común de los backends de almacenamiento.
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, NamedTuple, Optional
+import anyio
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class ObjetoAlmacenado(NamedTuple):
+    clave: str
+    bytes: int
+    modificado: datetime  # con zona horaria (UTC)
+
+
+class Almacenamiento(ABC):
+    """
+    Almacén de archivos direccionados por clave ("ab/<sha256>.jpg",
+    "<id_propiedad>/contrato.pdf"). Todas las operaciones son async y los
+    contenidos viajan por bloques: nunca se carga un archivo entero en memoria.
+    """
+
+    nombre: str = ""
+    # True si firmar_subida da URLs para que el cliente suba sin pasar por la API
+    subida_directa: bool = False
+    # True si el almacenamiento rechaza una subida firmada con otro tamaño o SHA-256
+    # (si no, el cliente sube a una clave temporal y la API verifica antes de copiar)
+    verifica_subida: bool = False
+
+    @abstractmethod
+    async def guardar(self, clave: str, bloques: AsyncIterable[bytes], content_type: Optional[str] = None) -> str:
+        """Guarda el contenido leído de `bloques` y retorna su URL pública"""
+
+    async def guardar_archivo(self, clave: str, ruta: str, content_type: Optional[str] = None) -> str:
+        """
+        Guarda un archivo local y lo borra (o lo mueve, si el backend es local).
+        Retorna la URL pública.
+        """
+        url = await self.guardar(clave, leer_archivo(ruta), content_type)
+        await asyncio.to_thread(os.remove, ruta)
+        return url
+
+    @abstractmethod
+    def leer(self, clave: str) -> AsyncIterator[bytes]:
+        """Contenido por bloques. Lanza FileNotFoundError si la clave no existe"""
+
+    @abstractmethod
+    async def existe(self, clave: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def tamanio(self, clave: str) -> Optional[int]:
+        """Tamaño en bytes; None si la clave no existe"""
+
+    async def leer_cabecera(self, clave: str, n: int = 16) -> bytes:
+        """Primeros `n` bytes (para reconocer el formato sin descargar todo)"""
+        cabecera = b""
+        bloques = self.leer(clave)
+        try:
+            async for bloque in bloques:
+                cabecera += bloque
+                if len(cabecera) >= n:
+                    break
+        finally:
+            await bloques.aclose()
+        return cabecera[:n]
+
+    async def firmar_subida(
+        self, clave: str, content_type: str, tamanio_bytes: int, sha256: str, expira_segundos: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Subida directa del cliente al almacenamiento, sin pasar por la API:
+        {"url", "metodo", "headers"} que el cliente usa tal cual con el archivo
+        como cuerpo. None si el backend no la soporta (se usa la API como
+        intermediaria, ver app/routes/subidas.py).
+        """
+        return None
+
+    async def copiar(self, origen: str, destino: str, content_type: Optional[str] = None) -> str:
+        """Copia `origen` en `destino` y retorna la URL pública de `destino`"""
+        return await self.guardar(destino, self.leer(origen), content_type)
+
+    @abstractmethod
+    async def borrar(self, claves: List[str]):
+        """Borra las claves dadas (las que no existen se ignoran)"""
+
+    @abstractmethod
+    def recorrer(self, prefijo: str = "") -> AsyncIterator[ObjetoAlmacenado]:
+        """
+        Objetos cuyas claves empiezan con `prefijo`, a medida que se listan
+        (por carpeta o por página): recorrer todo el almacén no lo carga en memoria.
+        """
+
+    async def listar(self, prefijo: str) -> List[str]:
+        """Claves que empiezan con `prefijo`"""
+        return [objeto.clave async for objeto in self.recorrer(prefijo)]
+
+    @abstractmethod
+    def url(self, clave: str) -> str:
+        """URL pública de la clave"""
+
+    @abstractmethod
+    def clave_de_url(self, url: str) -> Optional[str]:
+        """Clave de una URL de este almacén; None si la URL no le pertenece"""
+
+    def ruta_local(self, clave: str) -> Optional[str]:
+        """Ruta en disco del archivo si el backend guarda en disco local"""
+        return None
+
+    async def cerrar(self):
+        """Libera conexiones (al apagar la aplicación)"""
+
+
+async def leer_archivo(ruta: str, chunk_bytes: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Lee un archivo local por bloques sin bloquear el event loop"""
+    chunk_bytes = chunk_bytes or settings.UPLOAD_CHUNK_BYTES
+    async with await anyio.open_file(ruta, "rb") as archivo:
+        while True:
+            bloque = await archivo.read(chunk_bytes)
+            if not bloque:
+                return
+            yield bloque
@@ -0,0 +1,117 @@
+"""
+Backend en disco local: los archivos quedan bajo uploads/ y se sirven en
+/uploads (ver app/utils/estaticos.py). Sirve para desarrollo y para una sola
+instancia; con varias instancias usar "s3" o "supabase".
+"""
+import asyncio
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, List, Optional, Tuple
+from app.storage.base import Almacenamiento, ObjetoAlmacenado, leer_archivo
+from app.utils.archivos import TMP_DIR, borrar_archivo, ruta_temporal
+
+
+class AlmacenamientoLocal(Almacenamiento):
+    nombre = "local"
+
+    def __init__(self, directorio: str, url_base: str):
+        self.directorio = directorio
+        self.url_base = url_base.rstrip("/")
+
+    def _ruta(self, clave: str) -> str:
+        relativa = os.path.normpath(clave)
+        if relativa.startswith("..") or os.path.isabs(relativa):
+            raise ValueError(f"Clave inválida: {clave}")
+        return os.path.join(self.directorio, relativa)
+
+    def _mover(self, origen: str, destino: str):
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # os.replace es atómico en el mismo disco; shutil.move copia si no lo es
+        try:
+            os.replace(origen, destino)
+        except OSError:
+            shutil.move(origen, destino)
+
+    async def guardar(self, clave: str, bloques: AsyncIterable[bytes], content_type: Optional[str] = None) -> str:
+        # Se escribe en un temporal y se mueve al final: nunca se sirve un archivo a medias
+        destino = self._ruta(clave)
+        temporal = ruta_temporal()
+        await asyncio.to_thread(os.makedirs, TMP_DIR, exist_ok=True)
+        salida = await asyncio.to_thread(open, temporal, "wb")
+        try:
+            async for bloque in bloques:
+                await asyncio.to_thread(salida.write, bloque)
+            await asyncio.to_thread(salida.close)
+            await asyncio.to_thread(self._mover, temporal, destino)
+        except BaseException:
+            await asyncio.to_thread(salida.close)
+            await asyncio.to_thread(borrar_archivo, temporal)
+            raise
+        return self.url(clave)
+
+    async def guardar_archivo(self, clave: str, ruta: str, content_type: Optional[str] = None) -> str:
+        # Si el archivo ya existía, el reemplazo deja el mismo contenido (claves por hash)
+        await asyncio.to_thread(self._mover, ruta, self._ruta(clave))
+        return self.url(clave)
+
+    async def leer(self, clave: str) -> AsyncIterator[bytes]:
+        async for bloque in leer_archivo(self._ruta(clave)):
+            yield bloque
+
+    async def existe(self, clave: str) -> bool:
+        return await asyncio.to_thread(os.path.isfile, self._ruta(clave))
+
+    async def tamanio(self, clave: str) -> Optional[int]:
+        try:
+            return await asyncio.to_thread(os.path.getsize, self._ruta(clave))
+        except FileNotFoundError:
+            return None
+
+    async def borrar(self, claves: List[str]):
+        for clave in claves:
+            await asyncio.to_thread(borrar_archivo, self._ruta(clave))
+
+    @staticmethod
+    def _leer_carpeta(carpeta: str) -> Tuple[List[Tuple[str, os.stat_result]], List[str]]:
+        archivos, subcarpetas = [], []
+        try:
+            with os.scandir(carpeta) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        subcarpetas.append(entrada.path)
+                    elif entrada.is_file(follow_symlinks=False):
+                        archivos.append((entrada.path, entrada.stat(follow_symlinks=False)))
+        except FileNotFoundError:
+            pass
+        return archivos, subcarpetas
+
+    async def recorrer(self, prefijo: str = "") -> AsyncIterator[ObjetoAlmacenado]:
+        # Una carpeta por vez ("ab/<sha256>" -> solo ab/): las claves por contenido
+        # reparten los archivos en 256 carpetas, ninguna crece sin límite
+        carpeta_prefijo = os.path.dirname(prefijo)
+        pendientes = [self._ruta(carpeta_prefijo) if carpeta_prefijo else self.directorio]
+        while pendientes:
+            archivos, subcarpetas = await asyncio.to_thread(self._leer_carpeta, pendientes.pop())
+            pendientes += subcarpetas
+            for ruta, stat in archivos:
+                clave = os.path.relpath(ruta, self.directorio).replace(os.sep, "/")
+                if clave.startswith(prefijo):
+                    yield ObjetoAlmacenado(
+                        clave, stat.st_size, datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+                    )
+
+    def url(self, clave: str) -> str:
+        return f"{self.url_base}/{clave}"
+
+    def clave_de_url(self, url: str) -> Optional[str]:
+        if not url or not url.startswith(self.url_base + "/"):
+            return None
+        clave = url[len(self.url_base) + 1:].split("?")[0]
+        relativa = os.path.normpath(clave)
+        if relativa.startswith("..") or os.path.isabs(relativa):
+            return None
+        return clave
+
+    def ruta_local(self, clave: str) -> Optional[str]:
+        return self._ruta(clave)
@@ -0,0 +1,217 @@
+"""
+Backend S3 (AWS S3, MinIO, Cloudflare R2 u otro compatible).
+
+boto3 es opcional: solo se importa si STORAGE_BACKEND / STORAGE_DOCUMENTS_BACKEND
+es "s3". boto3 es bloqueante, así que cada llamada corre en un hilo; las
+subidas por streaming usan multipart upload en partes de S3_PART_BYTES.
+
+Para probar en local con MinIO:
+    docker run -p 9000:9000 -e MINIO_ROOT_USER=minio -e MINIO_ROOT_PASSWORD=minio123 minio/minio server /data
+    S3_ENDPOINT_URL=http://localhost:9000 S3_ACCESS_KEY_ID=minio S3_SECRET_ACCESS_KEY=minio123 S3_BUCKET=inmobiliaria
+"""
+import asyncio
+import base64
+import os
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+from app.config import get_settings
+from app.storage.base import Almacenamiento, ObjetoAlmacenado
+
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+    BOTO3_DISPONIBLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    BOTO3_DISPONIBLE = False
+
+settings = get_settings()
+
+# S3 exige partes de al menos 5 MB (salvo la última)
+_MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+class AlmacenamientoS3(Almacenamiento):
+    nombre = "s3"
+    subida_directa = True
+    verifica_subida = True
+
+    def __init__(self, bucket: str, prefijo: str = ""):
+        if not BOTO3_DISPONIBLE:
+            raise RuntimeError("El backend de almacenamiento 's3' requiere boto3 (pip install boto3)")
+        if not bucket:
+            raise RuntimeError("Falta configurar S3_BUCKET")
+        self.bucket = bucket
+        self.prefijo = prefijo
+        self.part_bytes = max(settings.S3_PART_BYTES, _MIN_PART_BYTES)
+        # Variables vacías en el .env equivalen a no configuradas
+        endpoint = settings.S3_ENDPOINT_URL or None
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            # Estilo path: MinIO y otros compatibles no resuelven <bucket>.<host>
+            config=Config(s3={"addressing_style": "path" if endpoint else "auto"}),
+        )
+        if settings.S3_PUBLIC_URL:
+            self.url_base = settings.S3_PUBLIC_URL.rstrip("/")
+        elif endpoint:
+            self.url_base = f"{endpoint.rstrip('/')}/{bucket}"
+        else:
+            self.url_base = f"https://{bucket}.s3.{settings.S3_REGION}.amazonaws.com"
+
+    def _key(self, clave: str) -> str:
+        return self.prefijo + clave
+
+    def _extra(self, content_type: Optional[str]) -> dict:
+        return {"ContentType": content_type} if content_type else {}
+
+    async def guardar(self, clave: str, bloques: AsyncIterable[bytes], content_type: Optional[str] = None) -> str:
+        key = self._key(clave)
+        buffer = bytearray()
+        partes: List[dict] = []
+        upload_id: Optional[str] = None
+        try:
+            async for bloque in bloques:
+                buffer += bloque
+                if len(buffer) < self.part_bytes:
+                    continue
+                if upload_id is None:
+                    respuesta = await asyncio.to_thread(
+                        self.client.create_multipart_upload, Bucket=self.bucket, Key=key, **self._extra(content_type)
+                    )
+                    upload_id = respuesta["UploadId"]
+                parte = await asyncio.to_thread(
+                    self.client.upload_part, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=len(partes) + 1, Body=bytes(buffer),
+                )
+                partes.append({"PartNumber": len(partes) + 1, "ETag": parte["ETag"]})
+                buffer.clear()
+
+            if upload_id is None:
+                # Archivo chico: una sola llamada
+                await asyncio.to_thread(
+                    self.client.put_object, Bucket=self.bucket, Key=key, Body=bytes(buffer), **self._extra(content_type)
+                )
+                return self.url(clave)
+
+            if buffer:
+                parte = await asyncio.to_thread(
+                    self.client.upload_part, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=len(partes) + 1, Body=bytes(buffer),
+                )
+                partes.append({"PartNumber": len(partes) + 1, "ETag": parte["ETag"]})
+            await asyncio.to_thread(
+                self.client.complete_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": partes},
+            )
+        except BaseException:
+            # Sin abort, las partes subidas quedan ocupando espacio en el bucket
+            if upload_id is not None:
+                await asyncio.to_thread(
+                    self.client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id
+                )
+            raise
+        return self.url(clave)
+
+    async def guardar_archivo(self, clave: str, ruta: str, content_type: Optional[str] = None) -> str:
+        # upload_file ya hace multipart en paralelo para archivos grandes
+        await asyncio.to_thread(
+            self.client.upload_file, ruta, self.bucket, self._key(clave), ExtraArgs=self._extra(content_type)
+        )
+        await asyncio.to_thread(os.remove, ruta)
+        return self.url(clave)
+
+    async def leer(self, clave: str) -> AsyncIterator[bytes]:
+        try:
+            respuesta = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=self._key(clave))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise FileNotFoundError(clave) from e
+            raise
+        cuerpo = respuesta["Body"]
+        try:
+            while True:
+                bloque = await asyncio.to_thread(cuerpo.read, settings.UPLOAD_CHUNK_BYTES)
+                if not bloque:
+                    return
+                yield bloque
+        finally:
+            cuerpo.close()
+
+    async def existe(self, clave: str) -> bool:
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._key(clave))
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return False
+            raise
+
+    async def tamanio(self, clave: str) -> Optional[int]:
+        try:
+            respuesta = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._key(clave))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return respuesta["ContentLength"]
+
+    async def leer_cabecera(self, clave: str, n: int = 16) -> bytes:
+        respuesta = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=self._key(clave), Range=f"bytes=0-{n - 1}"
+        )
+        return await asyncio.to_thread(respuesta["Body"].read)
+
+    async def firmar_subida(
+        self, clave: str, content_type: str, tamanio_bytes: int, sha256: str, expira_segundos: int
+    ) -> Optional[Dict[str, Any]]:
+        # Tamaño y checksum quedan firmados: S3 rechaza un cuerpo distinto al declarado
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(clave),
+                "ContentType": content_type,
+                "ContentLength": tamanio_bytes,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=expira_segundos,
+        )
+        return {
+            "url": url,
+            "metodo": "PUT",
+            "headers": {"Content-Type": content_type, "x-amz-checksum-sha256": checksum},
+        }
+
+    async def borrar(self, claves: List[str]):
+        # delete_objects acepta hasta 1000 claves por llamada
+        for inicio in range(0, len(claves), 1000):
+            objetos = [{"Key": self._key(clave)} for clave in claves[inicio:inicio + 1000]]
+            await asyncio.to_thread(
+                self.client.delete_objects, Bucket=self.bucket, Delete={"Objects": objetos, "Quiet": True}
+            )
+
+    async def recorrer(self, prefijo: str = "") -> AsyncIterator[ObjetoAlmacenado]:
+        paginas = iter(self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self._key(prefijo)
+        ))
+        while True:
+            # Cada página (hasta 1000 objetos) es una llamada bloqueante
+            pagina = await asyncio.to_thread(next, paginas, None)
+            if pagina is None:
+                return
+            for objeto in pagina.get("Contents", []):
+                yield ObjetoAlmacenado(objeto["Key"][len(self.prefijo):], objeto["Size"], objeto["LastModified"])
+
+    def url(self, clave: str) -> str:
+        return f"{self.url_base}/{self._key(clave)}"
+
+    def clave_de_url(self, url: str) -> Optional[str]:
+        inicio = f"{self.url_base}/{self.prefijo}"
+        if not url or not url.startswith(inicio):
+            return None
+        return url[len(inicio):].split("?")[0] or None
@@ -0,0 +1,152 @@
+"""
+Backend Supabase Storage.
+
+Usa la API REST de Storage con un cliente httpx async (storage3 es síncrono
+y necesita el archivo entero en memoria): las subidas y descargas van por
+bloques y no ocupan hilos. Los buckets deben ser públicos.
+"""
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+from urllib.parse import quote
+import httpx
+from app.config import get_settings
+from app.storage.base import Almacenamiento, ObjetoAlmacenado
+
+settings = get_settings()
+
+# Máximo de objetos por página en object/list
+_PAGINA_LISTADO = 1000
+
+
+class AlmacenamientoSupabase(Almacenamiento):
+    nombre = "supabase"
+    subida_directa = True
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+        self.url_storage = f"{settings.SUPABASE_URL.rstrip('/')}/storage/v1"
+        self.url_base = f"{self.url_storage}/object/public/{bucket}"
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.url_storage,
+                headers={"apikey": settings.SUPABASE_KEY, "Authorization": f"Bearer {settings.SUPABASE_KEY}"},
+                timeout=httpx.Timeout(30.0, connect=5.0),
+            )
+        return self._client
+
+    def _objeto(self, clave: str) -> str:
+        return f"/object/{self.bucket}/{quote(clave)}"
+
+    async def guardar(self, clave: str, bloques: AsyncIterable[bytes], content_type: Optional[str] = None) -> str:
+        response = await self.client.post(
+            self._objeto(clave),
+            content=bloques,
+            headers={"content-type": content_type or "application/octet-stream", "x-upsert": "true"},
+        )
+        response.raise_for_status()
+        return self.url(clave)
+
+    async def leer(self, clave: str) -> AsyncIterator[bytes]:
+        async with self.client.stream("GET", self._objeto(clave)) as response:
+            if response.status_code in (400, 404):
+                # Storage responde 400 con statusCode "404" para objetos que no existen
+                raise FileNotFoundError(clave)
+            response.raise_for_status()
+            async for bloque in response.aiter_bytes(settings.UPLOAD_CHUNK_BYTES):
+                yield bloque
+
+    async def existe(self, clave: str) -> bool:
+        response = await self.client.head(self._objeto(clave))
+        if response.status_code in (400, 404):
+            return False
+        response.raise_for_status()
+        return True
+
+    async def tamanio(self, clave: str) -> Optional[int]:
+        response = await self.client.head(self._objeto(clave))
+        if response.status_code in (400, 404):
+            return None
+        response.raise_for_status()
+        return int(response.headers["content-length"])
+
+    async def leer_cabecera(self, clave: str, n: int = 16) -> bytes:
+        response = await self.client.get(self._objeto(clave), headers={"range": f"bytes=0-{n - 1}"})
+        response.raise_for_status()
+        return response.content[:n]
+
+    async def firmar_subida(
+        self, clave: str, content_type: str, tamanio_bytes: int, sha256: str, expira_segundos: int
+    ) -> Optional[Dict[str, Any]]:
+        # Storage no verifica tamaño ni hash: `clave` es temporal y sin upsert (no
+        # reemplaza nada); el archivo se verifica antes de copiarlo a su clave final
+        response = await self.client.post(f"/object/upload/sign/{self.bucket}/{quote(clave)}", json={})
+        response.raise_for_status()
+        return {
+            "url": f"{self.url_storage}{response.json()['url']}",
+            "metodo": "PUT",
+            "headers": {"Content-Type": content_type},
+        }
+
+    async def copiar(self, origen: str, destino: str, content_type: Optional[str] = None) -> str:
+        # Copia dentro del bucket, sin descargar; falla si `destino` ya existe
+        response = await self.client.post(
+            "/object/copy", json={"bucketId": self.bucket, "sourceKey": origen, "destinationKey": destino}
+        )
+        response.raise_for_status()
+        return self.url(destino)
+
+    async def borrar(self, claves: List[str]):
+        if not claves:
+            return
+        response = await self.client.request("DELETE", f"/object/{self.bucket}", json={"prefixes": claves})
+        response.raise_for_status()
+
+    async def recorrer(self, prefijo: str = "") -> AsyncIterator[ObjetoAlmacenado]:
+        # object/list busca dentro de una carpeta: "ab/<sha256>" -> carpeta "ab", búsqueda "<sha256>"
+        carpeta, _, busqueda = prefijo.rpartition("/")
+        offset = 0
+        while True:
+            response = await self.client.post(f"/object/list/{self.bucket}", json={
+                "prefix": carpeta,
+                "search": busqueda,
+                "limit": _PAGINA_LISTADO,
+                "offset": offset,
+            })
+            response.raise_for_status()
+            pagina = response.json()
+            for objeto in pagina:
+                if not objeto["name"].startswith(busqueda):
+                    continue
+                clave = f"{carpeta}/{objeto['name']}" if carpeta else objeto["name"]
+                if objeto.get("id"):
+                    yield ObjetoAlmacenado(
+                        clave,
+                        (objeto.get("metadata") or {}).get("size", 0),
+                        datetime.fromisoformat(objeto["updated_at"]),
+                    )
+                else:
+                    # Las subcarpetas vienen sin id: se recorren completas
+                    async for interno in self.recorrer(f"{clave}/"):
+                        yield interno
+            if len(pagina) < _PAGINA_LISTADO:
+                return
+            offset += _PAGINA_LISTADO
+
+    def url(self, clave: str) -> str:
+        return f"{self.url_base}/{clave}"
+
+    def clave_de_url(self, url: str) -> Optional[str]:
+        # También reconoce URLs de get_public_url de storage3 (con "?" al final)
+        marca = f"/object/public/{self.bucket}/"
+        if not url or marca not in url:
+            return None
+        return url.split(marca, 1)[1].split("?")[0] or None
+
+    async def cerrar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,231 @@
+"""
+Guardado de archivos subidos (multipart) en disco.
+
+Los archivos se copian por bloques de UPLOAD_CHUNK_BYTES: la memoria usada
+por archivo es constante sin importar su tamaño. Las operaciones de disco
+bloqueantes (abrir, escribir, borrar) corren en hilos para no frenar el
+event loop, y el límite de tamaño se controla mientras se copia.
+
+Mientras se copia se calcula el SHA-256 del contenido: las imágenes se
+guardan direccionadas por contenido (clave ab/<sha256>.jpg en el
+almacenamiento, ver app/storage), así un mismo archivo subido dos veces
+ocupa un solo lugar.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from typing import AsyncIterable, AsyncIterator, Callable, NamedTuple, Optional, Union
+from fastapi import HTTPException, UploadFile, status
+from app.config import get_settings
+
+settings = get_settings()
+
+# Carpeta servida en /uploads (ver app/main.py)
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "uploads")
+# Subidas en curso: fuera de /uploads (no se sirven) pero en el mismo disco (os.replace atómico
+# al almacenamiento local)
+TMP_DIR = os.path.join(os.path.dirname(UPLOADS_DIR), ".uploads_tmp")
+
+_CABECERA_BYTES = 16
+
+
+class ArchivoSubido(NamedTuple):
+    bytes: int
+    sha256: str
+    cabecera: bytes  # primeros bytes, para reconocer el formato
+
+
+def _demasiado_grande(nombre: Optional[str], max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"El archivo '{nombre}' supera el máximo de {round(max_bytes / (1024 * 1024), 1):g} MB"
+    )
+
+
+def _escribir(salida, hasher, bloque: bytes):
+    hasher.update(bloque)
+    salida.write(bloque)
+
+
+async def guardar_upload(
+    archivo: UploadFile,
+    destino: str,
+    max_bytes: int,
+    chunk_bytes: Optional[int] = None,
+) -> ArchivoSubido:
+    """
+    Copia `archivo` a la ruta `destino` por bloques y retorna tamaño y SHA-256.
+
+    Si el archivo supera `max_bytes` se borra lo escrito y se lanza 413.
+    """
+    chunk_bytes = chunk_bytes or settings.UPLOAD_CHUNK_BYTES
+
+    # Rechazo temprano si el tamaño ya se conoce (multipart con Content-Length por parte)
+    if archivo.size is not None and archivo.size > max_bytes:
+        raise _demasiado_grande(archivo.filename, max_bytes)
+
+    await asyncio.to_thread(os.makedirs, os.path.dirname(destino), exist_ok=True)
+    salida = await asyncio.to_thread(open, destino, "wb")
+    hasher = hashlib.sha256()
+    escritos = 0
+    cabecera = b""
+    try:
+        while True:
+            bloque = await archivo.read(chunk_bytes)
+            if not bloque:
+                break
+            escritos += len(bloque)
+            if escritos > max_bytes:
+                raise _demasiado_grande(archivo.filename, max_bytes)
+            if len(cabecera) < _CABECERA_BYTES:
+                cabecera += bloque[:_CABECERA_BYTES - len(cabecera)]
+            # El hash se calcula en el mismo hilo que escribe (no usa el event loop)
+            await asyncio.to_thread(_escribir, salida, hasher, bloque)
+    except BaseException:
+        await asyncio.to_thread(salida.close)
+        await asyncio.to_thread(borrar_archivo, destino)
+        raise
+    await asyncio.to_thread(salida.close)
+    return ArchivoSubido(escritos, hasher.hexdigest(), cabecera)
+
+
+def ruta_temporal() -> str:
+    """Ruta para una subida en curso (la limpieza periódica borra las abandonadas)"""
+    return os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.part")
+
+
+def extension_imagen(cabecera: bytes) -> Optional[str]:
+    """Extensión según el contenido real del archivo; None si no es una imagen conocida"""
+    if cabecera.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "webp"
+    if cabecera[4:8] == b"ftyp" and cabecera[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "heic"
+    if cabecera[4:8] == b"ftyp" and cabecera[8:12] in (b"avif", b"avis"):
+        return "avif"
+    return None
+
+
+# Firma (primeros bytes) de los formatos de documento que la tienen
+_FIRMAS_DOCUMENTO = {
+    "pdf": (b"%PDF-",),
+    "docx": (b"PK\x03\x04",),  # ZIP (Office Open XML)
+    "doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),  # OLE2 (Word 97-2003)
+}
+
+
+def formato_coincide(extension: str, cabecera: bytes) -> bool:
+    """True si los primeros bytes del archivo corresponden a su extensión"""
+    extension = extension.lower().lstrip(".")
+    if extension in ("jpg", "jpeg", "png"):
+        return extension_imagen(cabecera) == ("jpg" if extension == "jpeg" else extension)
+    if extension == "txt":
+        return b"\x00" not in cabecera
+    firmas = _FIRMAS_DOCUMENTO.get(extension)
+    return firmas is None or cabecera.startswith(firmas)
+
+
+def clave_contenido(sha256: str, extension: str) -> str:
+    """Clave de almacenamiento de un archivo por su contenido: ab/<sha256>.<ext>"""
+    return f"{sha256[:2]}/{sha256}.{extension}"
+
+
+class FlujoSubida:
+    """
+    Bloques de un archivo subido para enviarlos directo al almacenamiento,
+    sin pasar por disco: calcula el SHA-256 y corta con 413 al superar
+    `max_bytes`. `validar_cabecera` recibe los primeros bytes (puede lanzar
+    HTTPException) antes de enviar el resto.
+
+    `origen` es un UploadFile (multipart) o cualquier iterable async de bytes
+    (cuerpo de la request). Con `sha256_esperado` / `bytes_esperados` el
+    último paso de la iteración lanza 400 si el contenido no coincide: el
+    almacenamiento descarta la subida en lugar de completarla.
+
+        flujo = FlujoSubida(archivo, max_bytes)
+        await storage.guardar(clave, flujo)
+        flujo.sha256, flujo.bytes
+    """
+
+    def __init__(
+        self,
+        origen: Union[UploadFile, AsyncIterable[bytes]],
+        max_bytes: int,
+        validar_cabecera: Optional[Callable[[bytes], None]] = None,
+        nombre: Optional[str] = None,
+        sha256_esperado: Optional[str] = None,
+        bytes_esperados: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+    ):
+        self.origen = origen
+        self.max_bytes = max_bytes
+        self.validar_cabecera = validar_cabecera
+        self.nombre = nombre or getattr(origen, "filename", None)
+        self.sha256_esperado = sha256_esperado
+        self.bytes_esperados = bytes_esperados
+        self.chunk_bytes = chunk_bytes or settings.UPLOAD_CHUNK_BYTES
+        self.bytes = 0
+        self.cabecera = b""
+        self._hasher = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    async def _bloques(self) -> AsyncIterator[bytes]:
+        if not isinstance(self.origen, UploadFile):
+            async for bloque in self.origen:
+                yield bloque
+            return
+        if self.origen.size is not None and self.origen.size > self.max_bytes:
+            raise _demasiado_grande(self.nombre, self.max_bytes)
+        while True:
+            bloque = await self.origen.read(self.chunk_bytes)
+            if not bloque:
+                return
+            yield bloque
+
+    def _revisar_cabecera(self, bloque: bytes, final: bool = False):
+        if self.validar_cabecera is None or len(self.cabecera) >= _CABECERA_BYTES:
+            return
+        self.cabecera += bloque[:_CABECERA_BYTES - len(self.cabecera)]
+        if len(self.cabecera) >= _CABECERA_BYTES or final:
+            self.validar_cabecera(self.cabecera)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for bloque in self._bloques():
+            if not bloque:
+                continue
+            self._revisar_cabecera(bloque)
+            self.bytes += len(bloque)
+            if self.bytes > self.max_bytes:
+                raise _demasiado_grande(self.nombre, self.max_bytes)
+            # hashlib libera el GIL con bloques grandes: el hilo no frena el event loop
+            await asyncio.to_thread(self._hasher.update, bloque)
+            yield bloque
+        # Archivos de menos de _CABECERA_BYTES
+        self._revisar_cabecera(b"", final=True)
+        if self.bytes_esperados is not None and self.bytes != self.bytes_esperados:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Se recibieron {self.bytes} bytes de '{self.nombre}', se esperaban {self.bytes_esperados}"
+            )
+        if self.sha256_esperado is not None and self.sha256 != self.sha256_esperado:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El SHA-256 de '{self.nombre}' no coincide con el declarado"
+            )
+
+
+def borrar_archivo(ruta: str):
+    """Borra un archivo si existe (bloqueante: usar con asyncio.to_thread)"""
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,94 @@
+"""
+Caché en memoria acotado (LRU) con expiración por entrada.
+
+Se usa para datos que se leen muchas veces por request y cambian poco
+(tokens verificados, usuarios, etc.). Es seguro entre hilos y lleva
+estadísticas de aciertos para poder medir su efectividad.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+_SIN_VALOR = object()
+
+# Todas las instancias creadas, para exponer sus métricas
+_instancias: List["TTLCache"] = []
+
+
+class TTLCache:
+    """Caché LRU de tamaño máximo fijo; cada entrada vence a los `ttl` segundos"""
+
+    def __init__(self, nombre: str, max_entradas: int, ttl_segundos: float):
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+        self.desalojados = 0
+        _instancias.append(self)
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        """Retorna el valor vigente o `default` si no existe o venció"""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave, _SIN_VALOR)
+            if entrada is _SIN_VALOR:
+                self.fallos += 1
+                return default
+            valor, vence_en = entrada
+            if vence_en <= ahora:
+                del self._datos[clave]
+                self.expirados += 1
+                self.fallos += 1
+                return default
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def set(self, clave: Hashable, valor: Any, ttl_segundos: Optional[float] = None):
+        """Guarda un valor; `ttl_segundos` permite acortar la vigencia de esta entrada"""
+        ttl = self.ttl_segundos if ttl_segundos is None else min(ttl_segundos, self.ttl_segundos)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.desalojados += 1
+
+    def delete(self, clave: Hashable) -> bool:
+        """Elimina una entrada. Retorna True si existía"""
+        with self._lock:
+            return self._datos.pop(clave, _SIN_VALOR) is not _SIN_VALOR
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño y tasa de aciertos del caché"""
+        consultas = self.aciertos + self.fallos
+        return {
+            "nombre": self.nombre,
+            "entradas": len(self._datos),
+            "max_entradas": self.max_entradas,
+            "ttl_segundos": self.ttl_segundos,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "expirados": self.expirados,
+            "desalojados": self.desalojados,
+            "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+        }
+
+
+def all_cache_stats() -> List[Dict[str, Any]]:
+    """stats() de todos los cachés de la aplicación"""
+    return [cache.stats() for cache in _instancias]
@@ -1,17 +1,28 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.database import get_supabase_client
-from app.utils.security import decode_access_token
+from app.utils.security import decode_access_token_cached
 from app.schemas.usuario import TokenData
 from typing import Optional, Dict, Any  # ✅ Agregar Dict y Any
 from datetime import datetime, timedelta
+from app.config import get_settings
+from app.utils.cache import TTLCache
+from app.utils import events
+from app.utils.roles import role_registry
+from app.core.logger import get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
 
 # Esquema de autenticación OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/usuarios/login")
 
-# ✅ Caché simple de usuarios (en memoria) - CON TIPO
-_user_cache: Dict[str, Dict[str, Any]] = {}
-USER_CACHE_DURATION = timedelta(minutes=5)
+# ✅ Caché de usuarios (LRU acotado, expiración con reloj monotónico)
+user_cache = TTLCache(
+    "usuarios",
+    max_entradas=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_segundos=settings.USER_CACHE_TTL_SECONDS
+)
 
 # ✅ Caché de propiedades (en memoria) - CON TIPO
 _propiedades_cache: Dict[str, Any] = {"data": None, "timestamp": None}
@@ -19,43 +30,30 @@ PROPIEDADES_CACHE_DURATION = timedelta(minutes=2)
 
 def _get_cached_user(usuario_id: str):
     """Obtiene usuario del caché si existe y es válido"""
-    if usuario_id in _user_cache:
-        cached_data = _user_cache[usuario_id]
-        if datetime.now() - cached_data["timestamp"] < USER_CACHE_DURATION:
-            print(f"✅ [CACHE] Usuario {usuario_id} encontrado en caché")
-            return cached_data["user"]
-    return None
+    return user_cache.get(usuario_id)
 
 def _set_cached_user(usuario_id: str, user: dict):
     """Guarda usuario en caché"""
-    _user_cache[usuario_id] = {
-        "user": user,
-        "timestamp": datetime.now()
-    }
-    print(f"💾 [CACHE] Usuario {usuario_id} guardado en caché")
+    user_cache.set(usuario_id, user)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """Obtiene el usuario actual desde el token JWT con caché"""
-    print("🔍 [DEBUG] get_current_user - Token recibido")
-    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = decode_access_token(token)
+    payload = decode_access_token_cached(token)
     if payload is None:
-        print("❌ [ERROR] Token inválido o expirado")
+        logger.info("Token inválido o expirado", extra={"sample_rate": settings.LOG_SAMPLE_RATE})
         raise credentials_exception
     
     usuario_id: Optional[str] = payload.get("sub")
     if usuario_id is None:
-        print("❌ [ERROR] No se encontró usuario_id en el token")
+        logger.warning("Token sin usuario_id (sub)")
         raise credentials_exception
     
-    print(f"✅ [DEBUG] Usuario ID del token: {usuario_id}")
-    
     # Intentar obtener del caché primero
     cached_user = _get_cached_user(usuario_id)
     if cached_user:
@@ -64,20 +62,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     # Si no está en caché, buscar en BD
     supabase = get_supabase_client()
     try:
-        print(f"🔍 [DEBUG] Buscando usuario en BD: {usuario_id}")
+        logger.debug("Usuario no está en caché, consultando BD", extra={"id_usuario": usuario_id})
         response = supabase.table("usuario").select("*").eq("id_usuario", usuario_id).execute()
         
-        print(f"📦 [DEBUG] Respuesta de Supabase: {response.data}")
-        
         if not response.data or len(response.data) == 0:
-            print("❌ [ERROR] Usuario no encontrado en BD")
+            logger.warning("Usuario del token no existe en BD", extra={"id_usuario": usuario_id})
             raise credentials_exception
         
         usuario = response.data[0]
-        print(f"✅ [DEBUG] Usuario encontrado: {usuario.get('nombre_usuario')}, id_rol: {usuario.get('id_rol')}")
         
         if not usuario.get("es_activo_usuario", False):
-            print("❌ [ERROR] Usuario inactivo")
+            logger.info("Intento de acceso de usuario inactivo", extra={"id_usuario": usuario_id})
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Usuario inactivo"
@@ -85,14 +80,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         
         # Guardar en caché
         _set_cached_user(usuario_id, usuario)
-        
-        print("✅ [DEBUG] Usuario activo, retornando datos")
         return usuario
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"❌ [ERROR] Excepción al buscar usuario: {str(e)}")
+    except Exception:
+        logger.exception("Error al buscar usuario", extra={"id_usuario": usuario_id})
         raise credentials_exception
 
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
@@ -104,11 +97,41 @@ async def get_current_active_user(current_user: dict = Depends(get_current_user)
         )
     return current_user
 
+def require_roles(*nombres_rol: str):
+    """
+    Dependencia que exige que el usuario tenga uno de los roles indicados.
+
+    Los nombres se comparan sin tildes ni mayúsculas ("Broker" == "Bróker")
+    y el rol se resuelve desde el registro en memoria, sin consultar la BD.
+
+    Uso: current_user: dict = Depends(require_roles("Bróker"))
+    """
+    async def verificar_rol(current_user: dict = Depends(get_current_active_user)):
+        await role_registry.asegurar_cargado()
+        if not role_registry.tiene_rol(current_user.get("id_rol"), *nombres_rol):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tiene permisos para realizar esta acción"
+            )
+        return current_user
+    
+    return verificar_rol
+
 def invalidate_user_cache(usuario_id: str):
     """Invalida el caché de un usuario específico"""
-    if usuario_id in _user_cache:
-        del _user_cache[usuario_id]
-        print(f"🗑️ [CACHE] Caché del usuario {usuario_id} invalidado")
+    if user_cache.delete(str(usuario_id)):
+        logger.debug("Caché de usuario invalidado", extra={"id_usuario": str(usuario_id)})
+
+def _on_usuario_cambiado(id_usuario, **_):
+    invalidate_user_cache(id_usuario)
+
+def _on_rol_cambiado(id_rol=None, **_):
+    # Pocos cambios y pocos usuarios: se descarta todo el caché
+    user_cache.clear()
+    logger.debug("Caché de usuarios limpiado por cambio de rol", extra={"id_rol": id_rol})
+
+events.subscribe(events.USUARIO_CAMBIADO, _on_usuario_cambiado)
+events.subscribe(events.ROL_CAMBIADO, _on_rol_cambiado)
 
 # ✅ Funciones de caché para propiedades
 def get_propiedades_cached():
@@ -119,7 +142,7 @@ def get_propiedades_cached():
     if (_propiedades_cache["data"] is not None and 
         _propiedades_cache["timestamp"] is not None and
         now - _propiedades_cache["timestamp"] < PROPIEDADES_CACHE_DURATION):
-        print("✅ [PROPIEDADES CACHE] Usando caché")
+        logger.debug("Caché de propiedades: acierto", extra={"sample_rate": settings.LOG_SAMPLE_RATE})
         return _propiedades_cache["data"]
     
     return None
@@ -129,11 +152,11 @@ def set_propiedades_cached(data):
     global _propiedades_cache
     _propiedades_cache["data"] = data
     _propiedades_cache["timestamp"] = datetime.now()
-    print("💾 [PROPIEDADES CACHE] Guardado en caché")
+    logger.debug("Caché de propiedades actualizado")
 
 def clear_propiedades_cache():
     """Invalida el caché de propiedades"""
     global _propiedades_cache
     _propiedades_cache["data"] = None
     _propiedades_cache["timestamp"] = None
-    print("🗑️ [PROPIEDADES CACHE] Caché limpiado")
+    logger.debug("Caché de propiedades limpiado")
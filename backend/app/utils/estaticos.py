@@ -0,0 +1,216 @@
+"""
+Archivos estáticos de /uploads con caché HTTP.
+
+StaticFiles de Starlette ya responde 304, pero con headers por defecto: sin
+Cache-Control el navegador revalida cada foto en cada visita. UploadsStaticFiles
+agrega:
+
+- Cache-Control `immutable` de un año para las variantes por contenido
+  (uploads/imagenes/ab/<sha256>_w<ancho>.webp): si el contenido cambia,
+  cambia la URL. El resto usa UPLOADS_CACHE_MAX_AGE, también los originales
+  (ab/<sha256>.jpg): su nombre es el SHA-256 del archivo subido, no el de lo
+  guardado, y `python -m app.utils.imagenes --originales` puede reescribirlos
+  en el lugar para borrarles los metadatos.
+- ETag fuerte de tamaño y fecha de modificación: cambia cuando cambian los
+  bytes guardados, así un Range con If-Range nunca mezcla dos versiones.
+  If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110).
+- Range de un solo rango (bytes=a-b, bytes=a-, bytes=-n) con If-Range, para
+  reanudar descargas y para los <video> de los navegadores.
+- Versiones precomprimidas: si existe <archivo>.br o <archivo>.gz y el
+  cliente las acepta, se envían con Content-Encoding (UPLOADS_PRECOMPRESSED).
+"""
+import os
+import re
+import stat
+from email.utils import parsedate
+from mimetypes import guess_type
+from typing import List, Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Variantes por contenido: imagenes/ab/<sha256>_w640.<ext>
+_RUTA_VARIANTE = re.compile(r"^[\w-]+/[0-9a-f]{2}/[0-9a-f]{64}_w\d+\.\w+$")
+_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+# Orden de preferencia cuando el cliente acepta varias
+PRECOMPRIMIDOS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _acepta(accept_encoding: str, codificacion: str) -> bool:
+    """True si Accept-Encoding incluye `codificacion` con q > 0"""
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        if nombre.strip().lower() != codificacion:
+            continue
+        parametros = parametros.replace(" ", "")
+        if parametros.startswith("q="):
+            try:
+                return float(parametros[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def _etags(valor: str) -> List[str]:
+    # Comparación débil (RFC 9110 13.1.2): W/"x" coincide con "x"
+    return [tag.strip().removeprefix("W/") for tag in valor.split(",")]
+
+
+def rango_pedido(valor: str, tamanio: int) -> Optional[Tuple[int, int]]:
+    """
+    (inicio, fin) inclusivo del header Range, o None si hay que enviar el
+    archivo completo (sin rango, varios rangos o formato desconocido).
+    Lanza ValueError si el rango no se puede satisfacer (416).
+    """
+    coincidencia = _RANGO.match(valor.strip())
+    if coincidencia is None:
+        return None
+    desde, hasta = coincidencia.groups()
+    if not desde and not hasta:
+        return None
+    if not desde:
+        # Sufijo: los últimos N bytes
+        largo = int(hasta)
+        if largo == 0 or tamanio == 0:
+            raise ValueError("Rango vacío")
+        return max(0, tamanio - largo), tamanio - 1
+    inicio = int(desde)
+    fin = min(int(hasta), tamanio - 1) if hasta else tamanio - 1
+    if inicio >= tamanio or inicio > fin:
+        raise ValueError("Rango fuera del archivo")
+    return inicio, fin
+
+
+class RangoFileResponse(FileResponse):
+    """FileResponse que envía solo los bytes [inicio, fin] con status 206"""
+
+    def __init__(self, path: str, rango: Tuple[int, int], stat_result: os.stat_result, **kwargs):
+        super().__init__(path, status_code=206, stat_result=stat_result, **kwargs)
+        self.rango = rango
+        inicio, fin = rango
+        self.headers["content-length"] = str(fin - inicio + 1)
+        self.headers["content-range"] = f"bytes {inicio}-{fin}/{stat_result.st_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        inicio, fin = self.rango
+        pendientes = fin - inicio + 1
+        async with await anyio.open_file(self.path, mode="rb") as archivo:
+            await archivo.seek(inicio)
+            while pendientes > 0:
+                bloque = await archivo.read(min(self.chunk_size, pendientes))
+                if not bloque:
+                    break
+                pendientes -= len(bloque)
+                await send({"type": "http.response.body", "body": bloque, "more_body": pendientes > 0})
+        if pendientes > 0:
+            # El archivo se achicó mientras se enviaba
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class UploadsStaticFiles(StaticFiles):
+    """StaticFiles con Cache-Control, ETag fuerte, Range y precomprimidos"""
+
+    def __init__(self, *args, precomprimidos: bool = True, max_age: int = 3600, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precomprimidos = precomprimidos
+        self.max_age = max_age
+
+    def _precomprimido(self, full_path: str, accept_encoding: str) -> Optional[Tuple[str, str, os.stat_result]]:
+        if not self.precomprimidos or not accept_encoding:
+            return None
+        for codificacion, extension in PRECOMPRIMIDOS:
+            if not _acepta(accept_encoding, codificacion):
+                continue
+            try:
+                stat_result = os.stat(full_path + extension)
+            except OSError:
+                continue
+            if stat.S_ISREG(stat_result.st_mode):
+                return codificacion, full_path + extension, stat_result
+        return None
+
+    def _headers_cache(self, full_path: str, stat_result: os.stat_result) -> dict:
+        relativa = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        if _RUTA_VARIANTE.match(relativa):
+            cache_control = _CACHE_INMUTABLE
+        else:
+            cache_control = f"public, max-age={self.max_age}"
+        return {
+            "accept-ranges": "bytes",
+            "cache-control": cache_control,
+            "etag": f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"',
+        }
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            # Con If-None-Match se ignora If-Modified-Since
+            tags = _etags(if_none_match)
+            return "*" in tags or response_headers.get("etag", "").removeprefix("W/") in tags
+        return super().is_not_modified(response_headers, request_headers)
+
+    def _rango(self, request_headers: Headers, response_headers: dict, tamanio: int) -> Optional[Tuple[int, int]]:
+        rango = request_headers.get("range")
+        if rango is None:
+            return None
+        if_range = request_headers.get("if-range")
+        if if_range is not None:
+            # If-Range: el rango vale solo si el archivo no cambió (ETag fuerte o fecha)
+            if if_range.startswith('"') or if_range.startswith("W/"):
+                if if_range != response_headers["etag"]:
+                    return None
+            elif parsedate(if_range) != parsedate(response_headers["last-modified"]):
+                return None
+        return rango_pedido(rango, tamanio)
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        if status_code != 200:
+            # Páginas de error de html=True: sin caché de larga duración
+            return FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        headers = self._headers_cache(full_path, stat_result)
+        media_type = guess_type(full_path)[0] or "text/plain"
+        precomprimido = self._precomprimido(full_path, request_headers.get("accept-encoding", ""))
+        if precomprimido is not None:
+            codificacion, ruta, stat_comprimido = precomprimido
+            # Otra representación: otro ETag, y los caches deben variar por Accept-Encoding
+            headers["etag"] = headers["etag"][:-1] + f'-{codificacion}"'
+            headers.update({"content-encoding": codificacion, "vary": "Accept-Encoding"})
+            del headers["accept-ranges"]
+            response = FileResponse(ruta, headers=headers, media_type=media_type, stat_result=stat_comprimido)
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        if self.precomprimidos:
+            headers["vary"] = "Accept-Encoding"
+        response = FileResponse(full_path, headers=headers, media_type=media_type, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        try:
+            rango = self._rango(request_headers, response.headers, stat_result.st_size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{stat_result.st_size}", **headers},
+            )
+        if rango is None or rango == (0, stat_result.st_size - 1):
+            return response
+        return RangoFileResponse(full_path, rango, stat_result, headers=headers, media_type=media_type)
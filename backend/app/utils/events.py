@@ -0,0 +1,48 @@
+"""
+Bus de eventos en proceso (publicar / suscribir).
+
+Las rutas publican qué cambió y los cachés se suscriben para invalidarse,
+sin que cada endpoint tenga que recordar a quién avisar.
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Eventos conocidos
+USUARIO_CAMBIADO = "usuario.cambiado"   # datos: id_usuario
+ROL_CAMBIADO = "rol.cambiado"           # datos: id_rol, rol (fila nueva) o eliminado=True
+
+_suscriptores: Dict[str, List[Callable[..., None]]] = defaultdict(list)
+_lock = threading.Lock()
+
+
+def subscribe(evento: str, handler: Callable[..., None]):
+    """Registra `handler(**datos)` para el evento indicado"""
+    with _lock:
+        if handler not in _suscriptores[evento]:
+            _suscriptores[evento].append(handler)
+
+
+def unsubscribe(evento: str, handler: Callable[..., None]):
+    with _lock:
+        if handler in _suscriptores[evento]:
+            _suscriptores[evento].remove(handler)
+
+
+def publish(evento: str, **datos):
+    """
+    Notifica a los suscriptores de forma síncrona.
+
+    Un suscriptor que falla no interrumpe a los demás ni a la request que
+    publicó el evento.
+    """
+    with _lock:
+        handlers = list(_suscriptores[evento])
+    for handler in handlers:
+        try:
+            handler(**datos)
+        except Exception:
+            logger.exception("Error en suscriptor de evento", extra={"evento": evento})
@@ -0,0 +1,383 @@
+"""
+Variantes de tamaño de las imágenes de propiedades (miniaturas y WebP).
+
+Después de subir una imagen se generan, en un pool de procesos, copias de
+IMAGE_VARIANT_WIDTHS píxeles de ancho en JPEG y WebP (nunca más grandes que
+el original) y una más en el tamaño completo, junto al archivo original en el
+almacenamiento de imágenes (app/storage; si no es local, el original se
+descarga a un temporal):
+
+    imagenes/ab/<sha256>.jpg          (el subido, sin ubicación ni datos del dispositivo)
+    imagenes/ab/<sha256>_w640.jpg
+    imagenes/ab/<sha256>_w640.webp
+    imagenes/ab/<sha256>_w4032.jpg    (tamaño completo)
+
+Todas las variantes salen derechas (se aplica la orientación EXIF de las
+fotos de celular), sin metadatos (EXIF, GPS; se conserva solo el perfil de
+color) y recomprimidas con IMAGE_VARIANT_QUALITY. El original se guarda al
+subirlo sin GPS ni datos privados del dispositivo (app/utils/metadatos.py; su
+clave sigue siendo el SHA-256 del archivo subido) y el catálogo público no lo
+expone mientras haya variantes. El ancho y
+alto ya orientados se guardan en imagenpropiedad (imagenes_dimensiones.sql)
+para armar grillas sin descargar las imágenes.
+
+Las imágenes con el mismo contenido comparten archivo (archivos_contenido.sql):
+si otra fila ya tiene variantes para ese SHA-256 se reutilizan, y
+`liberar_archivo` borra archivo y variantes cuando nadie más los usa.
+
+El resultado se guarda en imagenpropiedad.variantes_imagen (JSONB, ver
+variantes_imagen.sql) y el catálogo público elige con `elegir_variante`
+el tamaño adecuado para cada vista.
+
+Pillow es opcional: si no está instalado las imágenes se sirven solo en su
+tamaño original.
+
+Para procesar las imágenes subidas antes (sin ancho_imagen; desde backend/):
+    python -m app.utils.imagenes
+
+Con --originales además borra los metadatos privados de los originales
+guardados antes de que se limpiaran al subir. Se reemplazan en la misma clave:
+/uploads no los sirve como `immutable` y su ETag cambia con los bytes
+(app/utils/estaticos.py). Los que no se pueden limpiar enteros quedan como
+estaban y se informan en originales_ilegibles.
+"""
+import asyncio
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import anyio
+from app.config import get_settings
+from app.core.logger import configure_logging, get_logger, shutdown_logging
+from app.database import get_supabase_client
+from app.storage import IMAGENES, Almacenamiento, AlmacenamientoLocal, get_storage, shutdown_storage
+from app.utils.archivos import TMP_DIR, UPLOADS_DIR, borrar_archivo, ruta_temporal
+from app.utils.metadatos import MetadatosIlegibles, limpiar_metadatos
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_DISPONIBLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    PILLOW_DISPONIBLE = False
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+FORMATOS = ("webp", "jpeg")
+_EXTENSIONES = {"webp": "webp", "jpeg": "jpg"}
+
+# Originales con metadatos que limpiar_metadatos sabe borrar (no variantes _w<ancho>)
+_EXTENSIONES_ORIGINAL = (".jpg", ".jpeg", ".png", ".webp", ".heic", ".avif")
+_VARIANTE = re.compile(r"_w\d+$")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Imágenes subidas antes del almacenamiento configurable (uploads/propiedades/...)
+_uploads_local = AlmacenamientoLocal(UPLOADS_DIR, "/uploads")
+
+
+def ubicar(url_imagen: str) -> Optional[Tuple[Almacenamiento, str]]:
+    """(almacenamiento, clave) de una URL de imagen; None si es externa"""
+    for almacen in (get_storage(IMAGENES), _uploads_local):
+        clave = almacen.clave_de_url(url_imagen)
+        if clave is not None:
+            return almacen, clave
+    return None
+
+
+def generar_variantes(ruta: str, url_base: str, anchos: List[int], calidad: int) -> Dict[str, Any]:
+    """
+    Genera las variantes de una imagen (corre en un proceso del pool).
+
+    `url_base` es la URL del original sin extensión; las variantes se guardan
+    junto al original. Retorna lo que se guarda en variantes_imagen.
+    """
+    base, _ = os.path.splitext(ruta)
+    with Image.open(ruta) as original:
+        imagen = ImageOps.exif_transpose(original)
+        ancho_original, alto_original = imagen.size
+        # El tamaño completo siempre: reemplaza al original (sin orientar) en el catálogo
+        objetivos = sorted({min(ancho, ancho_original) for ancho in anchos} | {ancho_original})
+        # Pillow no copia EXIF / XMP al guardar; el perfil de color sí hace falta
+        perfil_color = original.info.get("icc_profile")
+
+        variantes = []
+        for ancho in objetivos:
+            alto = max(1, round(alto_original * ancho / ancho_original))
+            redimensionada = imagen if ancho == ancho_original else imagen.resize((ancho, alto), Image.LANCZOS)
+            for formato in FORMATOS:
+                sufijo = f"_w{ancho}.{_EXTENSIONES[formato]}"
+                salida = redimensionada
+                if formato == "jpeg" and salida.mode not in ("RGB", "L"):
+                    salida = salida.convert("RGB")
+                salida.save(base + sufijo, formato.upper(), quality=calidad, optimize=True, icc_profile=perfil_color)
+                variantes.append({
+                    "ancho": ancho,
+                    "alto": alto,
+                    "formato": formato,
+                    "url": url_base + sufijo,
+                    "bytes": os.path.getsize(base + sufijo),
+                })
+
+    return {
+        "ancho": ancho_original,
+        "alto": alto_original,
+        "bytes": os.path.getsize(ruta),
+        "variantes": variantes,
+        "generado_en": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def elegir_variante(imagen: Dict[str, Any], ancho: int, formato: str = "webp") -> str:
+    """
+    URL de la variante más chica que cubre `ancho` píxeles (o la más grande
+    disponible). Sin variantes retorna la URL de la imagen: una URL externa o
+    el original, que se guarda sin metadatos privados.
+    """
+    datos = imagen.get("variantes_imagen") or {}
+    candidatas = sorted(
+        (v for v in datos.get("variantes", []) if v["formato"] == formato),
+        key=lambda v: v["ancho"],
+    )
+    if not candidatas:
+        return imagen["url_imagen"]
+    for variante in candidatas:
+        if variante["ancho"] >= ancho:
+            return variante["url"]
+    return candidatas[-1]["url"]
+
+
+def srcset(imagen: Dict[str, Any], formato: str = "webp") -> Optional[str]:
+    """Atributo srcset de <img> con todas las variantes del formato"""
+    datos = imagen.get("variantes_imagen") or {}
+    variantes = sorted(
+        (v for v in datos.get("variantes", []) if v["formato"] == formato),
+        key=lambda v: v["ancho"],
+    )
+    return ", ".join(f"{v['url']} {v['ancho']}w" for v in variantes) or None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: no se hereda el estado del proceso (hilos, event loop, sockets)
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _variantes_existentes(supabase, sha256: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Variantes ya generadas para el mismo contenido (otra imagen con el mismo archivo)"""
+    if not sha256:
+        return None
+    # Con ancho_imagen: procesada con la versión que incluye el tamaño completo
+    result = supabase.table("imagenpropiedad").select("variantes_imagen")\
+        .eq("sha256_imagen", sha256).not_.is_("ancho_imagen", "null").limit(1).execute()
+    return result.data[0]["variantes_imagen"] if result.data else None
+
+
+async def _generar_remotas(almacen: Almacenamiento, clave: str, url_base: str) -> Dict[str, Any]:
+    """Descarga el original a un temporal, genera las variantes y las sube"""
+    loop = asyncio.get_running_loop()
+    await asyncio.to_thread(os.makedirs, TMP_DIR, exist_ok=True)
+    carpeta = await asyncio.to_thread(tempfile.mkdtemp, dir=TMP_DIR)
+    try:
+        ruta = os.path.join(carpeta, os.path.basename(clave))
+        async with await anyio.open_file(ruta, "wb") as salida:
+            async for bloque in almacen.leer(clave):
+                await salida.write(bloque)
+        variantes = await loop.run_in_executor(
+            _get_pool(), generar_variantes, ruta, url_base,
+            list(settings.IMAGE_VARIANT_WIDTHS), settings.IMAGE_VARIANT_QUALITY,
+        )
+        base_ruta, _ = os.path.splitext(ruta)
+        base_clave, _ = os.path.splitext(clave)
+        for variante in variantes["variantes"]:
+            sufijo = variante["url"][len(url_base):]
+            await almacen.guardar_archivo(base_clave + sufijo, base_ruta + sufijo, f"image/{variante['formato']}")
+        return variantes
+    finally:
+        await asyncio.to_thread(shutil.rmtree, carpeta, True)
+
+
+async def _procesar_imagen(fila: Dict[str, Any]) -> bool:
+    ubicacion = ubicar(fila["url_imagen"])
+    if ubicacion is None:
+        return False
+    almacen, clave = ubicacion
+    url_base, _ = os.path.splitext(fila["url_imagen"])
+    loop = asyncio.get_running_loop()
+    supabase = get_supabase_client()
+    try:
+        variantes = await asyncio.to_thread(_variantes_existentes, supabase, fila.get("sha256_imagen"))
+        if variantes is None:
+            ruta = almacen.ruta_local(clave)
+            if ruta is None:
+                variantes = await _generar_remotas(almacen, clave, url_base)
+            elif os.path.isfile(ruta):
+                # Almacenamiento local: las variantes se escriben junto al original
+                variantes = await loop.run_in_executor(
+                    _get_pool(), generar_variantes, ruta, url_base,
+                    list(settings.IMAGE_VARIANT_WIDTHS), settings.IMAGE_VARIANT_QUALITY,
+                )
+            else:
+                return False
+        await asyncio.to_thread(
+            supabase.table("imagenpropiedad").update({
+                "variantes_imagen": variantes,
+                "ancho_imagen": variantes["ancho"],
+                "alto_imagen": variantes["alto"],
+            }).eq("id_imagen", fila["id_imagen"]).execute
+        )
+        return True
+    except Exception as e:
+        logger.warning(
+            "No se pudieron generar las variantes de la imagen",
+            extra={"id_imagen": fila["id_imagen"], "error": str(e)},
+        )
+        return False
+
+
+async def procesar_variantes(filas: List[Dict[str, Any]]) -> int:
+    """
+    Genera y registra las variantes de las filas de imagenpropiedad dadas.
+    Pensado para BackgroundTasks: nunca lanza. Retorna cuántas se procesaron.
+    """
+    if not PILLOW_DISPONIBLE:
+        logger.warning("Pillow no está instalado: no se generan variantes de imágenes")
+        return 0
+    resultados = await asyncio.gather(*(_procesar_imagen(fila) for fila in filas))
+    procesadas = sum(resultados)
+    logger.info("Variantes de imágenes generadas", extra={"procesadas": procesadas, "total": len(filas)})
+    return procesadas
+
+
+async def _archivo_registrado(supabase, sha256: str) -> bool:
+    result = await asyncio.to_thread(
+        supabase.table("archivo").select("sha256_archivo").eq("sha256_archivo", sha256).limit(1).execute
+    )
+    return bool(result.data)
+
+
+async def liberar_archivo(supabase, sha256: Optional[str]) -> bool:
+    """
+    Borra del almacenamiento el archivo (y sus variantes) si ya ninguna
+    imagen lo usa.
+
+    El DELETE está condicionado a referencias_archivo = 0: si en paralelo se
+    subió el mismo contenido, la fila no se borra y el archivo se conserva.
+    Una subida del mismo contenido posterior al DELETE vuelve a crear la fila
+    (y después escribe el archivo): por eso se consulta de nuevo justo antes
+    de borrar los archivos. Retorna True si se borró.
+    """
+    if not sha256:
+        return False
+    result = await asyncio.to_thread(
+        supabase.table("archivo").delete().eq("sha256_archivo", sha256).eq("referencias_archivo", 0).execute
+    )
+    if not result.data:
+        return False
+    ubicacion = ubicar(result.data[0]["url_archivo"])
+    if ubicacion is None:
+        return True
+    almacen, clave = ubicacion
+    # ab/<sha256>: original, variantes _w<ancho> y precomprimidos
+    base_clave, _ = os.path.splitext(clave)
+    claves = await almacen.listar(base_clave)
+    if await _archivo_registrado(supabase, sha256):
+        return False
+    await almacen.borrar(claves)
+    if await _archivo_registrado(supabase, sha256):
+        # Se subió el mismo contenido mientras se borraba: su archivo pudo perderse
+        # (volver a subirlo lo restaura)
+        logger.warning("Archivo borrado mientras se volvía a subir", extra={"sha256": sha256})
+    return True
+
+
+async def _procesar_pendientes(lote: int) -> int:
+    supabase = get_supabase_client()
+    total = 0
+    # Las que fallan siguen sin procesar: se saltean con el offset
+    offset = 0
+    while True:
+        pendientes = await asyncio.to_thread(
+            supabase.table("imagenpropiedad").select("id_imagen, url_imagen, sha256_imagen")
+            .is_("ancho_imagen", "null").or_("url_imagen.like./uploads/*,sha256_imagen.not.is.null")
+            .order("id_imagen").range(offset, offset + lote - 1).execute
+        )
+        if not pendientes.data:
+            return total
+        procesadas = await procesar_variantes(pendientes.data)
+        total += procesadas
+        offset += len(pendientes.data) - procesadas
+
+
+async def _limpiar_original(almacen: Almacenamiento, clave: str) -> bool:
+    """
+    Borra los metadatos privados de un original ya guardado; True si cambió.
+    Se limpia una copia que reemplaza al original solo si quedó limpia entera
+    (en local, con un rename atómico): nunca se publica un archivo a medias.
+    """
+    temporal = ruta_temporal()
+    try:
+        await asyncio.to_thread(os.makedirs, TMP_DIR, exist_ok=True)
+        async with await anyio.open_file(temporal, "wb") as salida:
+            async for bloque in almacen.leer(clave):
+                await salida.write(bloque)
+        cambio = await asyncio.to_thread(limpiar_metadatos, temporal)
+        if cambio:
+            await almacen.guardar_archivo(clave, temporal)
+        return cambio
+    finally:
+        await asyncio.to_thread(borrar_archivo, temporal)
+
+
+async def _limpiar_originales() -> Dict[str, int]:
+    resultado = {"originales_limpiados": 0, "originales_ilegibles": 0}
+    for almacen in (get_storage(IMAGENES), _uploads_local):
+        async for objeto in almacen.recorrer(""):
+            base, extension = os.path.splitext(objeto.clave)
+            if extension.lower() not in _EXTENSIONES_ORIGINAL or _VARIANTE.search(base) or base.startswith("subidas/"):
+                continue
+            try:
+                resultado["originales_limpiados"] += await _limpiar_original(almacen, objeto.clave)
+            except MetadatosIlegibles as e:
+                # Queda como estaba: hay que reemplazarlo o borrarlo a mano
+                resultado["originales_ilegibles"] += 1
+                logger.error("Original con metadatos que no se pudieron borrar", extra={"clave": objeto.clave, "error": str(e)})
+            except Exception as e:
+                logger.warning("No se pudieron borrar los metadatos del original", extra={"clave": objeto.clave, "error": str(e)})
+    return resultado
+
+
+async def _main(originales: bool) -> Dict[str, int]:
+    try:
+        resultado = {"procesadas": await _procesar_pendientes(lote=50)}
+        if originales:
+            resultado.update(await _limpiar_originales())
+        return resultado
+    finally:
+        await shutdown_storage()
+
+
+if __name__ == "__main__":
+    configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+    try:
+        logger.info("Imágenes procesadas", extra=asyncio.run(_main("--originales" in sys.argv)))
+    finally:
+        shutdown_image_pool()
+        shutdown_logging()
@@ -0,0 +1,336 @@
+"""
+Borrado de metadatos privados de las imágenes subidas, antes de que lleguen
+al almacenamiento (que es público).
+
+Las fotos de celular traen en EXIF / XMP la ubicación (GPS) y datos del
+dispositivo. `limpiar_metadatos` los borra del archivo en el lugar, sin
+recomprimir y sin cambiar su tamaño (los offsets del contenedor siguen
+valiendo):
+
+- EXIF (JPEG APP1, PNG eXIf, WebP EXIF, ítem Exif de HEIC / AVIF): se vacía
+  el IFD de GPS y se ponen en cero las etiquetas de _ETIQUETAS_PRIVADAS. La
+  orientación, las dimensiones y el perfil de color se conservan (las
+  variantes se generan después, derechas, a partir de este archivo).
+- XMP e IPTC (JPEG APP1 / APP13, PNG tEXt / zTXt / iTXt, WebP XMP, ítem XMP de
+  HEIC / AVIF): se borran completos.
+
+Si un bloque EXIF no se puede interpretar se borra completo. Si el contenedor
+no se puede recorrer hasta el final (truncado, largos imposibles, metadatos
+fuera del archivo) se lanza MetadatosIlegibles: no se puede asegurar que no
+quede nada y la imagen no se publica. GIF no tiene EXIF: se deja como está.
+
+La clave por contenido (ab/<sha256>.<ext>) sigue siendo el SHA-256 del
+archivo tal como se subió: el mismo archivo subido dos veces da la misma
+clave y el mismo resultado.
+"""
+import mmap
+import struct
+import zlib
+from typing import Iterator, Optional, Set, Tuple
+from app.utils.archivos import extension_imagen
+
+# Dentro de un IFD: punteros a otros IFD y etiquetas que se borran
+_IFD_EXIF = 0x8769
+_IFD_GPS = 0x8825
+_IFD_INTEROPERABILIDAD = 0xA005
+_ETIQUETAS_PRIVADAS = {
+    0x010E,  # ImageDescription
+    0x013B,  # Artist
+    0x013C,  # HostComputer
+    0x02BC,  # XMP dentro de TIFF
+    0x83BB,  # IPTC
+    0x9286,  # UserComment
+    0x927C,  # MakerNote (suele repetir GPS y números de serie)
+    0xA420,  # ImageUniqueID
+    0xA430,  # CameraOwnerName
+    0xA431,  # BodySerialNumber
+    0xA435,  # LensSerialNumber
+    0x9C9B, 0x9C9C, 0x9C9D, 0x9C9E, 0x9C9F,  # XPTitle, XPComment, XPAuthor, XPKeywords, XPSubject
+}
+# Bytes por valor de cada tipo TIFF
+_TAMANIOS_TIPO = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+
+_XMP_JPEG = (b"http://ns.adobe.com/xap/1.0/\x00", b"http://ns.adobe.com/xmp/extension/\x00")
+# Tipo de chunk PNG privado y auxiliar: los decodificadores lo ignoran
+_PNG_IGNORADO = b"prIv"
+
+
+class MetadatosIlegibles(ValueError):
+    """El contenedor de la imagen no se pudo recorrer completo"""
+
+
+def _cero(buffer, inicio: int, fin: int, relleno: bytes = b"\x00"):
+    if fin > inicio:
+        buffer[inicio:fin] = relleno * (fin - inicio)
+
+
+# ---------- EXIF (TIFF) ----------
+
+def _limpiar_ifd(buffer, inicio: int, fin: int, orden: str, offset: int, vistos: Set[int], vaciar: bool = False):
+    """
+    Limpia el IFD en `inicio + offset` (y los que cuelgan de él). Con `vaciar`
+    (IFD de GPS) se borran todas sus entradas.
+    """
+    if offset in vistos or offset < 8:
+        return
+    vistos.add(offset)
+    posicion = inicio + offset
+    if posicion + 2 > fin:
+        raise ValueError("IFD fuera del bloque EXIF")
+    cantidad, = struct.unpack_from(orden + "H", buffer, posicion)
+    if posicion + 2 + 12 * cantidad + 4 > fin:
+        raise ValueError("IFD fuera del bloque EXIF")
+
+    for i in range(cantidad):
+        entrada = posicion + 2 + 12 * i
+        etiqueta, tipo, n, valor = struct.unpack_from(orden + "HHII", buffer, entrada)
+        tamanio = _TAMANIOS_TIPO.get(tipo, 1) * n
+        datos = entrada + 8 if tamanio <= 4 else inicio + valor
+        if etiqueta == _IFD_GPS:
+            _limpiar_ifd(buffer, inicio, fin, orden, valor, vistos, vaciar=True)
+        elif etiqueta in (_IFD_EXIF, _IFD_INTEROPERABILIDAD) and not vaciar:
+            _limpiar_ifd(buffer, inicio, fin, orden, valor, vistos)
+        elif vaciar or etiqueta in _ETIQUETAS_PRIVADAS:
+            _cero(buffer, datos, min(datos + tamanio, fin))
+
+    if vaciar:
+        # Sin entradas y sin IFD siguiente
+        _cero(buffer, posicion, posicion + 2 + 12 * cantidad + 4)
+        return
+    siguiente, = struct.unpack_from(orden + "I", buffer, posicion + 2 + 12 * cantidad)
+    if siguiente:
+        # IFD1: la miniatura
+        _limpiar_ifd(buffer, inicio, fin, orden, siguiente, vistos)
+
+
+def _limpiar_tiff(buffer, inicio: int, fin: int):
+    """Limpia un bloque EXIF (encabezado TIFF en `inicio`); si no se entiende, lo borra"""
+    try:
+        marca = bytes(buffer[inicio:inicio + 2])
+        if marca not in (b"MM", b"II"):
+            raise ValueError("Encabezado TIFF desconocido")
+        orden = ">" if marca == b"MM" else "<"
+        magico, primer_ifd = struct.unpack_from(orden + "HI", buffer, inicio + 2)
+        if magico != 42:
+            raise ValueError("Encabezado TIFF desconocido")
+        _limpiar_ifd(buffer, inicio, fin, orden, primer_ifd, set())
+    except (ValueError, struct.error):
+        _cero(buffer, inicio, fin)
+
+
+def _inicio_tiff(buffer, inicio: int) -> int:
+    # Algunos programas anteponen "Exif\0\0" también en PNG y WebP
+    return inicio + 6 if buffer[inicio:inicio + 6] == b"Exif\x00\x00" else inicio
+
+
+# ---------- Contenedores ----------
+
+def _limpiar_jpeg(buffer):
+    posicion = 2
+    while posicion + 4 <= len(buffer):
+        if buffer[posicion] != 0xFF:
+            raise ValueError("Segmento JPEG sin marcador")
+        marcador = buffer[posicion + 1]
+        if marcador == 0xFF:
+            posicion += 1
+            continue
+        if marcador in (0xD9, 0xDA):
+            # Fin de imagen o comienzo de los datos comprimidos: no hay más metadatos
+            return
+        if marcador == 0x01 or 0xD0 <= marcador <= 0xD8:
+            posicion += 2
+            continue
+        largo, = struct.unpack_from(">H", buffer, posicion + 2)
+        datos, fin = posicion + 4, posicion + 2 + largo
+        if largo < 2 or fin > len(buffer):
+            raise ValueError("Segmento JPEG fuera del archivo")
+        if marcador == 0xE1 and buffer[datos:datos + 6] == b"Exif\x00\x00":
+            _limpiar_tiff(buffer, datos + 6, fin)
+        elif (marcador == 0xE1 and bytes(buffer[datos:datos + 35]).startswith(_XMP_JPEG)) or marcador == 0xED:
+            # XMP o IPTC (APP13): el segmento pasa a ser un comentario vacío
+            buffer[posicion + 1] = 0xFE
+            _cero(buffer, datos, fin)
+        posicion = fin
+    raise ValueError("JPEG sin datos de imagen")
+
+
+def _chunks_png(buffer) -> Iterator[Tuple[int, bytes, int, int]]:
+    """(posición, tipo, inicio y fin de los datos) de cada chunk"""
+    posicion = 8
+    while posicion + 12 <= len(buffer):
+        largo, = struct.unpack_from(">I", buffer, posicion)
+        tipo = bytes(buffer[posicion + 4:posicion + 8])
+        datos = posicion + 8
+        if datos + largo + 4 > len(buffer):
+            raise ValueError("Chunk PNG fuera del archivo")
+        yield posicion, tipo, datos, datos + largo
+        if tipo == b"IEND":
+            return
+        posicion = datos + largo + 4
+    raise ValueError("PNG sin IEND")
+
+
+def _limpiar_png(buffer):
+    for posicion, tipo, datos, fin in _chunks_png(buffer):
+        if tipo == b"eXIf":
+            _limpiar_tiff(buffer, _inicio_tiff(buffer, datos), fin)
+        elif tipo in (b"tEXt", b"zTXt", b"iTXt"):
+            # Texto (XMP, "Raw profile type exif" de ImageMagick, autor...): chunk ignorado
+            buffer[posicion + 4:posicion + 8] = _PNG_IGNORADO
+            _cero(buffer, datos, fin)
+        else:
+            continue
+        crc = zlib.crc32(bytes(buffer[posicion + 4:fin])) & 0xFFFFFFFF
+        struct.pack_into(">I", buffer, fin, crc)
+
+
+def _limpiar_webp(buffer):
+    posicion = 12
+    vp8x = None
+    while posicion + 8 <= len(buffer):
+        tipo = bytes(buffer[posicion:posicion + 4])
+        largo, = struct.unpack_from("<I", buffer, posicion + 4)
+        datos, fin = posicion + 8, posicion + 8 + largo
+        if fin > len(buffer):
+            raise ValueError("Chunk WebP fuera del archivo")
+        if tipo == b"VP8X":
+            vp8x = datos
+        elif tipo == b"EXIF":
+            _limpiar_tiff(buffer, _inicio_tiff(buffer, datos), fin)
+        elif tipo == b"XMP ":
+            # Los chunks desconocidos se ignoran; se apaga el flag de XMP
+            buffer[posicion:posicion + 4] = b"PRIV"
+            _cero(buffer, datos, fin)
+            if vp8x is not None:
+                buffer[vp8x] &= ~0x04 & 0xFF
+        posicion = datos + largo + (largo & 1)
+
+
+def _cajas(buffer, inicio: int, fin: int) -> Iterator[Tuple[bytes, int, int]]:
+    """(tipo, inicio y fin del contenido) de las cajas ISOBMFF entre inicio y fin"""
+    posicion = inicio
+    while posicion + 8 <= fin:
+        largo, tipo = struct.unpack_from(">I4s", buffer, posicion)
+        encabezado = 8
+        if largo == 1:
+            largo, = struct.unpack_from(">Q", buffer, posicion + 8)
+            encabezado = 16
+        elif largo == 0:
+            largo = fin - posicion
+        if largo < encabezado or posicion + largo > fin:
+            raise ValueError("Caja ISOBMFF fuera de su contenedor")
+        yield tipo, posicion + encabezado, posicion + largo
+        posicion += largo
+
+
+def _entero(buffer, posicion: int, bytes_: int) -> int:
+    return int.from_bytes(buffer[posicion:posicion + bytes_], "big") if bytes_ else 0
+
+
+def _items_heif(buffer, inicio: int, fin: int) -> dict:
+    """{item_ID: (tipo, content_type)} de la caja iinf"""
+    version = buffer[inicio]
+    posicion = inicio + 4 + (2 if version == 0 else 4)
+    items = {}
+    for tipo, datos, fin_infe in _cajas(buffer, posicion, fin):
+        if tipo != b"infe" or buffer[datos] < 2:
+            continue
+        version_infe = buffer[datos]
+        largo_id = 2 if version_infe == 2 else 4
+        item_id = _entero(buffer, datos + 4, largo_id)
+        posicion_tipo = datos + 4 + largo_id + 2
+        item_tipo = bytes(buffer[posicion_tipo:posicion_tipo + 4])
+        textos = bytes(buffer[posicion_tipo + 4:fin_infe]).split(b"\x00")
+        items[item_id] = (item_tipo, textos[1] if item_tipo == b"mime" and len(textos) > 1 else b"")
+    return items
+
+
+def _ubicaciones_heif(buffer, inicio: int) -> dict:
+    """{item_ID: [(offset, largo)]} de la caja iloc (solo datos en el mismo archivo)"""
+    version = buffer[inicio]
+    tamanios = buffer[inicio + 4]
+    largo_offset, largo_largo = tamanios >> 4, tamanios & 0x0F
+    tamanios = buffer[inicio + 5]
+    largo_base, largo_indice = tamanios >> 4, (tamanios & 0x0F) if version in (1, 2) else 0
+    posicion = inicio + 6
+    largo_id = 2 if version < 2 else 4
+    cantidad = _entero(buffer, posicion, largo_id)
+    posicion += largo_id
+    ubicaciones = {}
+    for _ in range(cantidad):
+        item_id = _entero(buffer, posicion, largo_id)
+        posicion += largo_id
+        metodo = 0
+        if version in (1, 2):
+            metodo = _entero(buffer, posicion, 2) & 0x0F
+            posicion += 2
+        posicion += 2  # data_reference_index
+        base = _entero(buffer, posicion, largo_base)
+        posicion += largo_base
+        extensiones = _entero(buffer, posicion, 2)
+        posicion += 2
+        partes = []
+        for _ in range(extensiones):
+            posicion += largo_indice
+            offset = _entero(buffer, posicion, largo_offset)
+            largo = _entero(buffer, posicion + largo_offset, largo_largo)
+            posicion += largo_offset + largo_largo
+            partes.append((base + offset, largo))
+        if metodo == 0:
+            ubicaciones[item_id] = partes
+    return ubicaciones
+
+
+def _limpiar_heif(buffer):
+    for tipo, inicio, fin in _cajas(buffer, 0, len(buffer)):
+        if tipo != b"meta":
+            continue
+        items, ubicaciones = {}, {}
+        for hijo, datos, fin_hijo in _cajas(buffer, inicio + 4, fin):
+            if hijo == b"iinf":
+                items = _items_heif(buffer, datos, fin_hijo)
+            elif hijo == b"iloc":
+                ubicaciones = _ubicaciones_heif(buffer, datos)
+        for item_id, (item_tipo, content_type) in items.items():
+            if item_tipo != b"Exif" and not (item_tipo == b"mime" and b"xml" in content_type):
+                continue
+            partes = [(o, o + n) for o, n in ubicaciones.get(item_id, [])]
+            # Sin ubicación en el archivo (idat, otro archivo) o fuera de él: no se puede limpiar
+            if not partes or any(fin_parte > len(buffer) for _, fin_parte in partes):
+                raise ValueError("Metadatos HEIF fuera del archivo")
+            if item_tipo == b"Exif" and len(partes) == 1:
+                # 4 bytes con la distancia al encabezado TIFF
+                offset, fin_exif = partes[0]
+                _limpiar_tiff(buffer, offset + 4 + _entero(buffer, offset, 4), fin_exif)
+            else:
+                for offset, fin_parte in partes:
+                    _cero(buffer, offset, fin_parte, b" " if item_tipo == b"mime" else b"\x00")
+
+
+_LIMPIADORES = {"jpg": _limpiar_jpeg, "png": _limpiar_png, "webp": _limpiar_webp, "heic": _limpiar_heif, "avif": _limpiar_heif}
+
+
+def limpiar_metadatos(ruta: str, extension: Optional[str] = None) -> bool:
+    """
+    Borra en el lugar la ubicación y los datos privados de la imagen en `ruta`
+    (bloqueante: correr en un hilo). Retorna True si el archivo cambió.
+
+    Lanza MetadatosIlegibles si el contenedor está mal formado; el archivo
+    puede haber quedado limpio a medias y no se debe publicar.
+    """
+    with open(ruta, "r+b") as archivo:
+        cabecera = archivo.read(16)
+        limpiador = _LIMPIADORES.get(extension or extension_imagen(cabecera))
+        if limpiador is None or not cabecera:
+            return False
+        # mmap: se edita en el lugar, sin copiar el archivo a memoria
+        with mmap.mmap(archivo.fileno(), 0) as buffer:
+            antes = zlib.crc32(buffer)
+            try:
+                limpiador(buffer)
+            except (ValueError, IndexError, struct.error) as e:
+                raise MetadatosIlegibles(str(e)) from e
+            cambio = zlib.crc32(buffer) != antes
+            if cambio:
+                buffer.flush()
+            return cambio
@@ -0,0 +1,97 @@
+"""
+Registro en memoria de la tabla `rol`.
+
+Se carga al iniciar la app y se mantiene al día con los eventos que publica
+app/routes/roles.py, así resolver el rol de un usuario nunca consulta la BD.
+"""
+import asyncio
+import threading
+import unicodedata
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from app.database import get_supabase_client
+from app.utils import events
+
+
+def normalizar_nombre_rol(nombre: str) -> str:
+    """'Bróker' -> 'broker': sin tildes, minúsculas y sin espacios extremos"""
+    sin_tildes = unicodedata.normalize("NFKD", nombre or "")
+    sin_tildes = "".join(c for c in sin_tildes if not unicodedata.combining(c))
+    return sin_tildes.strip().casefold()
+
+
+class RoleRegistry:
+    """Roles indexados por id y por nombre normalizado"""
+
+    def __init__(self):
+        self._por_id: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.cargado_en: Optional[datetime] = None
+
+    @property
+    def cargado(self) -> bool:
+        return self.cargado_en is not None
+
+    def cargar(self, supabase=None) -> int:
+        """Lee todos los roles de la BD. Retorna cuántos hay"""
+        supabase = supabase or get_supabase_client()
+        roles = supabase.table("rol").select("*").execute().data or []
+        with self._lock:
+            self._por_id = {r["id_rol"]: r for r in roles}
+            self.cargado_en = datetime.now(timezone.utc)
+        return len(roles)
+
+    async def asegurar_cargado(self):
+        """
+        Carga la tabla si el arranque no pudo (p. ej. BD caída). Las rutas la
+        llaman antes de consultar el registro; la lectura corre en un hilo para
+        no bloquear el event loop.
+        """
+        if not self.cargado:
+            await asyncio.to_thread(self.cargar)
+
+    def get(self, id_rol: int) -> Optional[Dict[str, Any]]:
+        return self._por_id.get(id_rol)
+
+    def por_nombre(self, nombre: str) -> Optional[Dict[str, Any]]:
+        buscado = normalizar_nombre_rol(nombre)
+        for rol in self._por_id.values():
+            if normalizar_nombre_rol(rol.get("nombre_rol")) == buscado:
+                return rol
+        return None
+
+    def todos(self) -> List[Dict[str, Any]]:
+        return sorted(self._por_id.values(), key=lambda r: r["id_rol"])
+
+    def es_activo(self, id_rol: int) -> bool:
+        rol = self.get(id_rol)
+        return bool(rol and rol.get("es_activo_rol", True))
+
+    def tiene_rol(self, id_rol: int, *nombres: str) -> bool:
+        """True si el rol existe, está activo y su nombre está entre `nombres`"""
+        rol = self.get(id_rol)
+        if not rol or not rol.get("es_activo_rol", True):
+            return False
+        permitidos = {normalizar_nombre_rol(n) for n in nombres}
+        return normalizar_nombre_rol(rol.get("nombre_rol")) in permitidos
+
+    def _on_rol_cambiado(self, id_rol=None, rol=None, eliminado=False, **_):
+        """Aplica el cambio publicado por las rutas sin volver a leer la tabla"""
+        with self._lock:
+            if eliminado:
+                self._por_id.pop(id_rol, None)
+                return
+            if rol is not None:
+                self._por_id[rol["id_rol"]] = rol
+                return
+        self.cargar()
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "roles": len(self._por_id),
+            "cargado_en": self.cargado_en.isoformat() if self.cargado_en else None,
+        }
+
+
+role_registry = RoleRegistry()
+events.subscribe(events.ROL_CAMBIADO, role_registry._on_rol_cambiado)
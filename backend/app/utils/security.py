@@ -1,11 +1,18 @@
 """
 Utilidades de seguridad: hash de contraseñas, JWT, etc.
 """
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Any, Callable
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.config import get_settings
+from app.utils.cache import TTLCache
 
 settings = get_settings()
 
@@ -23,6 +30,122 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# ============================================
+# POOL DEDICADO PARA BCRYPT
+# ============================================
+# bcrypt consume ~100ms+ de CPU por operación. Se ejecuta en un pool propio y
+# acotado para no congelar el event loop ni agotar el pool por defecto de
+# asyncio.to_thread (que usan las consultas a Supabase). Se crea al primer uso:
+# si la app se reinicia en el mismo proceso (otro lifespan), vuelve a crearse.
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_lock = threading.Lock()
+_hash_stats = {
+    "en_cola": 0,
+    "en_ejecucion": 0,
+    "max_en_cola": 0,
+    "completadas": 0,
+    "rechazadas": 0,
+    "espera_total_segundos": 0.0,
+    "ejecucion_total_segundos": 0.0,
+}
+
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    with _hash_lock:
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash"
+            )
+        return _hash_executor
+
+
+def _sacar_de_cola(tarea: Dict[str, bool]):
+    """Descuenta la tarea de en_cola una sola vez (la llame el hilo o quien esperaba). Requiere _hash_lock"""
+    if not tarea["fuera_de_cola"]:
+        tarea["fuera_de_cola"] = True
+        _hash_stats["en_cola"] -= 1
+
+
+def _ejecutar_en_pool(funcion: Callable, encolado_en: float, tarea: Dict[str, bool], *args):
+    """Corre en un hilo del pool y registra tiempos de espera y ejecución"""
+    inicio = time.perf_counter()
+    with _hash_lock:
+        _sacar_de_cola(tarea)
+        _hash_stats["en_ejecucion"] += 1
+        _hash_stats["espera_total_segundos"] += inicio - encolado_en
+    try:
+        return funcion(*args)
+    finally:
+        with _hash_lock:
+            _hash_stats["en_ejecucion"] -= 1
+            _hash_stats["completadas"] += 1
+            _hash_stats["ejecucion_total_segundos"] += time.perf_counter() - inicio
+
+
+async def _hash_async(funcion: Callable, *args):
+    """Encola una operación de bcrypt; responde 503 si la cola está llena"""
+    with _hash_lock:
+        if _hash_stats["en_cola"] >= settings.PASSWORD_HASH_MAX_PENDING:
+            _hash_stats["rechazadas"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, intente nuevamente en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        _hash_stats["en_cola"] += 1
+        _hash_stats["max_en_cola"] = max(_hash_stats["max_en_cola"], _hash_stats["en_cola"])
+
+    tarea = {"fuera_de_cola": False}
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_hash_executor(), _ejecutar_en_pool, funcion, time.perf_counter(), tarea, *args
+        )
+    finally:
+        # Si nunca llegó a correr (pool apagado, tarea cancelada) no debe quedar contada en la cola
+        with _hash_lock:
+            _sacar_de_cola(tarea)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password ejecutado en el pool de bcrypt"""
+    return await _hash_async(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash ejecutado en el pool de bcrypt"""
+    return await _hash_async(get_password_hash, password)
+
+
+def password_hash_stats() -> Dict[str, Any]:
+    """Estado del pool de bcrypt (profundidad de cola, tiempos promedio)"""
+    with _hash_lock:
+        stats = dict(_hash_stats)
+    completadas = stats["completadas"] or 1
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "max_pendientes": settings.PASSWORD_HASH_MAX_PENDING,
+        "en_cola": stats["en_cola"],
+        "en_ejecucion": stats["en_ejecucion"],
+        "max_en_cola": stats["max_en_cola"],
+        "completadas": stats["completadas"],
+        "rechazadas": stats["rechazadas"],
+        "espera_promedio_ms": round(stats["espera_total_segundos"] / completadas * 1000, 2),
+        "ejecucion_promedio_ms": round(stats["ejecucion_total_segundos"] / completadas * 1000, 2),
+    }
+
+
+def shutdown_password_hash_pool():
+    """Libera los hilos del pool al apagar la aplicación (el próximo uso crea otro)"""
+    global _hash_executor
+    with _hash_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Crea un token JWT
@@ -62,3 +185,34 @@ def decode_access_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+
+# Caché de tokens ya verificados: sha256(token) -> claims.
+# Cada entrada vence junto con el token ("exp"), nunca después.
+token_cache = TTLCache(
+    "tokens",
+    max_entradas=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl_segundos=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+
+def decode_access_token_cached(token: str) -> Optional[dict]:
+    """
+    Igual que decode_access_token, pero reutiliza la verificación de la
+    firma mientras el token siga vigente.
+    """
+    clave = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(clave)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return dict(payload)
+        token_cache.delete(clave)
+
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+
+    exp = payload.get("exp")
+    if exp is not None:
+        token_cache.set(clave, payload, ttl_segundos=exp - time.time())
+    return dict(payload)
@@ -0,0 +1,77 @@
+-- ============================================
+-- ARCHIVOS DIRECCIONADOS POR CONTENIDO (conteo de referencias)
+-- Sistema Inmobiliario
+-- ============================================
+-- Ejecutar este script en el SQL Editor de Supabase
+-- después de haber creado las tablas con Database.md
+--
+-- Las imágenes subidas se guardan como uploads/imagenes/ab/<sha256>.<ext>:
+-- la misma foto subida dos veces (reintentos desde el celular) es un solo
+-- archivo. La tabla archivo cuenta cuántas filas de imagenpropiedad usan
+-- cada contenido; el trigger la mantiene en cada INSERT/DELETE/UPDATE.
+--
+-- Cuando referencias_archivo llega a 0 la API borra la fila con un DELETE
+-- condicionado (WHERE referencias_archivo = 0) y después el archivo: una
+-- subida del mismo contenido que ya insertó su imagen conserva la fila y el
+-- archivo. Si la subida llega después del DELETE, su INSERT vuelve a crear
+-- la fila; la API la consulta otra vez antes de borrar el archivo, pero una
+-- subida que se registra justo mientras se borra puede quedar sin archivo
+-- (se registra un warning; volver a subir la imagen lo restaura).
+
+-- ============================================
+-- 1. TABLA Y COLUMNA
+-- ============================================
+CREATE TABLE IF NOT EXISTS archivo (
+    sha256_archivo CHAR(64) PRIMARY KEY,
+    url_archivo VARCHAR(400) NOT NULL,
+    referencias_archivo INTEGER NOT NULL DEFAULT 0 CHECK (referencias_archivo >= 0),
+    fecha_creacion_archivo TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Archivos sin uso (los borra la API o una limpieza periódica)
+CREATE INDEX IF NOT EXISTS idx_archivo_sin_referencias
+    ON archivo (sha256_archivo)
+    WHERE referencias_archivo = 0;
+
+-- NULL en imágenes subidas antes de este cambio (rutas uploads/propiedades/...)
+ALTER TABLE imagenpropiedad
+    ADD COLUMN IF NOT EXISTS sha256_imagen CHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_imagenpropiedad_sha256
+    ON imagenpropiedad (sha256_imagen);
+
+-- ============================================
+-- 2. TRIGGER SOBRE IMAGENPROPIEDAD
+-- ============================================
+CREATE OR REPLACE FUNCTION actualizar_referencias_archivo()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.sha256_imagen IS NOT NULL THEN
+        UPDATE archivo
+           SET referencias_archivo = referencias_archivo - 1
+         WHERE sha256_archivo = OLD.sha256_imagen;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.sha256_imagen IS NOT NULL THEN
+        INSERT INTO archivo (sha256_archivo, url_archivo, referencias_archivo)
+        VALUES (NEW.sha256_imagen, NEW.url_imagen, 1)
+        ON CONFLICT (sha256_archivo)
+        DO UPDATE SET referencias_archivo = archivo.referencias_archivo + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_imagenpropiedad_referencias ON imagenpropiedad;
+
+CREATE TRIGGER trg_imagenpropiedad_referencias
+AFTER INSERT OR DELETE OR UPDATE OF sha256_imagen ON imagenpropiedad
+FOR EACH ROW EXECUTE FUNCTION actualizar_referencias_archivo();
+
+-- ============================================
+-- 3. VERIFICACIÓN
+-- ============================================
+-- Contenidos compartidos por más de una imagen:
+-- SELECT sha256_archivo, url_archivo, referencias_archivo
+--   FROM archivo WHERE referencias_archivo > 1 ORDER BY referencias_archivo DESC;
@@ -0,0 +1,7 @@
+"""
+Benchmarks del backend.
+
+Se ejecutan desde la carpeta backend, por ejemplo:
+    python -m benchmarks.bench_auth
+    python -m benchmarks.bench_carga --mezcla mixto
+"""
@@ -0,0 +1,66 @@
+"""
+Benchmark: costo de autenticar una request (verificación del JWT).
+
+Compara decode_access_token (verifica la firma en cada request) contra
+decode_access_token_cached (verifica una vez y luego busca en el caché).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_auth --iteraciones 50000 --tokens 100
+"""
+import argparse
+import os
+import statistics
+import time
+
+# Valores de relleno para poder importar la configuración sin un .env
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from app.utils.security import (  # noqa: E402
+    create_access_token,
+    decode_access_token,
+    decode_access_token_cached,
+    token_cache,
+)
+
+
+def medir(nombre: str, funcion, tokens, iteraciones: int):
+    """Ejecuta `funcion` sobre los tokens en ronda y reporta latencias en µs"""
+    tiempos = []
+    for i in range(iteraciones):
+        token = tokens[i % len(tokens)]
+        inicio = time.perf_counter_ns()
+        payload = funcion(token)
+        tiempos.append((time.perf_counter_ns() - inicio) / 1000)
+        assert payload is not None
+    tiempos.sort()
+    total_s = sum(tiempos) / 1_000_000
+    print(
+        f"{nombre:<28} "
+        f"p50={statistics.median(tiempos):8.2f}µs  "
+        f"p99={tiempos[int(len(tiempos) * 0.99) - 1]:8.2f}µs  "
+        f"ops/s={iteraciones / total_s:12,.0f}"
+    )
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iteraciones", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=50, help="Usuarios distintos autenticándose")
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"usuario-{i}"}) for i in range(args.tokens)]
+
+    print(f"🔐 {args.iteraciones} verificaciones sobre {args.tokens} tokens distintos\n")
+    sin_cache = medir("decode_access_token", decode_access_token, tokens, args.iteraciones)
+    token_cache.clear()
+    con_cache = medir("decode_access_token_cached", decode_access_token_cached, tokens, args.iteraciones)
+
+    print(f"\n⚡ Mejora p50: {sin_cache / con_cache:.1f}x")
+    print(f"📊 Caché: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
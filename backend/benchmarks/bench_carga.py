@@ -0,0 +1,276 @@
+"""
+Benchmark de carga: la API completa contra un Supabase falso local.
+
+Levanta benchmarks.fake_supabase (datos de benchmarks.fixtures a la escala
+indicada) y la API con uvicorn apuntando a él, y luego N usuarios virtuales
+envían requests durante --duracion segundos según una mezcla de tráfico:
+
+  catalogo  sitio público: listado y detalle de propiedades publicadas
+  login     inicio de sesión (bcrypt)
+  citas     agenda: listado paginado, próximas y resumen del día
+  pagos     cobranza: listado paginado, dashboard y atrasados
+  mixto     todas las anteriores con pesos de un día típico
+
+Reporta por escenario p50/p95/p99, requests por segundo, errores y las idas
+y vueltas a Supabase por request (leídas del header Server-Timing).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_carga --mezcla mixto --concurrencia 20 --duracion 30
+    python -m benchmarks.bench_carga --mezcla catalogo --escala 5 --latencia-ms 10 --json resultado.json
+    python -m benchmarks.bench_carga --api-url http://localhost:8000   # API ya levantada
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fixtures import PASSWORD, USUARIOS
+
+# Clave con forma de JWT: el cliente de Supabase valida el formato
+_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+
+_SERVER_TIMING = re.compile(r'(\w+);dur=[\d.]+;desc="(\d+) llamadas')
+
+# escenario -> peso dentro de cada mezcla
+MEZCLAS: Dict[str, Dict[str, int]] = {
+    "catalogo": {"catalogo_lista": 3, "catalogo_busqueda": 1, "catalogo_detalle": 6},
+    "login": {"login": 1},
+    "citas": {"citas_lista": 4, "citas_proximas": 3, "citas_hoy": 3},
+    "pagos": {"pagos_lista": 4, "pagos_dashboard": 3, "pagos_atrasados": 3},
+    "mixto": {
+        "catalogo_lista": 15, "catalogo_busqueda": 5, "catalogo_detalle": 30, "login": 5,
+        "citas_lista": 10, "citas_proximas": 8, "citas_hoy": 7,
+        "pagos_lista": 8, "pagos_dashboard": 7, "pagos_atrasados": 5,
+    },
+}
+
+
+class Contexto:
+    """Datos compartidos por los usuarios virtuales"""
+
+    def __init__(self, tokens: List[str], propiedades: List[str], zonas: List[str]):
+        self.tokens = tokens
+        self.propiedades = propiedades
+        self.zonas = zonas
+
+
+async def _escenario(nombre: str, cliente: httpx.AsyncClient, ctx: Contexto, rng: random.Random) -> httpx.Response:
+    auth = {"Authorization": f"Bearer {rng.choice(ctx.tokens)}"}
+    if nombre == "catalogo_lista":
+        return await cliente.get("/api/propiedades/publicadas/lista")
+    if nombre == "catalogo_busqueda":
+        return await cliente.get("/api/propiedades/publicadas/lista", params={
+            "zona": rng.choice(ctx.zonas), "precio_max": rng.randrange(100_000, 600_000, 50_000),
+        })
+    if nombre == "catalogo_detalle":
+        return await cliente.get(f"/api/propiedades/publicadas/{rng.choice(ctx.propiedades)}")
+    if nombre == "login":
+        return await cliente.post("/api/usuarios/login", data={"username": rng.choice(USUARIOS), "password": PASSWORD})
+    if nombre == "citas_lista":
+        return await cliente.get("/api/citas-visita/", params={"page": rng.randrange(1, 4)}, headers=auth)
+    if nombre == "citas_proximas":
+        return await cliente.get("/api/citas-visita/proximas", headers=auth)
+    if nombre == "citas_hoy":
+        return await cliente.get("/api/citas-visita/hoy/resumen", headers=auth)
+    if nombre == "pagos_lista":
+        return await cliente.get("/api/pagos/", params={"page": rng.randrange(1, 4)}, headers=auth)
+    if nombre == "pagos_dashboard":
+        return await cliente.get("/api/pagos/dashboard", headers=auth)
+    if nombre == "pagos_atrasados":
+        return await cliente.get("/api/pagos/atrasados/lista", headers=auth)
+    raise ValueError(f"Escenario desconocido: {nombre}")
+
+
+def _idas_y_vueltas(response: httpx.Response) -> Dict[str, int]:
+    return {backend: int(n) for backend, n in _SERVER_TIMING.findall(response.headers.get("server-timing", ""))}
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, max(0, int(round(p / 100 * len(valores))) - 1))]
+
+
+async def _usuario_virtual(semilla: int, cliente: httpx.AsyncClient, ctx: Contexto, mezcla: Dict[str, int],
+                           inicio_medicion: float, fin: float, muestras: Dict[str, list]):
+    rng = random.Random(semilla)
+    escenarios, pesos = list(mezcla), list(mezcla.values())
+    while time.perf_counter() < fin:
+        nombre = rng.choices(escenarios, pesos)[0]
+        inicio = time.perf_counter()
+        try:
+            response = await _escenario(nombre, cliente, ctx, rng)
+            status, idas = response.status_code, _idas_y_vueltas(response)
+        except httpx.HTTPError:
+            status, idas = 0, {}
+        if inicio >= inicio_medicion:
+            muestras[nombre].append((time.perf_counter() - inicio, status, idas))
+
+
+async def _preparar(cliente: httpx.AsyncClient) -> Contexto:
+    tokens = []
+    for usuario in USUARIOS:
+        response = await cliente.post("/api/usuarios/login", data={"username": usuario, "password": PASSWORD})
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    response = await cliente.get("/api/propiedades/publicadas/lista")
+    response.raise_for_status()
+    publicadas = response.json()
+    if not publicadas:
+        raise RuntimeError("No hay propiedades publicadas en los datos de prueba")
+    zonas = sorted({p["direccion"]["zona_direccion"] for p in publicadas if p.get("direccion")}) or ["Equipetrol"]
+    return Contexto(tokens, [p["id_propiedad"] for p in publicadas], zonas)
+
+
+async def ejecutar(api_url: str, mezcla: Dict[str, int], concurrencia: int, duracion: float,
+                   calentamiento: float) -> Dict[str, list]:
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=api_url, limits=limites, timeout=30) as cliente:
+        ctx = await _preparar(cliente)
+        muestras: Dict[str, list] = defaultdict(list)
+        inicio_medicion = time.perf_counter() + calentamiento
+        fin = inicio_medicion + duracion
+        await asyncio.gather(*(
+            _usuario_virtual(i, cliente, ctx, mezcla, inicio_medicion, fin, muestras)
+            for i in range(concurrencia)
+        ))
+        return muestras
+
+
+def resumir(muestras: Dict[str, list], duracion: float) -> Dict[str, dict]:
+    resumen = {}
+    todas = [m for lista in muestras.values() for m in lista]
+    for nombre, lista in sorted(muestras.items()) + [("TOTAL", todas)]:
+        if not lista:
+            continue
+        tiempos = sorted(m[0] * 1000 for m in lista)
+        resumen[nombre] = {
+            "requests": len(lista),
+            "errores": sum(1 for m in lista if m[1] == 0 or m[1] >= 400),
+            "rps": round(len(lista) / duracion, 2),
+            "p50_ms": round(percentil(tiempos, 50), 2),
+            "p95_ms": round(percentil(tiempos, 95), 2),
+            "p99_ms": round(percentil(tiempos, 99), 2),
+            "db_por_request": round(sum(m[2].get("db", 0) for m in lista) / len(lista), 2),
+            "storage_por_request": round(sum(m[2].get("storage", 0) for m in lista) / len(lista), 2),
+        }
+    return resumen
+
+
+def imprimir(resumen: Dict[str, dict]):
+    print(f"{'escenario':<20}{'requests':>9}{'errores':>9}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'db/req':>8}")
+    for nombre, fila in resumen.items():
+        if nombre == "TOTAL":
+            print("-" * 85)
+        print(
+            f"{nombre:<20}{fila['requests']:>9}{fila['errores']:>9}{fila['rps']:>9.1f}"
+            f"{fila['p50_ms']:>10.2f}{fila['p95_ms']:>10.2f}{fila['p99_ms']:>10.2f}{fila['db_por_request']:>8.2f}"
+        )
+
+
+# ---------- procesos auxiliares ----------
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar(url: str, proceso: subprocess.Popen, segundos: float = 30):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El proceso terminó antes de responder en {url}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Sin respuesta de {url} en {segundos} s")
+
+
+def _iniciar_servidores(args) -> List[subprocess.Popen]:
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    puerto_fake, puerto_api = _puerto_libre(), _puerto_libre()
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_supabase", "--port", str(puerto_fake),
+        "--escala", str(args.escala), "--latencia-ms", str(args.latencia_ms),
+    ], cwd=backend_dir)
+    procesos = [fake]
+    try:
+        _esperar(f"http://127.0.0.1:{puerto_fake}/__stats__", fake)
+        entorno = {
+            **os.environ,
+            "SUPABASE_URL": f"http://127.0.0.1:{puerto_fake}",
+            "SUPABASE_KEY": _SUPABASE_KEY,
+            "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret-key"),
+            "JOBS_ENABLED": str(args.con_jobs).lower(),
+            "LOG_LEVEL": "WARNING",
+        }
+        api = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto_api),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ], cwd=backend_dir, env=entorno)
+        procesos.append(api)
+        _esperar(f"http://127.0.0.1:{puerto_api}/health/live", api)
+    except Exception:
+        _detener(procesos)
+        raise
+    args.api_url = f"http://127.0.0.1:{puerto_api}"
+    return procesos
+
+
+def _detener(procesos: List[subprocess.Popen]):
+    for proceso in reversed(procesos):
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mezcla", choices=sorted(MEZCLAS), default="mixto")
+    parser.add_argument("--concurrencia", type=int, default=10, help="Usuarios virtuales simultáneos")
+    parser.add_argument("--duracion", type=float, default=20, help="Segundos de medición")
+    parser.add_argument("--calentamiento", type=float, default=3, help="Segundos iniciales sin medir")
+    parser.add_argument("--escala", type=float, default=1.0, help="Volumen de datos del Supabase falso")
+    parser.add_argument("--latencia-ms", type=float, default=2.0, help="Latencia simulada por llamada a Supabase")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--con-jobs", action="store_true", help="Ejecutar las tareas en segundo plano")
+    parser.add_argument("--api-url", help="Medir una API ya levantada (usuarios de seed_data_complete.sql)")
+    parser.add_argument("--json", help="Guardar el resumen en este archivo")
+    args = parser.parse_args(argv)
+
+    procesos = [] if args.api_url else _iniciar_servidores(args)
+    try:
+        print(f"🚀 {args.mezcla}: {args.concurrencia} usuarios durante {args.duracion:g}s contra {args.api_url}\n")
+        muestras = asyncio.run(ejecutar(
+            args.api_url, MEZCLAS[args.mezcla], args.concurrencia, args.duracion, args.calentamiento,
+        ))
+    finally:
+        _detener(procesos)
+
+    resumen = resumir(muestras, args.duracion)
+    imprimir(resumen)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump({"parametros": {k: v for k, v in vars(args).items() if k != "json"}, "resultados": resumen},
+                      archivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resumen guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
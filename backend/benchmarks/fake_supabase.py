@@ -0,0 +1,438 @@
+"""
+Servidor falso de Supabase (PostgREST + Storage) en memoria, para benchmarks.
+
+Implementa el subconjunto de PostgREST que usa la API:
+  - GET/HEAD /rest/v1/{tabla}: select de columnas, filtros (eq, neq, gt, gte,
+    lt, lte, like, ilike, in, is, not.*, or=(...)), order, limit/offset y
+    Prefer: count=exact (header Content-Range)
+  - POST/PATCH/DELETE /rest/v1/{tabla} con Prefer: return=representation
+  - Accept: application/vnd.pgrst.object+json (single / maybe_single)
+  - POST /rest/v1/rpc/{funcion}: responde PGRST202 (no hay funciones SQL)
+  - /storage/v1: buckets y objetos (subir, subidas firmadas, copiar, descargar,
+    listar, borrar)
+
+No es PostgreSQL: compara valores como texto o número y no valida claves
+foráneas. De los triggers solo emula el conteo de referencias de archivo
+(archivos_contenido.sql). Con --latencia-ms se simula la ida y vuelta de red a Supabase.
+
+Uso (desde backend/):
+    python -m benchmarks.fake_supabase --port 54321 --escala 1
+"""
+import argparse
+import asyncio
+import csv
+import json
+import operator
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.fixtures import generar_datos
+
+# Clave primaria de cada tabla (el resto usa UUID generado al insertar)
+_CLAVES = {
+    "rol": "id_rol",
+    "empleado": "ci_empleado",
+    "usuario": "id_usuario",
+    "cliente": "ci_cliente",
+    "propietario": "ci_propietario",
+    "direccion": "id_direccion",
+    "propiedad": "id_propiedad",
+    "detallepropiedad": "id_detalle",
+    "imagenpropiedad": "id_imagen",
+    "documentopropiedad": "id_documento",
+    "citavisita": "id_cita",
+    "contratooperacion": "id_contrato_operacion",
+    "pago": "id_pago",
+    "desempenoasesor": "id_desempeno",
+    "gananciaempleado": "id_ganancia",
+    "archivo": "sha256_archivo",
+}
+
+# Columnas con DEFAULT NOW()
+_FECHAS_DEFAULT = {
+    "usuario": "fecha_creacion_usuario",
+    "cliente": "fecha_registro_cliente",
+    "documentopropiedad": "fecha_subida_documento",
+}
+
+_OPERADORES = {
+    "eq": operator.eq, "neq": operator.ne,
+    "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le,
+}
+
+_PARAMS_RESERVADOS = {"select", "order", "limit", "offset", "columns", "on_conflict"}
+
+
+def _error(status: int, code: str, message: str) -> JSONResponse:
+    return JSONResponse({"code": code, "message": message, "details": None, "hint": None}, status_code=status)
+
+
+# ---------- filtros ----------
+def _comparable(valor_fila: Any, texto: str) -> Tuple[Any, Any]:
+    """Convierte el texto del filtro al tipo del valor de la fila"""
+    if isinstance(valor_fila, bool):
+        return valor_fila, texto.lower() == "true"
+    if isinstance(valor_fila, (int, float)):
+        try:
+            return valor_fila, float(texto)
+        except ValueError:
+            return str(valor_fila), texto
+    return str(valor_fila), texto
+
+
+def _patron(texto: str, sin_mayusculas: bool) -> "re.Pattern":
+    partes = [".*" if c in "*%" else ("." if c == "_" else re.escape(c)) for c in texto]
+    return re.compile("^" + "".join(partes) + "$", re.IGNORECASE | re.DOTALL if sin_mayusculas else re.DOTALL)
+
+
+def _lista(texto: str) -> List[str]:
+    """`(a,"b,c",d)` -> ["a", "b,c", "d"]"""
+    return next(csv.reader([texto.strip()[1:-1]])) if texto.strip() not in ("()", "") else []
+
+
+def _condicion(columna: str, expresion: str) -> Callable[[dict], bool]:
+    negado = expresion.startswith("not.")
+    if negado:
+        expresion = expresion[4:]
+    operador, _, valor = expresion.partition(".")
+    if operador not in _OPERADORES and operador not in ("is", "in", "like", "ilike"):
+        raise ValueError(f"Operador no soportado: {operador}")
+
+    def evaluar(fila: dict) -> bool:
+        actual = fila.get(columna)
+        if operador == "is":
+            objetivo = {"null": None, "true": True, "false": False}.get(valor.lower(), valor)
+            return actual is objetivo if objetivo is None or isinstance(objetivo, bool) else actual == objetivo
+        if actual is None:
+            return False
+        if operador == "in":
+            return any(a == b for a, b in (_comparable(actual, v) for v in _lista(valor)))
+        if operador in ("like", "ilike"):
+            return bool(_patron(valor, operador == "ilike").match(str(actual)))
+        try:
+            return _OPERADORES[operador](*_comparable(actual, valor))
+        except TypeError:
+            return False
+
+    return (lambda fila: not evaluar(fila)) if negado else evaluar
+
+
+def _separar(texto: str) -> List[str]:
+    """Separa por comas de primer nivel (respeta paréntesis y comillas)"""
+    partes, nivel, comillas, actual = [], 0, False, ""
+    for c in texto:
+        if c == '"':
+            comillas = not comillas
+        elif not comillas and c == "(":
+            nivel += 1
+        elif not comillas and c == ")":
+            nivel -= 1
+        if c == "," and nivel == 0 and not comillas:
+            partes.append(actual)
+            actual = ""
+        else:
+            actual += c
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+def _condicion_logica(operador: str, texto: str) -> Callable[[dict], bool]:
+    """`or=(a.eq.1,and(b.gt.2,c.lt.3))`"""
+    condiciones = []
+    for parte in _separar(texto.strip()[1:-1]):
+        for logico in ("and", "or", "not.and", "not.or"):
+            if parte.startswith(logico + "("):
+                interna = _condicion_logica(logico.split(".")[-1], parte[len(logico):])
+                condiciones.append((lambda f, c=interna: not c(f)) if logico.startswith("not.") else interna)
+                break
+        else:
+            columna, _, expresion = parte.partition(".")
+            condiciones.append(_condicion(columna, expresion))
+    combinar = any if operador == "or" else all
+    return lambda fila: combinar(c(fila) for c in condiciones)
+
+
+def _filtros(request: Request) -> List[Callable[[dict], bool]]:
+    filtros = []
+    for columna, expresion in request.query_params.multi_items():
+        if columna in _PARAMS_RESERVADOS:
+            continue
+        if columna in ("or", "and"):
+            filtros.append(_condicion_logica(columna, expresion))
+        else:
+            filtros.append(_condicion(columna, expresion))
+    return filtros
+
+
+def _ordenar(filas: List[dict], orden: Optional[str]) -> List[dict]:
+    if not orden:
+        return filas
+    # Se aplica de la última columna a la primera (sort estable)
+    for criterio in reversed(orden.split(",")):
+        columna, *modificadores = criterio.split(".")
+        desc = "desc" in modificadores
+        # Como PostgreSQL: nulls last en asc, nulls first en desc (salvo indicación)
+        nulos_primero = "nullsfirst" in modificadores or (desc and "nullslast" not in modificadores)
+        con_valor = [f for f in filas if f.get(columna) is not None]
+        nulos = [f for f in filas if f.get(columna) is None]
+        con_valor.sort(key=lambda f: f[columna], reverse=desc)
+        filas = nulos + con_valor if nulos_primero else con_valor + nulos
+    return filas
+
+
+def _proyectar(filas: List[dict], select: str) -> List[dict]:
+    columnas = [c.strip() for c in select.split(",") if c.strip()]
+    if not columnas or "*" in columnas:
+        return [dict(f) for f in filas]
+    return [{c: f.get(c) for c in columnas} for f in filas]
+
+
+def _preferencias(request: Request) -> Dict[str, str]:
+    prefer = request.headers.get("prefer", "")
+    return dict(p.strip().split("=", 1) for p in prefer.split(",") if "=" in p)
+
+
+class FakeSupabase:
+    def __init__(self, tablas: Dict[str, List[dict]], latencia_segundos: float = 0.0):
+        self.tablas = tablas
+        self.latencia_segundos = latencia_segundos
+        self.objetos: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+        self.modificados: Dict[Tuple[str, str], str] = {}
+        self.llamadas = 0
+        self.app = Starlette(routes=[
+            Route("/rest/v1/rpc/{funcion}", self.rpc, methods=["GET", "POST"]),
+            Route("/rest/v1/{tabla}", self.rest, methods=["GET", "HEAD", "POST", "PATCH", "DELETE"]),
+            Route("/storage/v1/bucket/{bucket}", self.bucket, methods=["GET"]),
+            Route("/storage/v1/object/list/{bucket}", self.listar_objetos, methods=["POST"]),
+            Route("/storage/v1/object/public/{bucket}/{ruta:path}", self.objeto, methods=["GET", "HEAD"]),
+            Route("/storage/v1/object/upload/sign/{bucket}/{ruta:path}", self.subida_firmada, methods=["POST", "PUT"]),
+            Route("/storage/v1/object/copy", self.copiar_objeto, methods=["POST"]),
+            Route("/storage/v1/object/{bucket}", self.borrar_objetos, methods=["DELETE"]),
+            Route("/storage/v1/object/{bucket}/{ruta:path}", self.objeto, methods=["GET", "HEAD", "POST", "PUT"]),
+            Route("/__stats__", self.stats, methods=["GET"]),
+        ])
+
+    async def _esperar(self):
+        self.llamadas += 1
+        if self.latencia_segundos:
+            await asyncio.sleep(self.latencia_segundos)
+
+    # ---------- PostgREST ----------
+    async def rest(self, request: Request) -> Response:
+        await self._esperar()
+        nombre = request.path_params["tabla"]
+        if nombre not in self.tablas:
+            return _error(404, "42P01", f'relation "public.{nombre}" does not exist')
+        tabla = self.tablas[nombre]
+        preferencias = _preferencias(request)
+
+        try:
+            filtros = _filtros(request)
+        except ValueError as e:
+            return _error(400, "PGRST100", str(e))
+
+        if request.method == "POST":
+            cuerpo = await request.json()
+            nuevas = [self._nueva_fila(nombre, datos) for datos in (cuerpo if isinstance(cuerpo, list) else [cuerpo])]
+            tabla.extend(nuevas)
+            self._referencias(nombre, [], nuevas)
+            return self._representacion(nuevas, preferencias, status=201)
+
+        seleccionadas = [f for f in tabla if all(filtro(f) for filtro in filtros)]
+
+        if request.method == "PATCH":
+            cambios = await request.json()
+            antes = [dict(f) for f in seleccionadas]
+            for fila in seleccionadas:
+                fila.update(cambios)
+            self._referencias(nombre, antes, seleccionadas)
+            return self._representacion(seleccionadas, preferencias)
+
+        if request.method == "DELETE":
+            ids = {id(f) for f in seleccionadas}
+            tabla[:] = [f for f in tabla if id(f) not in ids]
+            self._referencias(nombre, seleccionadas, [])
+            return self._representacion(seleccionadas, preferencias)
+
+        # GET / HEAD
+        filas = _ordenar(seleccionadas, request.query_params.get("order"))
+        total = len(filas)
+        offset = int(request.query_params.get("offset", 0))
+        limit = request.query_params.get("limit")
+        filas = filas[offset:offset + int(limit)] if limit is not None else filas[offset:]
+        filas = _proyectar(filas, request.query_params.get("select", "*"))
+
+        headers = {}
+        if preferencias.get("count"):
+            rango = f"{offset}-{offset + len(filas) - 1}" if filas else "*"
+            headers["Content-Range"] = f"{rango}/{total}"
+        if request.method == "HEAD":
+            return Response(status_code=200, headers=headers)
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(filas) != 1:
+                return _error(406, "PGRST116", f"The result contains {len(filas)} rows")
+            return JSONResponse(filas[0], headers=headers)
+        return JSONResponse(filas, headers=headers)
+
+    def _nueva_fila(self, tabla: str, datos: dict) -> dict:
+        fila = dict(datos)
+        clave = _CLAVES.get(tabla)
+        if clave and fila.get(clave) is None:
+            if tabla == "rol":
+                fila[clave] = max((f[clave] for f in self.tablas[tabla]), default=0) + 1
+            else:
+                fila[clave] = str(uuid.uuid4())
+        columna_fecha = _FECHAS_DEFAULT.get(tabla)
+        if columna_fecha and columna_fecha not in fila:
+            fila[columna_fecha] = datetime.now(timezone.utc).isoformat()
+        return fila
+
+    def _referencias(self, tabla: str, quitadas: List[dict], agregadas: List[dict]):
+        """Trigger trg_imagenpropiedad_referencias"""
+        if tabla != "imagenpropiedad":
+            return
+        archivos = {f["sha256_archivo"]: f for f in self.tablas["archivo"]}
+        for fila in quitadas:
+            if fila.get("sha256_imagen") in archivos:
+                archivos[fila["sha256_imagen"]]["referencias_archivo"] -= 1
+        for fila in agregadas:
+            sha256 = fila.get("sha256_imagen")
+            if sha256 is None:
+                continue
+            if sha256 not in archivos:
+                archivos[sha256] = {"sha256_archivo": sha256, "url_archivo": fila["url_imagen"], "referencias_archivo": 0}
+                self.tablas["archivo"].append(archivos[sha256])
+            archivos[sha256]["referencias_archivo"] += 1
+
+    @staticmethod
+    def _representacion(filas: List[dict], preferencias: Dict[str, str], status: int = 200) -> Response:
+        if preferencias.get("return") == "representation":
+            return JSONResponse(filas, status_code=status)
+        return Response(status_code=204 if status == 200 else status)
+
+    async def rpc(self, request: Request) -> Response:
+        await self._esperar()
+        funcion = request.path_params["funcion"]
+        return _error(404, "PGRST202", f"Could not find the function public.{funcion} in the schema cache")
+
+    # ---------- Storage ----------
+    async def bucket(self, request: Request) -> Response:
+        await self._esperar()
+        bucket = request.path_params["bucket"]
+        return JSONResponse({"id": bucket, "name": bucket, "public": True})
+
+    async def objeto(self, request: Request) -> Response:
+        await self._esperar()
+        clave = (request.path_params["bucket"], request.path_params["ruta"])
+        if request.method in ("GET", "HEAD"):
+            if clave not in self.objetos:
+                return JSONResponse({"statusCode": "404", "error": "not_found", "message": "Object not found"}, status_code=400)
+            contenido, tipo = self.objetos[clave]
+            if request.method == "HEAD":
+                return Response(headers={"content-length": str(len(contenido)), "content-type": tipo})
+            rango = re.match(r"bytes=(\d+)-(\d+)$", request.headers.get("range", ""))
+            if rango:
+                return Response(contenido[int(rango[1]):int(rango[2]) + 1], status_code=206, media_type=tipo)
+            return Response(contenido, media_type=tipo)
+        self._guardar_objeto(clave, await request.body(), request.headers.get("content-type", "application/octet-stream"))
+        return JSONResponse({"Key": "/".join(clave), "Id": str(uuid.uuid4())})
+
+    def _guardar_objeto(self, clave: Tuple[str, str], contenido: bytes, tipo: str):
+        self.objetos[clave] = (contenido, tipo)
+        self.modificados[clave] = datetime.now(timezone.utc).isoformat()
+
+    async def subida_firmada(self, request: Request) -> Response:
+        # POST firma (sin verificar nada); PUT sube con el token de la URL firmada
+        await self._esperar()
+        bucket, ruta = request.path_params["bucket"], request.path_params["ruta"]
+        if request.method == "POST":
+            return JSONResponse({"url": f"/object/upload/sign/{bucket}/{ruta}?token={uuid.uuid4().hex}"})
+        if not request.query_params.get("token"):
+            return JSONResponse({"statusCode": "400", "error": "invalid_token", "message": "Missing token"}, status_code=400)
+        if (bucket, ruta) in self.objetos and request.headers.get("x-upsert") != "true":
+            return JSONResponse({"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"}, status_code=400)
+        self._guardar_objeto((bucket, ruta), await request.body(), request.headers.get("content-type", "application/octet-stream"))
+        return JSONResponse({"Key": f"{bucket}/{ruta}"})
+
+    async def copiar_objeto(self, request: Request) -> Response:
+        await self._esperar()
+        cuerpo = await request.json()
+        origen = (cuerpo["bucketId"], cuerpo["sourceKey"])
+        destino = (cuerpo["bucketId"], cuerpo["destinationKey"])
+        if origen not in self.objetos:
+            return JSONResponse({"statusCode": "404", "error": "not_found", "message": "Object not found"}, status_code=400)
+        if destino in self.objetos:
+            return JSONResponse({"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"}, status_code=400)
+        self._guardar_objeto(destino, *self.objetos[origen])
+        return JSONResponse({"Key": "/".join(destino)})
+
+    async def listar_objetos(self, request: Request) -> Response:
+        # Un nivel de carpeta, como Storage: las subcarpetas vienen sin id
+        await self._esperar()
+        bucket = request.path_params["bucket"]
+        cuerpo = await request.json()
+        carpeta = cuerpo.get("prefix", "").strip("/")
+        busqueda = cuerpo.get("search", "")
+        inicio = f"{carpeta}/" if carpeta else ""
+        entradas: Dict[str, Optional[Tuple[str, str]]] = {}
+        for (b, ruta), (contenido, tipo) in self.objetos.items():
+            if b != bucket or not ruta.startswith(inicio):
+                continue
+            nombre, separador, _ = ruta[len(inicio):].partition("/")
+            if nombre.startswith(busqueda):
+                entradas[nombre] = None if separador else (b, ruta)
+        nombres = sorted(entradas)
+        offset, limite = cuerpo.get("offset", 0), cuerpo.get("limit", 100)
+        return JSONResponse([
+            {"name": nombre, "id": None, "updated_at": None, "metadata": None} if entradas[nombre] is None else {
+                "name": nombre,
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, entradas[nombre][1])),
+                "updated_at": self.modificados[entradas[nombre]],
+                "metadata": {"size": len(self.objetos[entradas[nombre]][0]), "mimetype": self.objetos[entradas[nombre]][1]},
+            }
+            for nombre in nombres[offset:offset + limite]
+        ])
+
+    async def borrar_objetos(self, request: Request) -> Response:
+        await self._esperar()
+        bucket = request.path_params["bucket"]
+        prefijos = (await request.json()).get("prefixes", [])
+        borrados = [p for p in prefijos if self.objetos.pop((bucket, p), None) is not None]
+        for p in borrados:
+            self.modificados.pop((bucket, p), None)
+        return JSONResponse([{"name": p, "bucket_id": bucket} for p in borrados])
+
+    async def stats(self, request: Request) -> Response:
+        return JSONResponse({
+            "llamadas": self.llamadas,
+            "filas": {nombre: len(filas) for nombre, filas in self.tablas.items()},
+            "objetos": len(self.objetos),
+        })
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--escala", type=float, default=1.0, help="Multiplicador del volumen de datos")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latencia de red simulada por llamada")
+    args = parser.parse_args()
+
+    servidor = FakeSupabase(generar_datos(args.escala, args.semilla), args.latencia_ms / 1000)
+    print(json.dumps({"fake_supabase": f"http://{args.host}:{args.port}", "llamadas_latencia_ms": args.latencia_ms}))
+    uvicorn.run(servidor.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Datos sintéticos para los benchmarks de carga.
+
+Roles, empleados y usuarios son los de seed_data_complete.sql (contraseña
+"password123"); el resto de las tablas se genera con `escala`:
+escala 1 ≈ 40 propiedades, 120 clientes, 200 citas, 60 contratos y
+~700 pagos. Con la misma semilla se obtienen siempre los mismos datos.
+"""
+import random
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List
+
+from passlib.context import CryptContext
+
+PASSWORD = "password123"
+
+ROLES = [
+    {"id_rol": 1, "nombre_rol": "Bróker", "descripcion_rol": "Administrador del sistema con acceso total.", "es_activo_rol": True},
+    {"id_rol": 2, "nombre_rol": "Secretaria", "descripcion_rol": "Gestiona clientes, propiedades, visitas y reportes.", "es_activo_rol": True},
+    {"id_rol": 3, "nombre_rol": "Asesor Inmobiliario", "descripcion_rol": "Realiza captaciones y atiende visitas.", "es_activo_rol": True},
+]
+
+# (ci, nombres, apellidos, correo, id_rol, nombre_usuario)
+_EMPLEADOS = [
+    ("12345678", "Carlos Alberto", "Rodríguez Pérez", "carlos.rodriguez@inmobiliaria.com", 1, "broker_admin"),
+    ("87654321", "María Elena", "García López", "maria.garcia@inmobiliaria.com", 2, "secretaria_maria"),
+    ("11223344", "Juan Pablo", "Martínez Silva", "juan.martinez@inmobiliaria.com", 3, "asesor_juan"),
+    ("44332211", "Ana Sofía", "Fernández Torres", "ana.fernandez@inmobiliaria.com", 3, "asesor_ana"),
+]
+
+USUARIOS = [e[5] for e in _EMPLEADOS]
+
+_CIUDADES = {
+    "Santa Cruz": ["Equipetrol", "Urbarí", "Las Palmas", "Norte", "Plan 3000"],
+    "La Paz": ["Sopocachi", "Calacoto", "Miraflores", "Achumani"],
+    "Cochabamba": ["Queru Queru", "Cala Cala", "Tiquipaya"],
+}
+_TIPOS_PROPIEDAD = ["Casa", "Departamento", "Terreno", "Oficina", "Local comercial"]
+_ESTADOS_PROPIEDAD = ["Publicada"] * 6 + ["Captada", "Reservada", "Cerrada"]
+_ESTADOS_CITA = ["Programada", "Confirmada", "Realizada", "Cancelada", "No asistió"]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generar_datos(escala: float = 1.0, semilla: int = 42) -> Dict[str, List[dict]]:
+    """Tablas (nombre -> filas) listas para cargar en el servidor falso"""
+    rng = random.Random(semilla)
+    hoy = date.today()
+    hash_password = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(PASSWORD)
+
+    def cantidad(base: int) -> int:
+        return max(1, int(base * escala))
+
+    empleados, usuarios = [], []
+    for ci, nombres, apellidos, correo, id_rol, nombre_usuario in _EMPLEADOS:
+        empleados.append({
+            "ci_empleado": ci,
+            "nombres_completo_empleado": nombres,
+            "apellidos_completo_empleado": apellidos,
+            "correo_electronico_empleado": correo,
+            "fecha_nacimiento_empleado": "1988-01-01",
+            "telefono_empleado": f"7{rng.randrange(10**6, 10**7)}",
+            "es_activo_empleado": True,
+        })
+        usuarios.append({
+            "id_usuario": _uuid(rng),
+            "ci_empleado": ci,
+            "id_rol": id_rol,
+            "nombre_usuario": nombre_usuario,
+            "contrasenia_usuario": hash_password,
+            "fecha_creacion_usuario": datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat(),
+            "es_activo_usuario": True,
+        })
+    asesores = [u["id_usuario"] for u in usuarios if u["id_rol"] == 3]
+
+    clientes = [{
+        "ci_cliente": str(5_000_000 + i),
+        "nombres_completo_cliente": f"Cliente {i}",
+        "apellidos_completo_cliente": f"Apellido {i}",
+        "telefono_cliente": f"6{rng.randrange(10**6, 10**7)}",
+        "correo_electronico_cliente": f"cliente{i}@correo.com",
+        "preferencia_zona_cliente": rng.choice(list(_CIUDADES)),
+        "presupuesto_max_cliente": rng.randrange(30_000, 400_000, 1000),
+        "origen_cliente": rng.choice(["Web", "Referido", "Redes sociales", "Oficina"]),
+        "fecha_registro_cliente": datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat(),
+        "id_usuario_registrador": rng.choice(asesores),
+    } for i in range(cantidad(120))]
+
+    propietarios = [{
+        "ci_propietario": str(3_000_000 + i),
+        "nombres_completo_propietario": f"Propietario {i}",
+        "apellidos_completo_propietario": f"Apellido {i}",
+        "fecha_nacimiento_propietario": "1975-06-15",
+        "telefono_propietario": f"7{rng.randrange(10**6, 10**7)}",
+        "correo_electronico_propietario": f"propietario{i}@correo.com",
+        "es_activo_propietario": True,
+    } for i in range(cantidad(30))]
+
+    direcciones, propiedades, detalles, imagenes = [], [], [], []
+    for i in range(cantidad(40)):
+        ciudad = rng.choice(list(_CIUDADES))
+        direccion = {
+            "id_direccion": _uuid(rng),
+            "calle_direccion": f"Calle {rng.randrange(1, 300)} #{rng.randrange(1, 2000)}",
+            "ciudad_direccion": ciudad,
+            "zona_direccion": rng.choice(_CIUDADES[ciudad]),
+            "latitud_direccion": round(-17.78 + rng.uniform(-0.1, 0.1), 6),
+            "longitud_direccion": round(-63.18 + rng.uniform(-0.1, 0.1), 6),
+        }
+        direcciones.append(direccion)
+        tipo = rng.choice(_TIPOS_PROPIEDAD)
+        captacion = hoy - timedelta(days=rng.randrange(10, 700))
+        propiedad = {
+            "id_propiedad": _uuid(rng),
+            "id_direccion": direccion["id_direccion"],
+            "ci_propietario": rng.choice(propietarios)["ci_propietario"],
+            "codigo_publico_propiedad": f"PROP-{i + 1:05d}",
+            "titulo_propiedad": f"{tipo} en {direccion['zona_direccion']}",
+            "descripcion_propiedad": f"{tipo} amplia y bien ubicada. " * 8,
+            "precio_publicado_propiedad": rng.randrange(40_000, 600_000, 500),
+            "superficie_propiedad": rng.randrange(60, 900),
+            "tipo_operacion_propiedad": rng.choice(["Venta", "Alquiler", "Anticrético"]),
+            "estado_propiedad": rng.choice(_ESTADOS_PROPIEDAD),
+            "id_usuario_captador": rng.choice(asesores),
+            "id_usuario_colocador": None,
+            "fecha_captacion_propiedad": captacion.isoformat(),
+            "fecha_publicacion_propiedad": (captacion + timedelta(days=5)).isoformat(),
+            "fecha_cierre_propiedad": None,
+            "porcentaje_captacion_propiedad": 3.0,
+            "porcentaje_colocacion_propiedad": 2.0,
+        }
+        propiedades.append(propiedad)
+        detalles.append({
+            "id_detalle": _uuid(rng),
+            "id_propiedad": propiedad["id_propiedad"],
+            "num_dormitorios": rng.randrange(0, 6),
+            "num_banos": rng.randrange(1, 4),
+            "capacidad_estacionamiento": rng.randrange(0, 3),
+            **{campo: rng.random() < 0.4 for campo in (
+                "tiene_jardin", "tiene_piscina", "tiene_garaje_techado", "tiene_area_servicio",
+                "tiene_buena_vista", "tiene_ascensor", "tiene_balcon", "tiene_terraza",
+                "tiene_sala_estar", "tiene_cocina_equipada",
+            )},
+            "antiguedad_anios": rng.randrange(0, 30),
+            "estado_construccion": rng.choice(["Nuevo", "A estrenar", "Buen estado", "A refaccionar"]),
+        })
+        for orden in range(rng.randrange(3, 9)):
+            imagenes.append({
+                "id_imagen": _uuid(rng),
+                "id_propiedad": propiedad["id_propiedad"],
+                "url_imagen": f"/uploads/propiedades/{propiedad['id_propiedad']}/{orden}.jpg",
+                "descripcion_imagen": None,
+                "es_portada_imagen": orden == 0,
+                "orden_imagen": orden,
+            })
+
+    citas = []
+    for _ in range(cantidad(200)):
+        dia = hoy + timedelta(days=rng.randrange(-60, 30))
+        fecha = datetime.combine(dia, time(rng.randrange(8, 19), rng.choice([0, 30])), tzinfo=timezone.utc)
+        citas.append({
+            "id_cita": _uuid(rng),
+            "id_propiedad": rng.choice(propiedades)["id_propiedad"],
+            "ci_cliente": rng.choice(clientes)["ci_cliente"],
+            "id_usuario_asesor": rng.choice(asesores),
+            "fecha_visita_cita": fecha.isoformat(),
+            "lugar_encuentro_cita": "En la propiedad",
+            "estado_cita": rng.choice(_ESTADOS_CITA),
+            "nota_cita": None,
+            "recordatorio_minutos_cita": 30,
+        })
+
+    contratos, pagos = [], []
+    for _ in range(cantidad(60)):
+        propiedad = rng.choice(propiedades)
+        inicio = hoy - timedelta(days=rng.randrange(30, 720))
+        precio = propiedad["precio_publicado_propiedad"]
+        contrato = {
+            "id_contrato_operacion": _uuid(rng),
+            "id_propiedad": propiedad["id_propiedad"],
+            "ci_cliente": rng.choice(clientes)["ci_cliente"],
+            "id_usuario_colocador": rng.choice(asesores),
+            "tipo_operacion_contrato": propiedad["tipo_operacion_propiedad"],
+            "fecha_inicio_contrato": inicio.isoformat(),
+            "fecha_fin_contrato": None,
+            "estado_contrato": rng.choice(["Activo", "Activo", "Finalizado", "Borrador"]),
+            "modalidad_pago_contrato": "Cuotas",
+            "precio_cierre_contrato": precio,
+            "fecha_cierre_contrato": inicio.isoformat(),
+            "observaciones_contrato": None,
+            "total_pagado_contrato": 0,
+        }
+        contratos.append(contrato)
+        cuotas = rng.randrange(4, 20)
+        for n in range(cuotas):
+            fecha_pago = inicio + timedelta(days=30 * n)
+            monto = round(precio / cuotas, 2)
+            estado = "Pagado" if fecha_pago < hoy and rng.random() < 0.8 else "Pendiente"
+            pagos.append({
+                "id_pago": _uuid(rng),
+                "id_contrato_operacion": contrato["id_contrato_operacion"],
+                "monto_pago": monto,
+                "fecha_pago": fecha_pago.isoformat(),
+                "numero_cuota_pago": n + 1,
+                "estado_pago": estado,
+            })
+            if estado == "Pagado":
+                contrato["total_pagado_contrato"] = round(contrato["total_pagado_contrato"] + monto, 2)
+
+    return {
+        "rol": ROLES,
+        "empleado": empleados,
+        "usuario": usuarios,
+        "cliente": clientes,
+        "propietario": propietarios,
+        "direccion": direcciones,
+        "propiedad": propiedades,
+        "detallepropiedad": detalles,
+        "imagenpropiedad": imagenes,
+        "documentopropiedad": [],
+        "citavisita": citas,
+        "contratooperacion": contratos,
+        "pago": pagos,
+        "desempenoasesor": [],
+        "gananciaempleado": [],
+        "archivo": [],
+    }
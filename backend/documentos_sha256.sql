@@ -0,0 +1,25 @@
+-- ============================================
+-- HASH DE CONTENIDO DE DOCUMENTOS
+-- Sistema Inmobiliario
+-- ============================================
+-- Ejecutar este script en el SQL Editor de Supabase
+-- después de haber creado las tablas con Database.md
+--
+-- La API calcula el SHA-256 de cada documento mientras lo sube
+-- (POST /api/documentos-propiedad/upload). El índice único impide
+-- registrar dos veces el mismo archivo en una propiedad: la API responde
+-- 409 con el documento existente. Los documentos anteriores quedan en NULL.
+
+ALTER TABLE documentopropiedad
+    ADD COLUMN IF NOT EXISTS sha256_documento CHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_documentopropiedad_sha256
+    ON documentopropiedad (id_propiedad, sha256_documento)
+    WHERE sha256_documento IS NOT NULL;
+
+-- ============================================
+-- VERIFICACIÓN
+-- ============================================
+-- Mismo archivo registrado en varias propiedades:
+-- SELECT sha256_documento, COUNT(*) FROM documentopropiedad
+--  WHERE sha256_documento IS NOT NULL GROUP BY 1 HAVING COUNT(*) > 1;
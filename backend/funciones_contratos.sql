@@ -0,0 +1,226 @@
+-- ============================================
+-- FUNCIONES TRANSACCIONALES DE CONTRATOS
+-- Sistema Inmobiliario
+-- ============================================
+-- Ejecutar este script en el SQL Editor de Supabase
+-- después de haber creado las tablas con Database.md
+--
+-- El backend llama a estas funciones con supabase.rpc(...):
+--   - crear_contrato_operacion(p_contrato)
+--   - actualizar_contrato_operacion(p_id_contrato, p_cambios)
+--
+-- Cada llamada corre en UNA sola transacción: validaciones, inserción o
+-- actualización del contrato, cierre de la propiedad y generación de
+-- ganancias. La fila de la propiedad se bloquea (FOR UPDATE) para que dos
+-- activaciones simultáneas no generen ganancias duplicadas.
+--
+-- Códigos de error usados (el backend los traduce a HTTP):
+--   P0002 -> 404 (registro no encontrado)
+--   P0001 -> 400 (regla de negocio violada)
+
+-- ============================================
+-- 1. GENERAR GANANCIAS DE EMPLEADOS
+-- ============================================
+CREATE OR REPLACE FUNCTION generar_ganancias_empleados(
+    p_id_propiedad UUID,
+    p_id_usuario_colocador UUID,
+    p_precio_cierre NUMERIC,
+    p_fecha_cierre DATE
+) RETURNS VOID AS $$
+DECLARE
+    v_propiedad RECORD;
+    v_dinero_captacion NUMERIC;
+    v_dinero_colocacion NUMERIC;
+BEGIN
+    SELECT id_usuario_captador,
+           COALESCE(porcentaje_captacion_propiedad, 0) AS porcentaje_captacion,
+           COALESCE(porcentaje_colocacion_propiedad, 0) AS porcentaje_colocacion
+      INTO v_propiedad
+      FROM propiedad
+     WHERE id_propiedad = p_id_propiedad;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Propiedad no encontrada' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF v_propiedad.id_usuario_captador IS NULL THEN
+        RAISE EXCEPTION 'La propiedad no tiene usuario captador asignado';
+    END IF;
+
+    IF v_propiedad.porcentaje_captacion <= 0 OR v_propiedad.porcentaje_colocacion <= 0 THEN
+        RAISE EXCEPTION 'Los porcentajes de captación y colocación deben ser mayores a 0';
+    END IF;
+
+    -- Ya existen ganancias pendientes, no crear duplicados
+    IF EXISTS (
+        SELECT 1 FROM gananciaempleado
+         WHERE id_propiedad = p_id_propiedad
+           AND esta_concretado_ganancia = false
+    ) THEN
+        RETURN;
+    END IF;
+
+    v_dinero_captacion := (p_precio_cierre * v_propiedad.porcentaje_captacion) / 100;
+    v_dinero_colocacion := (p_precio_cierre * v_propiedad.porcentaje_colocacion) / 100;
+
+    IF p_id_usuario_colocador IS DISTINCT FROM v_propiedad.id_usuario_captador THEN
+        INSERT INTO gananciaempleado (
+            id_propiedad, id_usuario_empleado, tipo_operacion_ganancia,
+            porcentaje_ganado_ganancia, dinero_ganado_ganancia,
+            esta_concretado_ganancia, fecha_cierre_ganancia
+        ) VALUES
+            (p_id_propiedad, v_propiedad.id_usuario_captador, 'Captación',
+             v_propiedad.porcentaje_captacion, v_dinero_captacion, false, p_fecha_cierre),
+            (p_id_propiedad, p_id_usuario_colocador, 'Colocación',
+             v_propiedad.porcentaje_colocacion, v_dinero_colocacion, false, p_fecha_cierre);
+    ELSE
+        -- Si es la misma persona, una sola ganancia con "Ambas"
+        INSERT INTO gananciaempleado (
+            id_propiedad, id_usuario_empleado, tipo_operacion_ganancia,
+            porcentaje_ganado_ganancia, dinero_ganado_ganancia,
+            esta_concretado_ganancia, fecha_cierre_ganancia
+        ) VALUES
+            (p_id_propiedad, v_propiedad.id_usuario_captador, 'Ambas',
+             v_propiedad.porcentaje_captacion + v_propiedad.porcentaje_colocacion,
+             v_dinero_captacion + v_dinero_colocacion, false, p_fecha_cierre);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- 2. ACTIVAR CONTRATO (cerrar propiedad + ganancias)
+-- ============================================
+CREATE OR REPLACE FUNCTION activar_contrato_operacion(
+    p_contrato contratooperacion
+) RETURNS VOID AS $$
+BEGIN
+    -- Bloquear la propiedad: serializa activaciones concurrentes
+    PERFORM 1 FROM propiedad WHERE id_propiedad = p_contrato.id_propiedad FOR UPDATE;
+
+    UPDATE propiedad
+       SET estado_propiedad = 'Cerrada',
+           fecha_cierre_propiedad = CURRENT_DATE,
+           id_usuario_colocador = p_contrato.id_usuario_colocador
+     WHERE id_propiedad = p_contrato.id_propiedad;
+
+    PERFORM generar_ganancias_empleados(
+        p_contrato.id_propiedad,
+        p_contrato.id_usuario_colocador,
+        p_contrato.precio_cierre_contrato,
+        COALESCE(p_contrato.fecha_cierre_contrato, CURRENT_DATE)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- 3. CREAR CONTRATO
+-- ============================================
+CREATE OR REPLACE FUNCTION crear_contrato_operacion(
+    p_contrato JSONB
+) RETURNS contratooperacion AS $$
+DECLARE
+    v_propiedad RECORD;
+    v_datos contratooperacion;
+    v_contrato contratooperacion;
+BEGIN
+    v_datos := jsonb_populate_record(NULL::contratooperacion, p_contrato);
+
+    -- Verificar que la propiedad existe (y bloquearla hasta el commit)
+    SELECT estado_propiedad, tipo_operacion_propiedad
+      INTO v_propiedad
+      FROM propiedad
+     WHERE id_propiedad = v_datos.id_propiedad
+       FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'La propiedad especificada no existe' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF v_propiedad.estado_propiedad = 'Cerrada' THEN
+        RAISE EXCEPTION 'La propiedad ya está cerrada';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM cliente WHERE ci_cliente = v_datos.ci_cliente) THEN
+        RAISE EXCEPTION 'El cliente especificado no existe' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM usuario WHERE id_usuario = v_datos.id_usuario_colocador) THEN
+        RAISE EXCEPTION 'El usuario colocador especificado no existe' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF v_propiedad.tipo_operacion_propiedad IS DISTINCT FROM v_datos.tipo_operacion_contrato THEN
+        RAISE EXCEPTION 'El tipo de operación del contrato debe coincidir con el de la propiedad (%)',
+            v_propiedad.tipo_operacion_propiedad;
+    END IF;
+
+    INSERT INTO contratooperacion (
+        id_propiedad, ci_cliente, id_usuario_colocador, tipo_operacion_contrato,
+        fecha_inicio_contrato, fecha_fin_contrato, estado_contrato,
+        modalidad_pago_contrato, precio_cierre_contrato, fecha_cierre_contrato,
+        observaciones_contrato
+    ) VALUES (
+        v_datos.id_propiedad, v_datos.ci_cliente, v_datos.id_usuario_colocador, v_datos.tipo_operacion_contrato,
+        v_datos.fecha_inicio_contrato, v_datos.fecha_fin_contrato, v_datos.estado_contrato,
+        v_datos.modalidad_pago_contrato, v_datos.precio_cierre_contrato, v_datos.fecha_cierre_contrato,
+        v_datos.observaciones_contrato
+    )
+    RETURNING * INTO v_contrato;
+
+    IF v_contrato.estado_contrato = 'Activo' THEN
+        PERFORM activar_contrato_operacion(v_contrato);
+    END IF;
+
+    RETURN v_contrato;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- 4. ACTUALIZAR CONTRATO
+-- ============================================
+CREATE OR REPLACE FUNCTION actualizar_contrato_operacion(
+    p_id_contrato UUID,
+    p_cambios JSONB
+) RETURNS contratooperacion AS $$
+DECLARE
+    v_actual contratooperacion;
+    v_nuevo contratooperacion;
+BEGIN
+    SELECT * INTO v_actual
+      FROM contratooperacion
+     WHERE id_contrato_operacion = p_id_contrato
+       FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Contrato no encontrado' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF v_actual.estado_contrato IN ('Finalizado', 'Cancelado') THEN
+        RAISE EXCEPTION 'No se pueden editar contratos finalizados o cancelados';
+    END IF;
+
+    -- Solo se sobrescriben las columnas presentes en p_cambios
+    v_nuevo := jsonb_populate_record(v_actual, p_cambios);
+
+    UPDATE contratooperacion
+       SET id_propiedad = v_nuevo.id_propiedad,
+           ci_cliente = v_nuevo.ci_cliente,
+           id_usuario_colocador = v_nuevo.id_usuario_colocador,
+           tipo_operacion_contrato = v_nuevo.tipo_operacion_contrato,
+           fecha_inicio_contrato = v_nuevo.fecha_inicio_contrato,
+           fecha_fin_contrato = v_nuevo.fecha_fin_contrato,
+           estado_contrato = v_nuevo.estado_contrato,
+           modalidad_pago_contrato = v_nuevo.modalidad_pago_contrato,
+           precio_cierre_contrato = v_nuevo.precio_cierre_contrato,
+           fecha_cierre_contrato = v_nuevo.fecha_cierre_contrato,
+           observaciones_contrato = v_nuevo.observaciones_contrato
+     WHERE id_contrato_operacion = p_id_contrato
+    RETURNING * INTO v_nuevo;
+
+    -- Si el contrato cambió a "Activo", cerrar propiedad y generar ganancias
+    IF v_nuevo.estado_contrato = 'Activo' AND v_actual.estado_contrato IS DISTINCT FROM 'Activo' THEN
+        PERFORM activar_contrato_operacion(v_nuevo);
+    END IF;
+
+    RETURN v_nuevo;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,71 @@
+-- ============================================
+-- TOTAL PAGADO POR CONTRATO (mantenido por trigger)
+-- Sistema Inmobiliario
+-- ============================================
+-- Ejecutar este script en el SQL Editor de Supabase
+-- después de haber creado las tablas con Database.md
+--
+-- Agrega a contratooperacion el total pagado y el saldo pendiente, que se
+-- actualizan en cada INSERT/UPDATE/DELETE de pago. Así registrar_pago valida
+-- el saldo leyendo UNA fila en lugar de sumar todos los pagos del contrato.
+--
+-- El trigger también rechaza (P0001) cualquier pago que haga superar el
+-- precio del contrato. Como actualiza la fila del contrato, dos pagos
+-- simultáneos del mismo contrato quedan serializados.
+
+-- ============================================
+-- 1. COLUMNAS
+-- ============================================
+ALTER TABLE contratooperacion
+    ADD COLUMN IF NOT EXISTS total_pagado_contrato DECIMAL(12,2) NOT NULL DEFAULT 0;
+
+ALTER TABLE contratooperacion
+    ADD COLUMN IF NOT EXISTS saldo_pendiente_contrato DECIMAL(12,2)
+    GENERATED ALWAYS AS (precio_cierre_contrato - total_pagado_contrato) STORED;
+
+-- ============================================
+-- 2. TRIGGER SOBRE PAGO
+-- ============================================
+CREATE OR REPLACE FUNCTION actualizar_total_pagado_contrato()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_total NUMERIC;
+    v_precio NUMERIC;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE contratooperacion
+           SET total_pagado_contrato = total_pagado_contrato - OLD.monto_pago
+         WHERE id_contrato_operacion = OLD.id_contrato_operacion;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE contratooperacion
+           SET total_pagado_contrato = total_pagado_contrato + NEW.monto_pago
+         WHERE id_contrato_operacion = NEW.id_contrato_operacion
+        RETURNING total_pagado_contrato, precio_cierre_contrato
+             INTO v_total, v_precio;
+
+        IF v_total > v_precio THEN
+            RAISE EXCEPTION 'El monto total de pagos excedería el precio del contrato';
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_pago_total_pagado ON pago;
+
+CREATE TRIGGER trg_pago_total_pagado
+AFTER INSERT OR DELETE OR UPDATE OF monto_pago, id_contrato_operacion ON pago
+FOR EACH ROW EXECUTE FUNCTION actualizar_total_pagado_contrato();
+
+-- ============================================
+-- 3. CARGA INICIAL (contratos existentes)
+-- ============================================
+UPDATE contratooperacion c
+   SET total_pagado_contrato = COALESCE((
+        SELECT SUM(p.monto_pago)
+          FROM pago p
+         WHERE p.id_contrato_operacion = c.id_contrato_operacion
+   ), 0);
@@ -0,0 +1,25 @@
+-- ============================================
+-- DIMENSIONES DE IMÁGENES
+-- Sistema Inmobiliario
+-- ============================================
+-- Ejecutar este script en el SQL Editor de Supabase
+-- después de variantes_imagen.sql
+--
+-- Después de subir una imagen la API genera una copia en tamaño completo
+-- derecha (orientación EXIF aplicada), sin metadatos (EXIF, GPS) y
+-- recomprimida, además de las miniaturas (ver app/utils/imagenes.py).
+-- Ancho y alto ya orientados quedan en la fila: el catálogo público arma
+-- las grillas (relación de aspecto) sin descargar las imágenes.
+-- NULL = todavía sin procesar.
+
+ALTER TABLE imagenpropiedad
+    ADD COLUMN IF NOT EXISTS ancho_imagen INTEGER CHECK (ancho_imagen > 0),
+    ADD COLUMN IF NOT EXISTS alto_imagen INTEGER CHECK (alto_imagen > 0);
+
+-- Pendientes de procesar (python -m app.utils.imagenes): incluye las que ya
+-- tenían miniaturas pero no la copia en tamaño completo
+DROP INDEX IF EXISTS idx_imagenpropiedad_sin_variantes;
+
+CREATE INDEX IF NOT EXISTS idx_imagenpropiedad_sin_procesar
+    ON imagenpropiedad (id_imagen)
+    WHERE ancho_imagen IS NULL;
@@ -0,0 +1,215 @@
+-- ============================================
+-- RESUMEN FINANCIERO DIARIO (rollup para el dashboard)
+-- Sistema Inmobiliario
+-- ============================================
+-- Ejecutar este script en el SQL Editor de Supabase
+-- después de haber creado las tablas con Database.md
+--
+-- resumenfinancierodiario guarda, por día, cantidad y monto agregados de:
+--   dimension_resumen = 'pago_estado'      clave = estado_pago            (fecha_pago)
+--   dimension_resumen = 'ganancia_estado'  clave = 'Pendiente'/'Pagada'  (fecha_cierre_ganancia)
+--   dimension_resumen = 'contrato_tipo'    clave = tipo_operacion         (fecha_inicio_contrato)
+--   dimension_resumen = 'contrato_estado'  clave = estado_contrato        (fecha_inicio_contrato)
+--
+-- Los triggers aplican solo el delta de cada fila (resta la versión vieja y
+-- suma la nueva), así el rollup se mantiene incrementalmente y el dashboard
+-- lee unas pocas filas por día en lugar de todo el historial.
+-- GET /api/dashboard/financiero llama a obtener_dashboard_financiero().
+
+-- ============================================
+-- 1. TABLA
+-- ============================================
+CREATE TABLE IF NOT EXISTS resumenfinancierodiario (
+    fecha_resumen DATE NOT NULL,
+    dimension_resumen VARCHAR(30) NOT NULL,
+    clave_resumen VARCHAR(40) NOT NULL,
+    cantidad_resumen INTEGER NOT NULL DEFAULT 0,
+    monto_resumen DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha_resumen, dimension_resumen, clave_resumen)
+);
+
+CREATE INDEX IF NOT EXISTS idx_resumen_financiero_dimension
+    ON resumenfinancierodiario(dimension_resumen, clave_resumen, fecha_resumen);
+
+-- Filas sin fecha se acumulan en este día
+-- (fecha_pago es NOT NULL; aplica a ganancias y contratos sin fecha)
+CREATE OR REPLACE FUNCTION fecha_resumen_o_default(p_fecha DATE)
+RETURNS DATE AS $$
+    SELECT COALESCE(p_fecha, DATE '1970-01-01');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================
+-- 2. AJUSTE INCREMENTAL
+-- ============================================
+CREATE OR REPLACE FUNCTION ajustar_resumen_financiero(
+    p_fecha DATE,
+    p_dimension TEXT,
+    p_clave TEXT,
+    p_cantidad INTEGER,
+    p_monto NUMERIC
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resumenfinancierodiario AS r (
+        fecha_resumen, dimension_resumen, clave_resumen, cantidad_resumen, monto_resumen
+    ) VALUES (
+        fecha_resumen_o_default(p_fecha), p_dimension, COALESCE(p_clave, 'Sin definir'),
+        p_cantidad, COALESCE(p_monto, 0)
+    )
+    ON CONFLICT (fecha_resumen, dimension_resumen, clave_resumen) DO UPDATE
+       SET cantidad_resumen = r.cantidad_resumen + EXCLUDED.cantidad_resumen,
+           monto_resumen = r.monto_resumen + EXCLUDED.monto_resumen;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- 3. TRIGGERS
+-- ============================================
+CREATE OR REPLACE FUNCTION resumen_financiero_pago()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM ajustar_resumen_financiero(OLD.fecha_pago, 'pago_estado', OLD.estado_pago, -1, -OLD.monto_pago);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM ajustar_resumen_financiero(NEW.fecha_pago, 'pago_estado', NEW.estado_pago, 1, NEW.monto_pago);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION resumen_financiero_ganancia()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM ajustar_resumen_financiero(
+            OLD.fecha_cierre_ganancia, 'ganancia_estado',
+            CASE WHEN OLD.esta_concretado_ganancia THEN 'Pagada' ELSE 'Pendiente' END,
+            -1, -OLD.dinero_ganado_ganancia
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM ajustar_resumen_financiero(
+            NEW.fecha_cierre_ganancia, 'ganancia_estado',
+            CASE WHEN NEW.esta_concretado_ganancia THEN 'Pagada' ELSE 'Pendiente' END,
+            1, NEW.dinero_ganado_ganancia
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION resumen_financiero_contrato()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM ajustar_resumen_financiero(OLD.fecha_inicio_contrato, 'contrato_tipo', OLD.tipo_operacion_contrato, -1, -OLD.precio_cierre_contrato);
+        PERFORM ajustar_resumen_financiero(OLD.fecha_inicio_contrato, 'contrato_estado', OLD.estado_contrato, -1, -OLD.precio_cierre_contrato);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM ajustar_resumen_financiero(NEW.fecha_inicio_contrato, 'contrato_tipo', NEW.tipo_operacion_contrato, 1, NEW.precio_cierre_contrato);
+        PERFORM ajustar_resumen_financiero(NEW.fecha_inicio_contrato, 'contrato_estado', NEW.estado_contrato, 1, NEW.precio_cierre_contrato);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumen_financiero_pago ON pago;
+CREATE TRIGGER trg_resumen_financiero_pago
+AFTER INSERT OR DELETE OR UPDATE OF fecha_pago, estado_pago, monto_pago ON pago
+FOR EACH ROW EXECUTE FUNCTION resumen_financiero_pago();
+
+DROP TRIGGER IF EXISTS trg_resumen_financiero_ganancia ON gananciaempleado;
+CREATE TRIGGER trg_resumen_financiero_ganancia
+AFTER INSERT OR DELETE OR UPDATE OF fecha_cierre_ganancia, esta_concretado_ganancia, dinero_ganado_ganancia ON gananciaempleado
+FOR EACH ROW EXECUTE FUNCTION resumen_financiero_ganancia();
+
+DROP TRIGGER IF EXISTS trg_resumen_financiero_contrato ON contratooperacion;
+CREATE TRIGGER trg_resumen_financiero_contrato
+AFTER INSERT OR DELETE OR UPDATE OF fecha_inicio_contrato, tipo_operacion_contrato, estado_contrato, precio_cierre_contrato ON contratooperacion
+FOR EACH ROW EXECUTE FUNCTION resumen_financiero_contrato();
+
+-- ============================================
+-- 4. CONSULTA DEL DASHBOARD
+-- ============================================
+CREATE OR REPLACE FUNCTION obtener_dashboard_financiero(p_desde DATE)
+RETURNS JSONB AS $$
+    WITH totales AS (
+        SELECT dimension_resumen, clave_resumen,
+               SUM(cantidad_resumen) AS cantidad,
+               SUM(monto_resumen) AS monto
+          FROM resumenfinancierodiario
+         GROUP BY dimension_resumen, clave_resumen
+        HAVING SUM(cantidad_resumen) <> 0
+    ),
+    mensual AS (
+        SELECT dimension_resumen, clave_resumen,
+               to_char(fecha_resumen, 'YYYY-MM') AS mes,
+               SUM(cantidad_resumen) AS cantidad,
+               SUM(monto_resumen) AS monto
+          FROM resumenfinancierodiario
+         WHERE fecha_resumen >= p_desde
+           AND dimension_resumen IN ('pago_estado', 'contrato_tipo')
+         GROUP BY dimension_resumen, clave_resumen, to_char(fecha_resumen, 'YYYY-MM')
+    )
+    SELECT jsonb_build_object(
+        'ingresos_mensuales', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('mes', mes, 'cantidad', cantidad, 'monto', monto) ORDER BY mes)
+              FROM mensual
+             WHERE dimension_resumen = 'pago_estado' AND clave_resumen = 'Pagado'
+        ), '[]'::jsonb),
+        'contratos_mensuales', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('mes', mes, 'cantidad', cantidad, 'monto', monto) ORDER BY mes)
+              FROM (
+                SELECT mes, SUM(cantidad) AS cantidad, SUM(monto) AS monto
+                  FROM mensual
+                 WHERE dimension_resumen = 'contrato_tipo'
+                 GROUP BY mes
+              ) c
+        ), '[]'::jsonb),
+        'pagos_por_estado', COALESCE((
+            SELECT jsonb_object_agg(clave_resumen, jsonb_build_object('cantidad', cantidad, 'monto', monto))
+              FROM totales WHERE dimension_resumen = 'pago_estado'
+        ), '{}'::jsonb),
+        'comisiones', COALESCE((
+            SELECT jsonb_object_agg(clave_resumen, jsonb_build_object('cantidad', cantidad, 'monto', monto))
+              FROM totales WHERE dimension_resumen = 'ganancia_estado'
+        ), '{}'::jsonb),
+        'contratos_por_tipo', COALESCE((
+            SELECT jsonb_object_agg(clave_resumen, jsonb_build_object('cantidad', cantidad, 'monto', monto))
+              FROM totales WHERE dimension_resumen = 'contrato_tipo'
+        ), '{}'::jsonb),
+        'contratos_por_estado', COALESCE((
+            SELECT jsonb_object_agg(clave_resumen, jsonb_build_object('cantidad', cantidad, 'monto', monto))
+              FROM totales WHERE dimension_resumen = 'contrato_estado'
+        ), '{}'::jsonb)
+    );
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- 5. CARGA INICIAL (historial existente)
+-- ============================================
+TRUNCATE resumenfinancierodiario;
+
+INSERT INTO resumenfinancierodiario (fecha_resumen, dimension_resumen, clave_resumen, cantidad_resumen, monto_resumen)
+SELECT fecha_pago, 'pago_estado', COALESCE(estado_pago, 'Sin definir'), COUNT(*), COALESCE(SUM(monto_pago), 0)
+  FROM pago
+ GROUP BY 1, 3;
+
+INSERT INTO resumenfinancierodiario (fecha_resumen, dimension_resumen, clave_resumen, cantidad_resumen, monto_resumen)
+SELECT fecha_resumen_o_default(fecha_cierre_ganancia), 'ganancia_estado',
+       CASE WHEN esta_concretado_ganancia THEN 'Pagada' ELSE 'Pendiente' END,
+       COUNT(*), COALESCE(SUM(dinero_ganado_ganancia), 0)
+  FROM gananciaempleado
+ GROUP BY 1, 3;
+
+INSERT INTO resumenfinancierodiario (fecha_resumen, dimension_resumen, clave_resumen, cantidad_resumen, monto_resumen)
+SELECT fecha_resumen_o_default(fecha_inicio_contrato), 'contrato_tipo', COALESCE(tipo_operacion_contrato, 'Sin definir'),
+       COUNT(*), COALESCE(SUM(precio_cierre_contrato), 0)
+  FROM contratooperacion
+ GROUP BY 1, 3;
+
+INSERT INTO resumenfinancierodiario (fecha_resumen, dimension_resumen, clave_resumen, cantidad_resumen, monto_resumen)
+SELECT fecha_resumen_o_default(fecha_inicio_contrato), 'contrato_estado', COALESCE(estado_contrato, 'Sin definir'),
+       COUNT(*), COALESCE(SUM(precio_cierre_contrato), 0)
+  FROM contratooperacion
+ GROUP BY 1, 3;
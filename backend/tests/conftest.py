@@ -0,0 +1,136 @@
+"""
+Configuración común de las pruebas (correr `python -m pytest` desde backend/).
+
+Las pruebas no usan Supabase: `supabase` es un cliente en memoria con lo que
+usa la API de PostgREST (select / insert / update / delete con filtros eq,
+in_, gt, order y limit) y el almacenamiento de imágenes es local, en una carpeta
+temporal.
+"""
+import os
+
+# Antes de importar app: Settings exige estas variables
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SUPABASE_KEY", "clave-de-prueba")
+os.environ.setdefault("SECRET_KEY", "secreto-de-prueba")
+os.environ.setdefault("JOBS_ENABLED", "false")
+
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+import pytest
+from app import storage
+from app.storage import DOCUMENTOS, IMAGENES, AlmacenamientoLocal
+
+
+class ConsultaFalsa:
+    def __init__(self, filas: List[dict], columna_id: Optional[str] = None):
+        self.filas = filas
+        self.columna_id = columna_id
+        self.filtros: List[Callable[[dict], bool]] = []
+        self.borrar = False
+        self.insertar: List[dict] = []
+        self.actualizar: Optional[dict] = None
+        self.columna_orden = None
+        self.limite = None
+
+    def select(self, columnas: str = "*"):
+        return self
+
+    def delete(self):
+        self.borrar = True
+        return self
+
+    def insert(self, filas):
+        self.insertar = filas if isinstance(filas, list) else [filas]
+        return self
+
+    def update(self, valores: dict):
+        self.actualizar = valores
+        return self
+
+    def eq(self, columna: str, valor: Any):
+        self.filtros.append(lambda fila: fila.get(columna) == valor)
+        return self
+
+    def in_(self, columna: str, valores: List[Any]):
+        self.filtros.append(lambda fila: fila.get(columna) in valores)
+        return self
+
+    def gt(self, columna: str, valor: Any):
+        self.filtros.append(lambda fila: fila.get(columna) is not None and fila[columna] > valor)
+        return self
+
+    def order(self, columna: str):
+        self.columna_orden = columna
+        return self
+
+    def limit(self, n: int):
+        self.limite = n
+        return self
+
+    def execute(self):
+        if self.insertar:
+            nuevas = [dict(fila) for fila in self.insertar]
+            if self.columna_id:
+                ultimo = max((fila[self.columna_id] for fila in self.filas), default=0)
+                for numero, fila in enumerate(nuevas, start=ultimo + 1):
+                    fila.setdefault(self.columna_id, numero)
+            self.filas.extend(nuevas)
+            return SimpleNamespace(data=[dict(fila) for fila in nuevas])
+        resultado = [fila for fila in self.filas if all(filtro(fila) for filtro in self.filtros)]
+        if self.columna_orden:
+            resultado.sort(key=lambda fila: fila[self.columna_orden])
+        if self.limite is not None:
+            resultado = resultado[:self.limite]
+        if self.borrar:
+            self.filas[:] = [fila for fila in self.filas if fila not in resultado]
+        if self.actualizar is not None:
+            for fila in resultado:
+                fila.update(self.actualizar)
+        return SimpleNamespace(data=[dict(fila) for fila in resultado])
+
+
+class SupabaseFalso:
+    """
+    Tablas en memoria: supabase.tablas["archivo"] es la lista de filas. Las
+    columnas de IDS se numeran al insertar, como una identity de Postgres.
+    """
+    IDS = {"imagenpropiedad": "id_imagen"}
+
+    def __init__(self):
+        self.tablas: Dict[str, List[dict]] = {}
+
+    def table(self, nombre: str) -> ConsultaFalsa:
+        return ConsultaFalsa(self.tablas.setdefault(nombre, []), self.IDS.get(nombre))
+
+
+@pytest.fixture
+def supabase() -> SupabaseFalso:
+    return SupabaseFalso()
+
+
+@pytest.fixture
+def almacen_imagenes(tmp_path, monkeypatch) -> AlmacenamientoLocal:
+    """get_storage(IMAGENES) local en una carpeta temporal"""
+    almacen = AlmacenamientoLocal(str(tmp_path / "imagenes"), "/uploads/imagenes")
+    monkeypatch.setitem(storage._almacenes, IMAGENES, almacen)
+    return almacen
+
+
+@pytest.fixture
+def almacen_documentos(tmp_path, monkeypatch) -> AlmacenamientoLocal:
+    """get_storage(DOCUMENTOS) local en una carpeta temporal"""
+    almacen = AlmacenamientoLocal(str(tmp_path / "documentos"), "/uploads/documentos")
+    monkeypatch.setitem(storage._almacenes, DOCUMENTOS, almacen)
+    return almacen
+
+
+@pytest.fixture
+def escribir() -> Callable[..., str]:
+    """escribir(almacen, clave, contenido): crea el archivo en un almacén local y retorna su ruta"""
+    def escribir(almacen: AlmacenamientoLocal, clave: str, contenido: bytes = b"x") -> str:
+        ruta = almacen.ruta_local(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as archivo:
+            archivo.write(contenido)
+        return ruta
+    return escribir
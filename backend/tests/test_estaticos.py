@@ -0,0 +1,149 @@
+"""
+/uploads con caché HTTP (app/utils/estaticos.py): rangos, Accept-Encoding,
+ETag, Cache-Control, If-None-Match e If-Range.
+"""
+import os
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+from app.utils.estaticos import _acepta, rango_pedido, UploadsStaticFiles
+
+SHA = "ab" + "c" * 62
+CONTENIDO = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=1000-", (1000, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=-5000", (0, 1023)),
+    (" bytes=5-5 ", (5, 5)),
+    ("bytes=-", None),
+    ("bytes=0-1,5-9", None),
+    ("items=0-9", None),
+])
+def test_rango_pedido(valor, esperado):
+    assert rango_pedido(valor, 1024) == esperado
+
+
+@pytest.mark.parametrize("valor, tamanio", [
+    ("bytes=1024-", 1024),
+    ("bytes=9-5", 1024),
+    ("bytes=-0", 1024),
+    ("bytes=-10", 0),
+])
+def test_rango_pedido_insatisfacible(valor, tamanio):
+    with pytest.raises(ValueError):
+        rango_pedido(valor, tamanio)
+
+
+@pytest.mark.parametrize("accept_encoding, codificacion, esperado", [
+    ("gzip, deflate, br", "br", True),
+    ("gzip, deflate, br", "gzip", True),
+    ("BR;q=0.5", "br", True),
+    ("br; q=0", "br", False),
+    ("br;q=0.0", "br", False),
+    ("br;q=x", "br", False),
+    ("gzip", "br", False),
+    ("", "gzip", False),
+])
+def test_acepta(accept_encoding, codificacion, esperado):
+    assert _acepta(accept_encoding, codificacion) is esperado
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    carpeta = tmp_path / "imagenes" / "ab"
+    carpeta.mkdir(parents=True)
+    (carpeta / f"{SHA}.jpg").write_bytes(CONTENIDO)
+    (carpeta / f"{SHA}_w640.webp").write_bytes(CONTENIDO[:100])
+    (carpeta / f"{SHA}_w640.webp.br").write_bytes(b"comprimido")
+    (tmp_path / "otro.pdf").write_bytes(CONTENIDO)
+    estaticos = UploadsStaticFiles(directory=str(tmp_path), precomprimidos=True, max_age=60)
+    return TestClient(Starlette(routes=[Mount("/uploads", estaticos)]))
+
+
+def test_variante_por_contenido_es_inmutable(cliente):
+    response = cliente.get(f"/uploads/imagenes/ab/{SHA}_w640.webp")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_original_no_es_inmutable_y_su_etag_sigue_a_los_bytes(cliente, tmp_path):
+    url = f"/uploads/imagenes/ab/{SHA}.jpg"
+    response = cliente.get(url)
+    assert response.status_code == 200
+    assert response.content == CONTENIDO
+    # El nombre es el hash de lo subido, no de lo guardado (--originales lo reescribe)
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert response.headers["etag"] != f'"{SHA}"'
+
+    ruta = tmp_path / "imagenes" / "ab" / f"{SHA}.jpg"
+    ruta.write_bytes(CONTENIDO[:-1] + b"\x00")
+    os.utime(ruta, ns=(1, 1))
+    reescrito = cliente.get(url, headers={"Range": "bytes=0-9", "If-Range": response.headers["etag"]})
+    assert reescrito.headers["etag"] != response.headers["etag"]
+    # If-Range con el ETag anterior: se envía completo, sin mezclar versiones
+    assert reescrito.status_code == 200
+
+
+def test_otras_rutas_usan_max_age_y_etag_de_tamanio_y_fecha(cliente):
+    response = cliente.get("/uploads/otro.pdf")
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert response.headers["etag"].startswith(f'"{len(CONTENIDO):x}-')
+
+
+def test_if_none_match_responde_304(cliente):
+    url = f"/uploads/imagenes/ab/{SHA}.jpg"
+    etag = cliente.get(url).headers["etag"]
+    assert cliente.get(url, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert cliente.get(url, headers={"If-None-Match": '"otro", *'}).status_code == 304
+    # If-None-Match tiene prioridad sobre If-Modified-Since
+    response = cliente.get(url, headers={"If-None-Match": '"otro"', "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
+
+
+def test_range(cliente):
+    response = cliente.get(f"/uploads/imagenes/ab/{SHA}.jpg", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENIDO)}"
+    assert response.headers["content-length"] == "10"
+    assert response.content == CONTENIDO[10:20]
+
+
+def test_range_fuera_del_archivo_responde_416(cliente):
+    response = cliente.get(f"/uploads/imagenes/ab/{SHA}.jpg", headers={"Range": f"bytes={len(CONTENIDO)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENIDO)}"
+
+
+def test_if_range(cliente):
+    url = f"/uploads/imagenes/ab/{SHA}.jpg"
+    etag = cliente.get(url).headers["etag"]
+    igual = cliente.get(url, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert igual.status_code == 206
+    # Si el archivo cambió se envía completo
+    distinto = cliente.get(url, headers={"Range": "bytes=0-9", "If-Range": '"otro"'})
+    assert distinto.status_code == 200
+    assert distinto.content == CONTENIDO
+
+    fecha = igual.headers["last-modified"]
+    assert cliente.get(url, headers={"Range": "bytes=0-9", "If-Range": fecha}).status_code == 206
+    vieja = cliente.get(url, headers={"Range": "bytes=0-9", "If-Range": "Thu, 01 Jan 1970 00:00:00 GMT"})
+    assert vieja.status_code == 200
+
+
+def test_precomprimido(cliente):
+    url = f"/uploads/imagenes/ab/{SHA}_w640.webp"
+    response = cliente.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].endswith('-br"')
+    assert "accept-ranges" not in response.headers
+
+    sin_br = cliente.get(url, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in sin_br.headers
+    assert sin_br.content == CONTENIDO[:100]
+    assert sin_br.headers["etag"] != response.headers["etag"]
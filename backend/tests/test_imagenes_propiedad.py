@@ -0,0 +1,80 @@
+"""
+Subida de varias imágenes en una request (POST /imagenes-propiedad/upload):
+cada archivo con su fila, la portada entre los que llegaron al almacenamiento
+y las imágenes cuyos metadatos no se pueden borrar, rechazadas.
+"""
+import io
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from app.routes import imagenes_propiedad
+from app.utils.dependencies import get_current_active_user
+
+
+def _jpeg(color: str) -> bytes:
+    salida = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(salida, "JPEG")
+    return salida.getvalue()
+
+
+@pytest.fixture
+def cliente(supabase, almacen_imagenes, monkeypatch):
+    async def sin_variantes(filas):
+        return 0
+
+    monkeypatch.setattr(imagenes_propiedad, "get_supabase_client", lambda: supabase)
+    monkeypatch.setattr(imagenes_propiedad, "procesar_variantes", sin_variantes)
+    supabase.tablas["propiedad"] = [{"id_propiedad": "p1"}]
+    app = FastAPI()
+    app.include_router(imagenes_propiedad.router, prefix="/api")
+    app.dependency_overrides[get_current_active_user] = lambda: {"id_usuario": 1, "nombre_usuario": "admin"}
+    return TestClient(app)
+
+
+def _subir(cliente, *nombres: str):
+    archivos = [("imagenes", (nombre, _jpeg(color), "image/jpeg")) for nombre, color in zip(nombres, ("red", "green", "blue"))]
+    return cliente.post("/api/imagenes-propiedad/upload/p1", files=archivos)
+
+
+def test_primera_imagen_es_la_portada(cliente, supabase):
+    response = _subir(cliente, "a.jpg", "b.jpg")
+
+    assert response.status_code == 200
+    filas = sorted(supabase.tablas["imagenpropiedad"], key=lambda fila: fila["orden_imagen"])
+    assert [fila["es_portada_imagen"] for fila in filas] == [True, False]
+
+
+def test_portada_pasa_a_la_primera_guardada_si_falla_la_primera(cliente, supabase, monkeypatch):
+    enviar = imagenes_propiedad._enviar_al_almacenamiento
+
+    async def enviar_fallando_la_primera(r, semaforo):
+        if r["archivo"] == "a.jpg":
+            raise OSError("sin espacio")
+        await enviar(r, semaforo)
+
+    monkeypatch.setattr(imagenes_propiedad, "_enviar_al_almacenamiento", enviar_fallando_la_primera)
+
+    cuerpo = _subir(cliente, "a.jpg", "b.jpg", "c.jpg").json()
+
+    assert cuerpo["errores"] == 1
+    filas = sorted(supabase.tablas["imagenpropiedad"], key=lambda fila: fila["orden_imagen"])
+    assert [fila["orden_imagen"] for fila in filas] == [1, 2]
+    assert [fila["es_portada_imagen"] for fila in filas] == [True, False]
+    assert cuerpo["imagenes"][0]["es_portada_imagen"]
+    assert cuerpo["portada"] == filas[0]["url_imagen"]
+
+
+def test_imagen_ilegible_se_rechaza(cliente, supabase, almacen_imagenes):
+    # Segmento APP1 que dice ser más largo que el archivo
+    ilegible = b"\xff\xd8\xff\xe1\xff\xf0Exif\x00\x00MM"
+    archivos = [
+        ("imagenes", ("a.jpg", ilegible, "image/jpeg")),
+        ("imagenes", ("b.jpg", _jpeg("green"), "image/jpeg")),
+    ]
+
+    cuerpo = cliente.post("/api/imagenes-propiedad/upload/p1", files=archivos).json()
+
+    assert [r["status"] for r in cuerpo["resultados"]] == [400, 201]
+    assert len(supabase.tablas["imagenpropiedad"]) == 1
+    assert cuerpo["imagenes"][0]["es_portada_imagen"]
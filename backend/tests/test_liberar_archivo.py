@@ -0,0 +1,68 @@
+"""
+liberar_archivo (archivos_contenido.sql): borra el archivo por contenido y
+sus variantes solo si ninguna imagen lo usa.
+
+El trigger que cuenta las referencias es SQL y no se prueba acá: las filas de
+`archivo` se cargan con el conteo que dejaría.
+"""
+from app.utils.imagenes import liberar_archivo
+
+SHA = "ab" + "0" * 62
+OTRO_SHA = "ab" + "1" * 62
+
+
+def _registrar(supabase, sha: str, referencias: int):
+    supabase.tablas.setdefault("archivo", []).append(
+        {"sha256_archivo": sha, "url_archivo": f"/uploads/imagenes/ab/{sha}.jpg", "referencias_archivo": referencias}
+    )
+
+
+def _subir(almacen, escribir, sha: str):
+    for clave in (f"ab/{sha}.jpg", f"ab/{sha}_w640.jpg", f"ab/{sha}_w640.webp", f"ab/{sha}_w640.webp.br"):
+        escribir(almacen, clave)
+
+
+async def test_borra_original_y_variantes(supabase, almacen_imagenes, escribir):
+    _registrar(supabase, SHA, 0)
+    _subir(almacen_imagenes, escribir, SHA)
+    _subir(almacen_imagenes, escribir, OTRO_SHA)
+
+    assert await liberar_archivo(supabase, SHA)
+
+    assert supabase.tablas["archivo"] == []
+    assert sorted(await almacen_imagenes.listar("")) == sorted(
+        [f"ab/{OTRO_SHA}.jpg", f"ab/{OTRO_SHA}_w640.jpg", f"ab/{OTRO_SHA}_w640.webp", f"ab/{OTRO_SHA}_w640.webp.br"]
+    )
+
+
+async def test_conserva_archivo_con_referencias(supabase, almacen_imagenes, escribir):
+    _registrar(supabase, SHA, 1)
+    _subir(almacen_imagenes, escribir, SHA)
+
+    assert not await liberar_archivo(supabase, SHA)
+
+    assert len(supabase.tablas["archivo"]) == 1
+    assert len(await almacen_imagenes.listar("")) == 4
+
+
+async def test_conserva_archivo_subido_de_nuevo_despues_del_delete(supabase, almacen_imagenes, escribir, monkeypatch):
+    _registrar(supabase, SHA, 0)
+    _subir(almacen_imagenes, escribir, SHA)
+    listar = almacen_imagenes.listar
+
+    async def listar_con_subida_en_paralelo(prefijo):
+        # La fila ya se borró: el INSERT de otra subida del mismo contenido la vuelve a crear
+        _registrar(supabase, SHA, 1)
+        return await listar(prefijo)
+
+    monkeypatch.setattr(almacen_imagenes, "listar", listar_con_subida_en_paralelo)
+
+    assert not await liberar_archivo(supabase, SHA)
+
+    assert supabase.tablas["archivo"][0]["referencias_archivo"] == 1
+    assert await almacen_imagenes.existe(f"ab/{SHA}.jpg")
+
+
+async def test_sin_sha_no_hace_nada(supabase, almacen_imagenes):
+    assert not await liberar_archivo(supabase, None)
+    assert supabase.tablas == {}
@@ -0,0 +1,117 @@
+"""
+Limpieza de archivos huérfanos (app/jobs/limpieza_archivos.py) sobre
+almacenamiento local en una carpeta temporal.
+"""
+import os
+import time
+import pytest
+from app.jobs import limpieza_archivos
+from app.jobs.limpieza_archivos import _base, _reconciliar, _sha, limpiar_archivos_huerfanos
+from app.storage import AlmacenamientoLocal
+
+USADO = "ab" + "1" * 62
+HUERFANO = "cd" + "2" * 62
+REGISTRADO = "ef" + "3" * 62
+IMAGENES = [("imagenpropiedad", "url_imagen", "id_imagen")]
+
+
+@pytest.mark.parametrize("clave, base", [
+    (f"ab/{USADO}.jpg", f"ab/{USADO}"),
+    (f"ab/{USADO}_w640.webp", f"ab/{USADO}"),
+    (f"ab/{USADO}_w640.webp.br", f"ab/{USADO}"),
+    ("propiedades/7/foto.jpeg", "propiedades/7/foto"),
+    ("7/contrato.v2.pdf", "7/contrato"),
+    ("sin_extension", "sin_extension"),
+])
+def test_base(clave, base):
+    assert _base(clave) == base
+
+
+@pytest.mark.parametrize("clave, sha", [
+    (f"ab/{USADO}.jpg", USADO),
+    (f"ab/{USADO}_w640.webp", USADO),
+    ("propiedades/7/foto.jpg", None),
+    (f"x/{USADO}.jpg", None),
+])
+def test_sha(clave, sha):
+    assert _sha(clave) == sha
+
+
+def _envejecer(ruta: str):
+    viejo = time.time() - 2 * 24 * 3600
+    os.utime(ruta, (viejo, viejo))
+
+
+@pytest.fixture
+def almacen(almacen_imagenes, escribir, supabase, monkeypatch):
+    """
+    - USADO: original y variante de una imagen (se conservan)
+    - HUERFANO: sin fila (se borra)
+    - REGISTRADO: sin imagen que lo use, pero en la tabla archivo (se conserva)
+    - reciente.jpg: sin fila, pero dentro del período de gracia (se conserva)
+    """
+    monkeypatch.setattr(limpieza_archivos.settings, "LIMPIEZA_ARCHIVOS_GRACIA_SEGUNDOS", 3600)
+    for clave in (f"ab/{USADO}.jpg", f"ab/{USADO}_w640.webp", f"cd/{HUERFANO}.jpg",
+                  f"cd/{HUERFANO}_w640.webp", f"ef/{REGISTRADO}.png", "viejo.jpg"):
+        _envejecer(escribir(almacen_imagenes, clave))
+    escribir(almacen_imagenes, "reciente.jpg")
+    supabase.tablas["imagenpropiedad"] = [{"id_imagen": 1, "url_imagen": almacen_imagenes.url(f"ab/{USADO}.jpg")}]
+    supabase.tablas["archivo"] = [{"sha256_archivo": REGISTRADO, "referencias_archivo": 1}]
+    return almacen_imagenes
+
+
+async def test_reconciliar_borra_solo_huerfanos_fuera_del_periodo_de_gracia(supabase, almacen):
+    resultado = await _reconciliar(supabase, almacen, "", IMAGENES, simular=False)
+
+    assert resultado["revisados"] == 7
+    assert resultado["huerfanos"] == 3
+    assert sorted(await almacen.listar("")) == sorted(
+        [f"ab/{USADO}.jpg", f"ab/{USADO}_w640.webp", f"ef/{REGISTRADO}.png", "reciente.jpg"]
+    )
+
+
+async def test_reconciliar_simulado_no_borra(supabase, almacen):
+    resultado = await _reconciliar(supabase, almacen, "", IMAGENES, simular=True)
+
+    assert resultado["huerfanos"] == 3
+    assert len(await almacen.listar("")) == 7
+
+
+async def test_reconciliar_por_lotes(supabase, almacen, monkeypatch):
+    monkeypatch.setattr(limpieza_archivos.settings, "LIMPIEZA_ARCHIVOS_LOTE", 1)
+
+    resultado = await _reconciliar(supabase, almacen, "", IMAGENES, simular=False)
+
+    assert resultado["huerfanos"] == 3
+    assert len(await almacen.listar("")) == 4
+
+
+async def test_limpieza_completa(supabase, almacen, almacen_documentos, escribir, tmp_path, monkeypatch):
+    legado = tmp_path / "uploads"
+    temporales = tmp_path / "tmp"
+    monkeypatch.setattr(limpieza_archivos, "UPLOADS_DIR", str(legado))
+    monkeypatch.setattr(limpieza_archivos, "TMP_DIR", str(temporales))
+    monkeypatch.setattr(limpieza_archivos, "get_supabase_client", lambda: supabase)
+    _envejecer(escribir(AlmacenamientoLocal(str(legado), "/uploads"), "propiedades/7/foto.jpg"))
+    _envejecer(escribir(almacen_documentos, "7/contrato.pdf"))
+    _envejecer(escribir(AlmacenamientoLocal(str(temporales), ""), "subida_interrumpida"))
+    # Sin imágenes que lo usen: se libera (fila y archivos)
+    supabase.tablas["archivo"].append(
+        {"sha256_archivo": USADO, "url_archivo": almacen.url(f"ab/{USADO}.jpg"), "referencias_archivo": 0}
+    )
+    supabase.tablas["imagenpropiedad"].clear()
+
+    simulado = await limpiar_archivos_huerfanos(simular=True)
+    assert simulado["archivos_liberados"] == 1
+    assert simulado["temporales"] == 1
+    assert len(await almacen.listar("")) == 7
+    assert os.listdir(temporales) == ["subida_interrumpida"]
+
+    resultado = await limpiar_archivos_huerfanos()
+    assert resultado["archivos_liberados"] == 1
+    assert resultado["almacenes"]["uploads_propiedades"]["huerfanos"] == 1
+    assert resultado["almacenes"]["documentos"]["huerfanos"] == 1
+    assert resultado["temporales"] == 1
+    assert sorted(await almacen.listar("")) == [f"ef/{REGISTRADO}.png", "reciente.jpg"]
+    assert supabase.tablas["archivo"] == [{"sha256_archivo": REGISTRADO, "referencias_archivo": 1}]
+    assert os.listdir(temporales) == []
@@ -0,0 +1,157 @@
+"""
+Borrado de metadatos privados de las imágenes subidas (app/utils/metadatos.py)
+y lo que el catálogo público expone de cada imagen.
+"""
+import hashlib
+import pytest
+from PIL import Image, PngImagePlugin
+from app.routes.detalle_propiedad import _imagenes_para_web
+from app.utils.metadatos import MetadatosIlegibles, limpiar_metadatos
+
+ORIENTACION = 0x0112
+MARCA = 0x010F
+SERIE = 0xA431
+IFD_EXIF = 0x8769
+IFD_GPS = 0x8825
+XMP = b'<x:xmpmeta xmlns:x="adobe:ns:meta/"><exif:GPSLatitude>34,36.5S</exif:GPSLatitude></x:xmpmeta>'
+
+
+def _exif() -> Image.Exif:
+    exif = Image.Exif()
+    exif[ORIENTACION] = 6
+    exif[MARCA] = "Apple"
+    exif[IFD_EXIF] = {SERIE: "SERIE-1234"}
+    exif[IFD_GPS] = {1: "S", 2: (34.0, 36.0, 30.0), 3: "W", 4: (58.0, 22.0, 0.0)}
+    return exif
+
+
+def _foto(tmp_path, formato: str, extension: str) -> str:
+    ruta = str(tmp_path / f"foto.{extension}")
+    imagen = Image.new("RGB", (32, 16), "red")
+    opciones = {"exif": _exif()}
+    if formato == "JPEG":
+        opciones["xmp"] = XMP
+    if formato == "WEBP":
+        opciones["xmp"] = XMP.decode()
+    if formato == "PNG":
+        texto = PngImagePlugin.PngInfo()
+        texto.add_text("XML:com.adobe.xmp", XMP.decode())
+        opciones["pnginfo"] = texto
+    imagen.save(ruta, formato, **opciones)
+    return ruta
+
+
+@pytest.mark.parametrize("formato, extension", [("JPEG", "jpg"), ("PNG", "png"), ("WEBP", "webp")])
+def test_borra_gps_y_datos_del_dispositivo(tmp_path, formato, extension):
+    ruta = _foto(tmp_path, formato, extension)
+    with open(ruta, "rb") as archivo:
+        antes = archivo.read()
+    assert b"SERIE-1234" in antes
+
+    assert limpiar_metadatos(ruta, extension)
+
+    with open(ruta, "rb") as archivo:
+        despues = archivo.read()
+    # En el lugar: mismo tamaño, los offsets del contenedor siguen valiendo
+    assert len(despues) == len(antes)
+    assert b"SERIE-1234" not in despues
+    assert b"GPSLatitude" not in despues
+    with Image.open(ruta) as imagen:
+        imagen.load()
+        exif = imagen.getexif()
+        assert not exif.get_ifd(IFD_GPS)
+        # Las etiquetas privadas quedan en cero (mismo tamaño)
+        assert not exif.get_ifd(IFD_EXIF).get(SERIE, "").strip("\x00")
+        # La orientación y la marca se conservan (las variantes salen derechas)
+        assert exif[ORIENTACION] == 6
+        assert exif[MARCA] == "Apple"
+        assert imagen.size == (32, 16)
+
+
+def test_es_determinista(tmp_path):
+    ruta = _foto(tmp_path, "JPEG", "jpg")
+    assert limpiar_metadatos(ruta)
+    with open(ruta, "rb") as archivo:
+        limpio = hashlib.sha256(archivo.read()).hexdigest()
+
+    # Ya limpio no cambia: el mismo archivo subido dos veces da el mismo resultado
+    assert not limpiar_metadatos(ruta)
+    (tmp_path / "otra").mkdir()
+    otra = _foto(tmp_path / "otra", "JPEG", "jpg")
+    limpiar_metadatos(otra)
+    with open(otra, "rb") as archivo:
+        assert hashlib.sha256(archivo.read()).hexdigest() == limpio
+
+
+def test_sin_metadatos_no_cambia(tmp_path):
+    ruta = str(tmp_path / "foto.jpg")
+    Image.new("RGB", (8, 8)).save(ruta, "JPEG")
+    assert not limpiar_metadatos(ruta)
+
+
+def test_formato_desconocido_no_cambia(tmp_path):
+    ruta = tmp_path / "archivo.bin"
+    ruta.write_bytes(b"no es una imagen" * 4)
+    assert not limpiar_metadatos(str(ruta))
+    assert ruta.read_bytes() == b"no es una imagen" * 4
+
+
+@pytest.mark.parametrize("formato, extension", [("JPEG", "jpg"), ("PNG", "png"), ("WEBP", "webp")])
+def test_truncada_no_se_da_por_limpia(tmp_path, formato, extension):
+    ruta = _foto(tmp_path, formato, extension)
+    with open(ruta, "rb") as archivo:
+        contenido = archivo.read()
+    # Cortada en medio del bloque EXIF
+    corte = contenido.index(b"SERIE-1234")
+    with open(ruta, "wb") as archivo:
+        archivo.write(contenido[:corte])
+
+    with pytest.raises(MetadatosIlegibles):
+        limpiar_metadatos(ruta, extension)
+
+
+# ---------- Catálogo público ----------
+
+SHA = "ab" + "0" * 62
+
+
+def _fila(**cambios) -> dict:
+    return {
+        "id_imagen": 1,
+        "url_imagen": f"/uploads/imagenes/ab/{SHA}.jpg",
+        "sha256_imagen": SHA,
+        "ancho_imagen": 4032,
+        "alto_imagen": 3024,
+        "variantes_imagen": {"variantes": [
+            {"ancho": ancho, "formato": formato, "url": f"/uploads/imagenes/ab/{SHA}_w{ancho}.{extension}"}
+            for ancho in (640, 4032) for formato, extension in (("webp", "webp"), ("jpeg", "jpg"))
+        ]},
+        **cambios,
+    }
+
+
+def test_catalogo_con_variantes():
+    imagen, = _imagenes_para_web([_fila()], 600, "webp")
+
+    assert "sha256_imagen" not in imagen
+    assert imagen["url_imagen"] == f"/uploads/imagenes/ab/{SHA}_w640.webp"
+    assert imagen["url_original"] == f"/uploads/imagenes/ab/{SHA}_w4032.jpg"
+    assert f"{SHA}.jpg" not in str(imagen)
+
+
+def test_catalogo_sin_variantes_usa_la_url_de_la_imagen():
+    # Todavía sin procesar (o HEIC / AVIF, o sin Pillow): el original, ya sin metadatos
+    imagen, = _imagenes_para_web([_fila(variantes_imagen=None, ancho_imagen=None, alto_imagen=None)], 600, "webp")
+
+    assert imagen["url_imagen"] == f"/uploads/imagenes/ab/{SHA}.jpg"
+    assert imagen["url_original"] == f"/uploads/imagenes/ab/{SHA}.jpg"
+    assert imagen["srcset"] is None
+    assert "sha256_imagen" not in imagen
+
+
+def test_catalogo_imagen_externa():
+    url = "https://res.cloudinary.com/demo/foto.jpg"
+    imagen, = _imagenes_para_web([_fila(url_imagen=url, sha256_imagen=None, variantes_imagen=None, ancho_imagen=None)], 600, "jpeg")
+
+    assert imagen["url_imagen"] == url
+    assert imagen["url_original"] == url
@@ -0,0 +1,282 @@
+"""
+Subidas directas (app/routes/subidas.py): tickets, verificación de tamaño y
+SHA-256 con FlujoSubida, y claves temporales para las imágenes (se guardan sin
+metadatos) y los almacenamientos que no verifican el contenido al subir
+(Supabase Storage).
+"""
+import hashlib
+import io
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from jose import jwt
+from PIL import Image
+from app import storage
+from app.config import get_settings
+from app.routes import subidas
+from app.routes.subidas import _firmar_ticket, _leer_ticket, _mover_subida
+from app.storage import IMAGENES, AlmacenamientoLocal
+from app.utils.archivos import FlujoSubida
+from app.utils.dependencies import get_current_active_user
+
+settings = get_settings()
+
+# JPEG mínimo (inicio y fin de imagen): _validador lo reconoce por los primeros
+# bytes y limpiar_metadatos no lee lo que va después del fin
+JPEG = b"\xff\xd8\xff\xd9"
+
+
+def _jpeg(relleno: bytes) -> bytes:
+    return JPEG + relleno
+
+
+def _datos(contenido: bytes, clave_subida: str, **cambios) -> dict:
+    sha256 = hashlib.sha256(contenido).hexdigest()
+    return {
+        "tipo": "imagen",
+        "clave": f"{sha256[:2]}/{sha256}.jpg",
+        "clave_subida": clave_subida,
+        "extension": "jpg",
+        "nombre": "foto.jpg",
+        "content_type": "image/jpeg",
+        "bytes": len(contenido),
+        "sha256": sha256,
+        **cambios,
+    }
+
+
+async def _contenido(almacen, clave: str) -> bytes:
+    return b"".join([bloque async for bloque in almacen.leer(clave)])
+
+
+def _expira() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=5)
+
+
+# ---------- Tickets ----------
+
+def test_ticket_ida_y_vuelta():
+    datos = _leer_ticket(_firmar_ticket({"clave": "ab/x.jpg", "usuario": 7}, _expira()))
+    assert datos["clave"] == "ab/x.jpg"
+    assert datos["usuario"] == 7
+
+
+@pytest.mark.parametrize("ticket", [
+    "no-es-un-jwt",
+    _firmar_ticket({"clave": "x"}, datetime.now(timezone.utc) - timedelta(seconds=1)),
+    # Un token de acceso no sirve como ticket de subida
+    jwt.encode({"sub": "admin", "exp": datetime.now(timezone.utc) + timedelta(minutes=5)}, settings.SECRET_KEY, algorithm=settings.ALGORITHM),
+    jwt.encode({"tipo_token": "subida", "exp": datetime.now(timezone.utc) + timedelta(minutes=5)}, "otra-clave", algorithm=settings.ALGORITHM),
+])
+def test_ticket_invalido(ticket):
+    with pytest.raises(HTTPException) as error:
+        _leer_ticket(ticket)
+    assert error.value.status_code == 400
+
+
+# ---------- FlujoSubida ----------
+
+async def _bloques(*bloques: bytes):
+    for bloque in bloques:
+        yield bloque
+
+
+async def _consumir(flujo: FlujoSubida):
+    return [bloque async for bloque in flujo]
+
+
+async def test_flujo_verifica_hash_y_tamanio():
+    contenido = _jpeg(b"hola")
+    flujo = FlujoSubida(
+        _bloques(contenido[:5], contenido[5:]), 1000,
+        sha256_esperado=hashlib.sha256(contenido).hexdigest(), bytes_esperados=len(contenido),
+    )
+    assert b"".join(await _consumir(flujo)) == contenido
+    assert flujo.sha256 == hashlib.sha256(contenido).hexdigest()
+
+
+async def test_flujo_rechaza_hash_distinto():
+    flujo = FlujoSubida(_bloques(_jpeg(b"otro")), 1000, sha256_esperado=hashlib.sha256(b"x").hexdigest())
+    with pytest.raises(HTTPException) as error:
+        await _consumir(flujo)
+    assert error.value.status_code == 400
+    assert "SHA-256" in error.value.detail
+
+
+async def test_flujo_rechaza_tamanio_distinto():
+    flujo = FlujoSubida(_bloques(b"12345"), 1000, bytes_esperados=4)
+    with pytest.raises(HTTPException) as error:
+        await _consumir(flujo)
+    assert error.value.status_code == 400
+
+
+async def test_flujo_corta_al_superar_el_maximo():
+    flujo = FlujoSubida(_bloques(b"123", b"456"), 5)
+    with pytest.raises(HTTPException) as error:
+        await _consumir(flujo)
+    assert error.value.status_code == 413
+
+
+# ---------- Claves temporales ----------
+
+async def test_subida_temporal_se_copia_a_la_clave_final(almacen_imagenes, escribir):
+    contenido = _jpeg(b"foto")
+    datos = _datos(contenido, "subidas/1")
+    escribir(almacen_imagenes, "subidas/1", contenido)
+
+    await _mover_subida(almacen_imagenes, datos)
+
+    assert await _contenido(almacen_imagenes, datos["clave"]) == contenido
+    assert not await almacen_imagenes.existe("subidas/1")
+
+
+async def test_hash_distinto_no_reemplaza_el_archivo_compartido(almacen_imagenes, escribir):
+    original = _jpeg(b"foto")
+    escribir(almacen_imagenes, _datos(original, "")["clave"], original)
+    # Mismo tamaño y formato, otro contenido, declarando el SHA-256 del original
+    falso = _jpeg(b"trap")
+    datos = _datos(original, "subidas/2")
+    escribir(almacen_imagenes, "subidas/2", falso)
+
+    with pytest.raises(HTTPException) as error:
+        await _mover_subida(almacen_imagenes, datos)
+
+    assert error.value.status_code == 400
+    assert await _contenido(almacen_imagenes, datos["clave"]) == original
+    assert not await almacen_imagenes.existe("subidas/2")
+
+
+async def test_tamanio_distinto_se_rechaza(almacen_imagenes, escribir):
+    contenido = _jpeg(b"foto")
+    datos = _datos(contenido, "subidas/3")
+    escribir(almacen_imagenes, "subidas/3", contenido + b"extra")
+
+    with pytest.raises(HTTPException):
+        await _mover_subida(almacen_imagenes, datos)
+
+    assert not await almacen_imagenes.existe(datos["clave"])
+    assert not await almacen_imagenes.existe("subidas/3")
+
+
+async def test_contenido_ya_subido_no_se_copia_de_nuevo(almacen_imagenes, escribir, monkeypatch):
+    contenido = _jpeg(b"foto")
+    datos = _datos(contenido, "subidas/4")
+    escribir(almacen_imagenes, datos["clave"], contenido)
+    escribir(almacen_imagenes, "subidas/4", contenido)
+
+    async def copiar(*args, **kwargs):
+        raise AssertionError("no debería copiar")
+
+    monkeypatch.setattr(almacen_imagenes, "copiar", copiar)
+    await _mover_subida(almacen_imagenes, datos)
+    # Completar el mismo ticket otra vez: la clave temporal ya no está
+    await _mover_subida(almacen_imagenes, datos)
+
+    assert await _contenido(almacen_imagenes, datos["clave"]) == contenido
+    assert not await almacen_imagenes.existe("subidas/4")
+
+
+async def test_imagen_llega_a_la_clave_final_sin_gps(almacen_imagenes, escribir):
+    exif = Image.Exif()
+    exif[0x8825] = {1: "S", 2: (34.0, 36.0, 30.0)}
+    salida = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(salida, "JPEG", exif=exif)
+    contenido = salida.getvalue()
+    datos = _datos(contenido, "subidas/6")
+    escribir(almacen_imagenes, "subidas/6", contenido)
+
+    await _mover_subida(almacen_imagenes, datos)
+
+    guardado = await _contenido(almacen_imagenes, datos["clave"])
+    assert len(guardado) == len(contenido)
+    assert guardado != contenido
+    with Image.open(io.BytesIO(guardado)) as imagen:
+        assert not imagen.getexif().get_ifd(0x8825)
+    assert not await almacen_imagenes.existe("subidas/6")
+
+
+async def test_imagen_ilegible_no_llega_a_la_clave_final(almacen_imagenes, escribir):
+    # Segmento APP1 que dice ser más largo que el archivo
+    contenido = b"\xff\xd8\xff\xe1\xff\xf0Exif\x00\x00MM"
+    datos = _datos(contenido, "subidas/7")
+    escribir(almacen_imagenes, "subidas/7", contenido)
+
+    with pytest.raises(HTTPException) as error:
+        await _mover_subida(almacen_imagenes, datos)
+
+    assert error.value.status_code == 400
+    assert not await almacen_imagenes.existe(datos["clave"])
+    assert not await almacen_imagenes.existe("subidas/7")
+
+
+async def test_sin_subir_se_rechaza(almacen_imagenes):
+    with pytest.raises(HTTPException) as error:
+        await _mover_subida(almacen_imagenes, _datos(_jpeg(b"foto"), "subidas/5"))
+    assert error.value.status_code == 400
+
+
+# ---------- POST /subidas/firmar ----------
+
+class AlmacenamientoSinVerificacion(AlmacenamientoLocal):
+    """Como Supabase Storage: URLs firmadas que aceptan cualquier contenido"""
+    subida_directa = True
+    verifica_subida = False
+
+    async def firmar_subida(self, clave, content_type, tamanio_bytes, sha256, expira_segundos):
+        return {"url": f"https://storage.test/{clave}", "metodo": "PUT", "headers": {"Content-Type": content_type}}
+
+
+@pytest.fixture
+def cliente(supabase, tmp_path, monkeypatch):
+    almacen = AlmacenamientoSinVerificacion(str(tmp_path / "imagenes"), "/uploads/imagenes")
+    monkeypatch.setitem(storage._almacenes, IMAGENES, almacen)
+    monkeypatch.setattr(subidas, "get_supabase_client", lambda: supabase)
+    supabase.tablas["propiedad"] = [{"id_propiedad": "p1"}]
+    app = FastAPI()
+    app.include_router(subidas.router, prefix="/api")
+    app.dependency_overrides[get_current_active_user] = lambda: {"id_usuario": 1}
+    return TestClient(app)
+
+
+def test_firmar_sin_verificacion_usa_clave_temporal(cliente):
+    sha256 = hashlib.sha256(b"foto").hexdigest()
+    response = cliente.post("/api/subidas/firmar", json={
+        "tipo": "imagen", "id_propiedad": "p1", "nombre_archivo": "foto.jpg",
+        "content_type": "image/jpeg", "tamanio_bytes": 20, "sha256": sha256,
+    })
+
+    assert response.status_code == 200
+    cuerpo = response.json()
+    datos = _leer_ticket(cuerpo["ticket"])
+    assert datos["clave"] == f"{sha256[:2]}/{sha256}.jpg"
+    assert datos["clave_subida"].startswith("subidas/")
+    assert cuerpo["subida"]["url"] == f"https://storage.test/{datos['clave_subida']}"
+    assert "x-upsert" not in cuerpo["subida"]["headers"]
+    assert cuerpo["url_archivo"].endswith(datos["clave"])
+
+
+async def test_local_sube_imagenes_a_clave_temporal(supabase, tmp_path, monkeypatch, cliente):
+    almacen = AlmacenamientoLocal(str(tmp_path / "local"), "/uploads/imagenes")
+    monkeypatch.setitem(storage._almacenes, IMAGENES, almacen)
+    contenido = _jpeg(b"foto")
+    sha256 = hashlib.sha256(contenido).hexdigest()
+
+    cuerpo = cliente.post("/api/subidas/firmar", json={
+        "tipo": "imagen", "id_propiedad": "p1", "nombre_archivo": "foto.jpg",
+        "content_type": "image/jpeg", "tamanio_bytes": len(contenido), "sha256": sha256,
+    }).json()
+    response = cliente.put(cuerpo["subida"]["url"], content=contenido)
+
+    assert response.status_code == 200
+    datos = _leer_ticket(cuerpo["ticket"])
+    assert datos["clave_subida"].startswith("subidas/")
+    assert await _contenido(almacen, datos["clave_subida"]) == contenido
+    # Llega a la clave final recién al completar, ya sin metadatos
+    assert not await almacen.existe(datos["clave"])
+
+
+def test_completar_con_ticket_de_otro_usuario(cliente):
+    ticket = _firmar_ticket({"tipo": "imagen", "usuario": 2}, _expira())
+    response = cliente.post("/api/subidas/completar", json={"ticket": ticket})
+    assert response.status_code == 403
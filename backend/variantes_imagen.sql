@@ -0,0 +1,27 @@
+-- ============================================
+-- VARIANTES DE TAMAÑO DE IMÁGENES
+-- Sistema Inmobiliario
+-- ============================================
+-- Ejecutar este script en el SQL Editor de Supabase
+-- después de haber creado las tablas con Database.md
+--
+-- Guarda en cada imagen los tamaños generados después de subirla
+-- (miniaturas JPEG y WebP, ver app/utils/imagenes.py). Formato:
+-- {
+--   "ancho": 4032, "alto": 3024, "bytes": 5120000,
+--   "variantes": [
+--     {"ancho": 320, "alto": 240, "formato": "webp",
+--      "url": "/uploads/propiedades/<id>/<nombre>_w320.webp", "bytes": 14210},
+--     ...
+--   ],
+--   "generado_en": "2025-01-01T00:00:00+00:00"
+-- }
+-- NULL = todavía sin variantes (se sirve el original).
+
+ALTER TABLE imagenpropiedad
+    ADD COLUMN IF NOT EXISTS variantes_imagen JSONB;
+
+-- Imágenes pendientes de procesar (python -m app.utils.imagenes)
+CREATE INDEX IF NOT EXISTS idx_imagenpropiedad_sin_variantes
+    ON imagenpropiedad (id_imagen)
+    WHERE variantes_imagen IS NULL;
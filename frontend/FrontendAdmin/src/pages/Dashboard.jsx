@@ -20,8 +20,7 @@ import {
 import propiedadService from '../services/propiedadService';
 import clienteService from '../services/clienteService';
 import citaService from '../services/citaService';
-import contratoService from '../services/contratoService';
-import pagoService from '../services/pagoService';
+import dashboardService from '../services/dashboardService';
 
 const Dashboard = () => {
   const { user } = useAuth();
@@ -71,12 +70,11 @@ const Dashboard = () => {
       setLoading(true);
 
       // ✅ OPTIMIZADO: Usar endpoints específicos del dashboard
-      const [propiedadesData, clientesData, citasData, contratosData, pagosData] = await Promise.all([
+      const [propiedadesData, clientesData, citasData, financiero] = await Promise.all([
         propiedadService.getAll(controller.signal, { page: 1, pageSize: 100 }),
         clienteService.getAll(controller.signal, { page: 1, pageSize: 50 }),
         citaService.getProximas(5, controller.signal), // ✅ OPTIMIZADO
-        contratoService.getAll({}, controller.signal),
-        pagoService.getDashboard(30, controller.signal) // ✅ OPTIMIZADO
+        dashboardService.getFinanciero(6, controller.signal) // ✅ Agregados del backend
       ]);
 
       if (!isMounted.current) return;
@@ -85,8 +83,6 @@ const Dashboard = () => {
       const propiedades = propiedadesData.items || propiedadesData;
       const clientes = clientesData.items || clientesData;
       const citas = citasData; // Ya es array directo
-      const contratos = contratosData;
-      const pagos = pagosData; // Ya es array directo
 
       const hoy = new Date();
       hoy.setHours(0, 0, 0, 0);
@@ -94,8 +90,7 @@ const Dashboard = () => {
       const finSemana = new Date(hoy);
       finSemana.setDate(hoy.getDate() + 7);
 
-      const inicioMes = new Date(hoy.getFullYear(), hoy.getMonth(), 1);
-      const finMes = new Date(hoy.getFullYear(), hoy.getMonth() + 1, 0);
+      const claveMes = (fecha) => `${fecha.getFullYear()}-${String(fecha.getMonth() + 1).padStart(2, '0')}`;
 
       // Propiedades disponibles
       const propDisponibles = propiedades.filter(p => p.estado_propiedad !== 'Cerrada').length;
@@ -114,15 +109,10 @@ const Dashboard = () => {
       }).length;
 
       // Contratos activos
-      const contratosActivos = contratos.filter(c => c.estado_contrato === 'Activo');
-      const montoContratos = contratosActivos.reduce((sum, c) => sum + parseFloat(c.precio_cierre_contrato || 0), 0);
+      const contratosActivos = financiero.contratos_por_estado?.Activo || { cantidad: 0, monto: 0 };
 
       // Pagos del mes
-      const pagosMes = pagos.filter(p => {
-        const fechaPago = new Date(p.fecha_pago);
-        return fechaPago >= inicioMes && fechaPago <= finMes && p.estado_pago === 'Pagado';
-      });
-      const montoPagosMes = pagosMes.reduce((sum, p) => sum + parseFloat(p.monto_pago || 0), 0);
+      const pagosMes = (financiero.ingresos_mensuales || []).find(m => m.mes === claveMes(hoy)) || { cantidad: 0, monto: 0 };
 
       setStats({
         totalPropiedades: propiedadesData.total || propiedades.length,
@@ -130,10 +120,10 @@ const Dashboard = () => {
         totalClientes: clientesData.total || clientes.length,
         citasHoy: citasHoyCount,
         citasEstaSemana: citasSemanaCount,
-        contratosActivos: contratosActivos.length,
-        montoContratosActivos: montoContratos,
-        pagosMes: pagosMes.length,
-        montoPagosMes: montoPagosMes
+        contratosActivos: contratosActivos.cantidad,
+        montoContratosActivos: parseFloat(contratosActivos.monto || 0),
+        pagosMes: pagosMes.cantidad,
+        montoPagosMes: parseFloat(pagosMes.monto || 0)
       });
 
       // Propiedades por tipo de operación
@@ -147,37 +137,27 @@ const Dashboard = () => {
       );
 
       // Contratos por estado
-      const estadosCount = {};
-      contratos.forEach(c => {
-        const estado = c.estado_contrato || 'Otro';
-        estadosCount[estado] = (estadosCount[estado] || 0) + 1;
-      });
       setContratosPorEstado(
-        Object.entries(estadosCount).map(([name, value]) => ({ name, value }))
+        Object.entries(financiero.contratos_por_estado || {}).map(([name, value]) => ({ name, value: value.cantidad }))
       );
 
       // Próximas citas (ya vienen ordenadas del backend)
       setProximasCitas(citas);
 
       // Ventas por mes (últimos 6 meses)
+      const contratosPorMes = Object.fromEntries(
+        (financiero.contratos_mensuales || []).map(m => [m.mes, m])
+      );
       const meses = [];
       for (let i = 5; i >= 0; i--) {
         const fecha = new Date(hoy.getFullYear(), hoy.getMonth() - i, 1);
         const mesNombre = fecha.toLocaleDateString('es-BO', { month: 'short' });
-        const inicioMesActual = new Date(fecha.getFullYear(), fecha.getMonth(), 1);
-        const finMesActual = new Date(fecha.getFullYear(), fecha.getMonth() + 1, 0);
-
-        const contratosDelMes = contratos.filter(c => {
-          const fechaContrato = new Date(c.fecha_inicio_contrato);
-          return fechaContrato >= inicioMesActual && fechaContrato <= finMesActual;
-        });
-
-        const montoMes = contratosDelMes.reduce((sum, c) => sum + parseFloat(c.precio_cierre_contrato || 0), 0);
+        const datosMes = contratosPorMes[claveMes(fecha)] || { cantidad: 0, monto: 0 };
 
         meses.push({
           mes: mesNombre.charAt(0).toUpperCase() + mesNombre.slice(1),
-          contratos: contratosDelMes.length,
-          monto: montoMes
+          contratos: datosMes.cantidad,
+          monto: parseFloat(datosMes.monto || 0)
         });
       }
       setVentasPorMes(meses);
@@ -0,0 +1,24 @@
+import axiosInstance from '../api/axios';
+
+const BASE_URL = '/dashboard/';
+
+const dashboardService = {
+  // ✅ Resumen financiero agregado (rollup diario en el backend)
+  async getFinanciero(meses = 6, signal) {
+    try {
+      const response = await axiosInstance.get(`${BASE_URL}financiero`, {
+        signal,
+        params: { meses }
+      });
+
+      // Retorna: { ingresos_mensuales, contratos_mensuales, pagos_por_estado,
+      //            comisiones, contratos_por_tipo, contratos_por_estado }
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching dashboard financiero:', error);
+      throw error;
+    }
+  },
+};
+
+export default dashboardService;